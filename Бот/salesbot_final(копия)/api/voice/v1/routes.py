@@ -6,12 +6,12 @@ from fastapi import APIRouter, HTTPException, UploadFile, File
 from fastapi.responses import Response
 from pydantic import BaseModel
 
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
 
 router = APIRouter(prefix="/voice/v1", tags=["voice"])
 
 # Инициализируем общий пайплайн (ASR/TTS/LLM-обёртка)
-pipeline = VoicePipeline()
+pipeline = get_voice_pipeline()
 
 
 # ---------- Модели ----------
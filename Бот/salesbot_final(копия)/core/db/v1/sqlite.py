@@ -1,29 +1,24 @@
-
-import sqlite3
 from pathlib import Path
+from core.state.v1 import get_store
 
 class DB:
+    """Key/value facade over the process-wide StateStore.
+
+    Previously every call opened its own connection (and a separate kv(k, v)
+    table that clashed with StateStore's kv schema in the same file); now all
+    calls share one connection, WAL and busy handling with the rest of the bot.
+    """
+
     def __init__(self, file: str|None=None):
         self.file = file or "salesbot.db"
         self.path = Path(self.file)
-        self._ensure()
-
-    def _ensure(self):
-        if not self.path.exists():
-            conn = sqlite3.connect(self.file)
-            conn.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT)")
-            conn.commit()
-            conn.close()
+        self.store = get_store(self.file)
 
     def set(self, key: str, value: str):
-        conn = sqlite3.connect(self.file)
-        conn.execute("REPLACE INTO kv (k,v) VALUES (?,?)",(key,value))
-        conn.commit()
-        conn.close()
+        self.store.set(key, value)
 
     def get(self, key: str):
-        conn = sqlite3.connect(self.file)
-        cur = conn.execute("SELECT v FROM kv WHERE k=?",(key,))
-        row = cur.fetchone()
-        conn.close()
-        return row[0] if row else None
+        return self.store.get(key)
+
+    def delete(self, key: str):
+        return self.store.delete(key)
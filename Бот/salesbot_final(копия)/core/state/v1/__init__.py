@@ -1,2 +1,7 @@
-from .store import StateStore
-__all__=['StateStore']
+from .store import StateStore, get_store, prefix_range
+from .cache import SessionCache
+from .backends import StateBackend, MemoryBackend, SQLiteBackend, RedisBackend, make_backend
+from .async_store import AsyncStateStore, get_async_store
+from .maintenance import Maintenance, get_maintenance
+__all__=['StateStore','get_store','prefix_range','SessionCache','StateBackend','MemoryBackend','SQLiteBackend',
+         'RedisBackend','make_backend','AsyncStateStore','get_async_store','Maintenance','get_maintenance']
@@ -0,0 +1,110 @@
+import asyncio, functools, os, threading, zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from .store import StateStore, get_store
+
+class AsyncStateStore:
+    """Awaitable facade over StateStore for aiogram/FastAPI handlers.
+
+    Writes run on backend.parallel_writes single-thread writer executors (one for a
+    single SQLite file; in group-commit mode the committer thread batches them);
+    a key always goes to the same executor, so writes to one key - and their
+    cache updates - keep their order. Reads run on a small executor, and session-cache hits are answered inline.
+    A slow fsync or SQLITE_BUSY backoff therefore never blocks the event loop.
+    """
+
+    def __init__(self, store: StateStore, read_workers: Optional[int] = None):
+        self.store = store
+        if read_workers is None:
+            read_workers = int(os.environ.get("STATE_READ_WORKERS", "4"))
+        # one writer thread for a plain SQLite file; more for group commit (callers
+        # park while the committer batches), shards and network backends - each a
+        # single thread pinned by key, so two set_json on a key cannot overtake
+        writers = max(1, store.backend.parallel_writes)
+        self._writers = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"state-writer-{i}") for i in range(writers)]
+        self._readers = ThreadPoolExecutor(max_workers=max(1, read_workers), thread_name_prefix="state-reader")
+
+    async def _run(self, pool: ThreadPoolExecutor, fn, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(fn, *args))
+
+    def _writer(self, key: str) -> ThreadPoolExecutor:
+        return self._writers[zlib.crc32(key.encode("utf-8")) % len(self._writers)]
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._run(self._readers, self.store.get, key)
+
+    async def get_json(self, key: str) -> Any:
+        obj = self.store.cache.get(key)
+        if obj is not None:
+            return obj
+        return await self._run(self._readers, self.store._load_json, key)
+
+    async def get_session(self, key: str) -> Any:
+        obj = await self.get_json(key)
+        if isinstance(obj, dict) and "history" in obj:
+            # legacy blob: the one-off split into turns is a write
+            return await self._run(self._writer(key), self.store.get_session, key)
+        return obj
+
+    async def history(self, session_key: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self._run(self._readers, self.store.history, session_key, last)
+
+    async def history_range(self, session_key: str, after: int, upto: int) -> List[Dict[str, Any]]:
+        return await self._run(self._readers, self.store.history_range, session_key, after, upto)
+
+    async def turn_count(self, session_key: str, role: Optional[str] = None) -> int:
+        return await self._run(self._readers, self.store.turn_count, session_key, role)
+
+    async def append_turn(self, session_key: str, role: str, content: str) -> None:
+        await self._run(self._writer(session_key), self.store.append_turn, session_key, role, content)
+
+    async def clear_turns(self, session_key: str) -> int:
+        return await self._run(self._writer(session_key), self.store.clear_turns, session_key)
+
+    async def scan(self, prefix: str, limit: int = 100, after_key: Optional[str] = None) -> List[Tuple[str, str]]:
+        return await self._run(self._readers, self.store.scan, prefix, limit, after_key)
+
+    async def scan_page(self, prefix: str, after_key: Optional[str] = None, limit: int = 100) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        return await self._run(self._readers, self.store.scan_page, prefix, after_key, limit)
+
+    async def iter_scan(self, prefix: str, batch: int = 500, after_key: Optional[str] = None) -> AsyncIterator[Tuple[str, str]]:
+        while True:
+            items, after_key = await self.scan_page(prefix, after_key, batch)
+            for item in items:
+                yield item
+            if after_key is None:
+                return
+
+    async def set(self, key: str, value: str) -> None:
+        await self._run(self._writer(key), self.store.set, key, value)
+
+    async def set_json(self, key: str, obj: Any) -> None:
+        await self._run(self._writer(key), self.store.set_json, key, obj)
+
+    async def delete(self, key: str) -> int:
+        return await self._run(self._writer(key), self.store.delete, key)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.store.cache_stats()
+
+    def close(self) -> None:
+        for w in self._writers:
+            w.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+
+_SHARED: Dict[str, AsyncStateStore] = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_async_store(path: str = "salesbot.db") -> AsyncStateStore:
+    """Process-wide AsyncStateStore wrapping get_store(path)."""
+    key = os.path.abspath(path)
+    store = _SHARED.get(key)
+    if store is None:
+        with _SHARED_LOCK:
+            store = _SHARED.get(key)
+            if store is None:
+                store = AsyncStateStore(get_store(path))
+                _SHARED[key] = store
+    return store
@@ -0,0 +1,36 @@
+import os
+from typing import Optional
+from .base import StateBackend, prefix_range
+from .memory import MemoryBackend
+from .sqlite import SQLiteBackend
+from .redis import RedisBackend
+from .sharded import ShardedBackend, shard_of, shard_paths
+from .resp import RespClient, RespError
+
+def make_backend(path: str = "salesbot.db", group_commit_ms: Optional[float] = None) -> StateBackend:
+    """Backend chosen by STATE_BACKEND: sqlite (default), memory or redis.
+
+    redis: STATE_REDIS_URL (redis://127.0.0.1:6379/0), STATE_REDIS_NAMESPACE
+    (salesbot:), STATE_REDIS_POOL (8); TTLs come from STATE_TTLS as for the sweeper.
+    sqlite: STATE_SHARDS=N (>1) spreads sessions over N files, see shard_paths().
+    """
+    kind = os.environ.get("STATE_BACKEND", "sqlite").strip().lower()
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "redis":
+        from ..maintenance import load_ttls
+        return RedisBackend(
+            os.environ.get("STATE_REDIS_URL", "redis://127.0.0.1:6379/0"),
+            namespace=os.environ.get("STATE_REDIS_NAMESPACE", "salesbot:"),
+            ttls=load_ttls(),
+            pool_size=int(os.environ.get("STATE_REDIS_POOL", "8")),
+        )
+    if kind != "sqlite":
+        raise ValueError(f"unknown STATE_BACKEND: {kind}")
+    shards = int(os.environ.get("STATE_SHARDS", "1"))
+    if shards > 1:
+        return ShardedBackend([SQLiteBackend(p, group_commit_ms=group_commit_ms) for p in shard_paths(path, shards)])
+    return SQLiteBackend(path, group_commit_ms=group_commit_ms)
+
+__all__ = ['StateBackend', 'MemoryBackend', 'SQLiteBackend', 'RedisBackend', 'ShardedBackend', 'RespClient', 'RespError',
+           'make_backend', 'shard_of', 'shard_paths', 'prefix_range']
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+def prefix_range(prefix: str) -> Tuple[str, Optional[str]]:
+    """[lo, hi) bounds covering every key that starts with `prefix` (hi=None: unbounded)."""
+    p = prefix.rstrip("\U0010ffff")
+    if not p:
+        return prefix, None
+    return prefix, p[:-1] + chr(ord(p[-1]) + 1)
+
+
+class StateBackend:
+    """Storage contract behind StateStore.
+
+    Two namespaces: `kv` (key -> text value, scanned in key order) and
+    append-only dialog `turns` per session key (seq starts at 1).
+    Implementations must be thread-safe; StateStore adds the session cache on top.
+    """
+
+    name = "base"
+    # True when other processes can write the same data (the in-process
+    # session cache must then be off, see StateStore)
+    shared = False
+    # how many writes may usefully run at once (AsyncStateStore sizes its writer pool by it)
+    parallel_writes = 1
+
+    # ---- kv ----
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> int:
+        raise NotImplementedError
+
+    def scan(self, prefix: str, limit: int = 100, after_key: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Up to `limit` (key, value) pairs with `prefix`, key order, strictly after `after_key`."""
+        raise NotImplementedError
+
+    # ---- turns ----
+
+    def append_turn(self, session_key: str, role: str, content: str) -> None:
+        raise NotImplementedError
+
+    def history(self, session_key: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def history_range(self, session_key: str, after: int, upto: int) -> List[Dict[str, Any]]:
+        """Turns with after < seq <= upto, in order."""
+        return [t for t in self.history(session_key) if after < t["seq"] <= upto]
+
+    def turn_count(self, session_key: str, role: Optional[str] = None) -> int:
+        """Number of turns; with `role` only that role's (e.g. "user": the manager's lines)."""
+        raise NotImplementedError
+
+    def clear_turns(self, session_key: str) -> int:
+        raise NotImplementedError
+
+    def migrate_session(self, key: str, header: str, turns: List[Dict[str, Any]]) -> None:
+        # legacy blob split: turns first, header last, so a crash in between is retried
+        if self.turn_count(key) == 0:
+            for m in turns:
+                self.append_turn(key, m.get("role"), m.get("content"))
+        self.set(key, header)
+
+    # ---- raw SQL (SQLite only) ----
+
+    def query(self, sql: str, args: tuple = ()) -> List[tuple]:
+        raise NotImplementedError(f"{self.name} backend has no SQL")
+
+    def execute(self, sql: str, args: tuple = ()) -> int:
+        raise NotImplementedError(f"{self.name} backend has no SQL")
+
+    def execute_batch(self, statements: List[Tuple[str, tuple]]) -> List[int]:
+        raise NotImplementedError(f"{self.name} backend has no SQL")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,77 @@
+import bisect, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+from .base import StateBackend, prefix_range
+
+class MemoryBackend(StateBackend):
+    """Process-local dict storage for tests and throwaway runs (nothing is persisted)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kv: Dict[str, str] = {}
+        self._keys: List[str] = []   # sorted, for ordered scans
+        self._turns: Dict[str, List[Dict[str, Any]]] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._kv.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            if key not in self._kv:
+                bisect.insort(self._keys, key)
+            self._kv[key] = value
+
+    def delete(self, key: str) -> int:
+        with self._lock:
+            if key not in self._kv:
+                return 0
+            del self._kv[key]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+            return 1
+
+    def scan(self, prefix: str, limit: int = 100, after_key: Optional[str] = None) -> List[Tuple[str, str]]:
+        lo, hi = prefix_range(prefix)
+        with self._lock:
+            if after_key is not None and after_key >= lo:
+                i = bisect.bisect_right(self._keys, after_key)
+            else:
+                i = bisect.bisect_left(self._keys, lo)
+            out = []
+            while i < len(self._keys) and len(out) < limit:
+                k = self._keys[i]
+                if hi is not None and k >= hi:
+                    break
+                out.append((k, self._kv[k]))
+                i += 1
+            return out
+
+    def append_turn(self, session_key: str, role: str, content: str) -> None:
+        with self._lock:
+            turns = self._turns.setdefault(session_key, [])
+            turns.append({"seq": len(turns) + 1, "role": role, "content": content, "ts": time.time()})
+
+    def history(self, session_key: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            turns = self._turns.get(session_key, [])
+            if last is not None:
+                turns = turns[-last:] if last > 0 else []
+            return [dict(t) for t in turns]
+
+    def history_range(self, session_key: str, after: int, upto: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(t) for t in self._turns.get(session_key, [])[max(0, int(after)):max(0, int(upto))]]
+
+    def turn_count(self, session_key: str, role: Optional[str] = None) -> int:
+        with self._lock:
+            turns = self._turns.get(session_key, ())
+            return len(turns) if role is None else sum(1 for t in turns if t["role"] == role)
+
+    def clear_turns(self, session_key: str) -> int:
+        with self._lock:
+            return len(self._turns.pop(session_key, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.name, "keys": len(self._kv), "sessions_with_turns": len(self._turns)}
@@ -0,0 +1,128 @@
+import json, time
+from typing import Any, Dict, List, Optional, Tuple
+from .base import StateBackend, prefix_range
+from .resp import RespClient
+
+class RedisBackend(StateBackend):
+    """State in a Redis-protocol server shared by every worker process.
+
+    Layout under `namespace`:
+      {ns}kv:{key}     string value (SET ... EX ttl when a TTL prefix matches)
+      {ns}keys         sorted set of kv keys, score 0 -> ZRANGEBYLEX gives ordered scans
+      {ns}turns:{key}  list of JSON turns; seq is the 1-based list position
+    Expiry is done by the server, so the SQLite sweeper is not needed here.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = "redis://127.0.0.1:6379/0", namespace: str = "salesbot:",
+                 ttls: Optional[Dict[str, float]] = None, pool_size: int = 8):
+        self.client = RespClient(url, pool_size=pool_size)
+        self.ns = namespace
+        self.ttls = dict(ttls or {})
+        self._index = namespace + "keys"
+        self.parallel_writes = self.client.pool_size
+
+    def _kv(self, key: str) -> str:
+        return self.ns + "kv:" + key
+
+    def _turns(self, key: str) -> str:
+        return self.ns + "turns:" + key
+
+    def _ttl(self, key: str) -> int:
+        best = ""
+        for p in self.ttls:
+            if key.startswith(p) and len(p) > len(best):
+                best = p
+        return int(self.ttls[best]) if best else 0
+
+    # ---- kv ----
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.call("GET", self._kv(key))
+
+    def set(self, key: str, value: str) -> None:
+        ttl = self._ttl(key)
+        cmd: List[Any] = ["SET", self._kv(key), value]
+        if ttl > 0:
+            cmd += ["EX", ttl]
+        self.client.pipeline([cmd, ["ZADD", self._index, 0, key]])
+
+    def delete(self, key: str) -> int:
+        n, _ = self.client.pipeline([["DEL", self._kv(key)], ["ZREM", self._index, key]])
+        return int(n)
+
+    def scan(self, prefix: str, limit: int = 100, after_key: Optional[str] = None) -> List[Tuple[str, str]]:
+        lo, hi = prefix_range(prefix)
+        start = "(" + after_key if after_key is not None and after_key >= lo else "[" + lo
+        end = "(" + hi if hi is not None else "+"
+        out: List[Tuple[str, str]] = []
+        while len(out) < limit:
+            want = limit - len(out)
+            keys = self.client.call("ZRANGEBYLEX", self._index, start, end, "LIMIT", 0, want)
+            if not keys:
+                break
+            values = self.client.call("MGET", *[self._kv(k) for k in keys])
+            expired = [k for k, v in zip(keys, values) if v is None]
+            out.extend((k, v) for k, v in zip(keys, values) if v is not None)
+            if expired:
+                # the value expired on the server; drop its index entry lazily
+                self.client.call("ZREM", self._index, *expired)
+            if len(keys) < want:
+                break
+            start = "(" + keys[-1]
+        return out
+
+    # ---- turns ----
+
+    def append_turn(self, session_key: str, role: str, content: str) -> None:
+        tk = self._turns(session_key)
+        cmds: List[List[Any]] = [["RPUSH", tk, json.dumps({"role": role, "content": content, "ts": time.time()}, ensure_ascii=False)]]
+        ttl = self._ttl(session_key)
+        if ttl > 0:
+            cmds.append(["EXPIRE", tk, ttl])
+        self.client.pipeline(cmds)
+
+    def history(self, session_key: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        tk = self._turns(session_key)
+        if last is not None and last <= 0:
+            return []
+        start = -int(last) if last is not None else 0
+        total, rows = self.client.pipeline([["LLEN", tk], ["LRANGE", tk, start, -1]])
+        first = int(total) - len(rows) + 1
+        out = []
+        for i, raw in enumerate(rows):
+            t = json.loads(raw)
+            out.append({"seq": first + i, "role": t.get("role"), "content": t.get("content"), "ts": t.get("ts")})
+        return out
+
+    def history_range(self, session_key: str, after: int, upto: int) -> List[Dict[str, Any]]:
+        after = max(0, int(after))
+        if upto <= after:
+            return []
+        rows = self.client.call("LRANGE", self._turns(session_key), after, int(upto) - 1) or []
+        out = []
+        for i, raw in enumerate(rows):
+            t = json.loads(raw)
+            out.append({"seq": after + 1 + i, "role": t.get("role"), "content": t.get("content"), "ts": t.get("ts")})
+        return out
+
+    def turn_count(self, session_key: str, role: Optional[str] = None) -> int:
+        if role is None:
+            return int(self.client.call("LLEN", self._turns(session_key)))
+        # в списке нет индекса по роли: проход по репликам без сборки словарей
+        rows = self.client.call("LRANGE", self._turns(session_key), 0, -1) or []
+        return sum(1 for raw in rows if json.loads(raw).get("role") == role)
+
+    def clear_turns(self, session_key: str) -> int:
+        tk = self._turns(session_key)
+        n, _ = self.client.pipeline([["LLEN", tk], ["DEL", tk]])
+        return int(n)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "server": f"{self.client.host}:{self.client.port}/{self.client.db}", "namespace": self.ns,
+                "pool_size": self.client.pool_size, "connections_opened": self.client.opened}
+
+    def close(self) -> None:
+        self.client.close()
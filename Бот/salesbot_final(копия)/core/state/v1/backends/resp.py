@@ -0,0 +1,136 @@
+import socket, threading, queue
+from typing import Any, List, Optional, Sequence
+from urllib.parse import urlparse, unquote
+
+class RespError(Exception):
+    """Error reply (-ERR ...) from the server."""
+
+
+def encode(args: Sequence[Any]) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for a in args:
+        if isinstance(a, bytes):
+            b = a
+        elif isinstance(a, str):
+            b = a.encode("utf-8")
+        else:
+            b = str(a).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+    return b"".join(out)
+
+
+def read_reply(f) -> Any:
+    # RESP2: +simple -error :int $bulk *array; bulk strings are decoded as UTF-8
+    line = f.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return RespError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        n = int(rest)
+        if n < 0:
+            return None
+        data = f.read(n + 2)
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        n = int(rest)
+        if n < 0:
+            return None
+        return [read_reply(f) for _ in range(n)]
+    raise ConnectionError(f"bad reply: {line!r}")
+
+
+class RespConnection:
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None, timeout: float = 5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.f = self.sock.makefile("rb")
+        if password:
+            self.call("AUTH", password)
+        if db:
+            self.call("SELECT", db)
+
+    def pipeline(self, commands: List[Sequence[Any]]) -> List[Any]:
+        # one round trip for all commands; error replies are returned, not raised
+        self.sock.sendall(b"".join(encode(c) for c in commands))
+        return [read_reply(self.f) for _ in commands]
+
+    def call(self, *args: Any) -> Any:
+        res = self.pipeline([args])[0]
+        if isinstance(res, RespError):
+            raise res
+        return res
+
+    def close(self) -> None:
+        try:
+            self.f.close()
+            self.sock.close()
+        except Exception:
+            pass
+
+
+class RespClient:
+    """Minimal thread-safe Redis-protocol client with a bounded connection pool."""
+
+    def __init__(self, url: str = "redis://127.0.0.1:6379/0", pool_size: int = 8, timeout: float = 5.0):
+        u = urlparse(url)
+        self.url = url
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.db = int(u.path.lstrip("/") or 0)
+        self.password = unquote(u.password) if u.password else None
+        self.timeout = timeout
+        self.pool_size = max(1, int(pool_size))
+        self._idle: "queue.LifoQueue[RespConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self.opened = 0
+
+    def _acquire(self) -> RespConnection:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("RESP pool exhausted")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            conn = RespConnection(self.host, self.port, self.db, self.password, self.timeout)
+        except Exception:
+            self._slots.release()
+            raise
+        self.opened += 1
+        return conn
+
+    def _release(self, conn: RespConnection, broken: bool = False) -> None:
+        if broken:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def pipeline(self, commands: List[Sequence[Any]]) -> List[Any]:
+        conn = self._acquire()
+        try:
+            res = conn.pipeline(commands)
+        except Exception:
+            self._release(conn, broken=True)
+            raise
+        self._release(conn)
+        for r in res:
+            if isinstance(r, RespError):
+                raise r
+        return res
+
+    def call(self, *args: Any) -> Any:
+        return self.pipeline([args])[0]
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,234 @@
+"""In-process Redis-protocol stand-in for local runs and backend checks.
+
+Implements only what RedisBackend uses (strings with EX, lexicographic
+sorted sets, lists, DEL/EXPIRE) on top of Python dicts. Not a Redis
+replacement: no persistence, a single global lock.
+
+    python -m core.state.v1.backends.resp_server --port 6390
+    STATE_BACKEND=redis STATE_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn startup:app --workers 4
+"""
+import argparse, bisect, socket, socketserver, threading, time
+from typing import Any, Dict, List, Optional
+from .resp import encode
+
+class _Error(Exception):
+    pass
+
+
+class _Data:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values: Dict[str, Any] = {}      # str | list | sorted member list
+        self.expires: Dict[str, float] = {}
+
+    def _live(self, key: str) -> bool:
+        exp = self.expires.get(key)
+        if exp is not None and exp <= time.time():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    def _typed(self, key: str, kind: type) -> Any:
+        if not self._live(key):
+            return None
+        v = self.values[key]
+        if not isinstance(v, kind):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return v
+
+    def run(self, cmd: str, a: List[str]) -> Any:
+        fn = getattr(self, "c_" + cmd.lower(), None)
+        if fn is None:
+            raise _Error(f"ERR unknown command '{cmd}'")
+        with self.lock:
+            return fn(a)
+
+    def c_ping(self, a): return "PONG"
+    def c_select(self, a): return "OK"
+    def c_auth(self, a): return "OK"
+    def c_dbsize(self, a): return sum(1 for k in list(self.values) if self._live(k))
+
+    def c_flushdb(self, a):
+        self.values.clear()
+        self.expires.clear()
+        return "OK"
+
+    def c_get(self, a):
+        return self._typed(a[0], str)
+
+    def c_set(self, a):
+        key, val = a[0], a[1]
+        self.values[key] = val
+        self.expires.pop(key, None)
+        opts = [x.upper() for x in a[2:]]
+        if "EX" in opts:
+            self.expires[key] = time.time() + float(a[2 + opts.index("EX") + 1])
+        return "OK"
+
+    def c_mget(self, a):
+        out = []
+        for k in a:
+            v = self.values.get(k) if self._live(k) else None
+            out.append(v if isinstance(v, str) else None)
+        return out
+
+    def c_del(self, a):
+        n = 0
+        for k in a:
+            if self._live(k):
+                del self.values[k]
+                self.expires.pop(k, None)
+                n += 1
+        return n
+
+    def c_expire(self, a):
+        if not self._live(a[0]):
+            return 0
+        self.expires[a[0]] = time.time() + float(a[1])
+        return 1
+
+    # sorted sets: every score is 0 here, so a zset is just a sorted member list
+    def c_zadd(self, a):
+        z = self._typed(a[0], _ZSet)
+        if z is None:
+            z = self.values[a[0]] = _ZSet()
+        n = 0
+        for m in a[2::2]:
+            i = bisect.bisect_left(z, m)
+            if i == len(z) or z[i] != m:
+                z.insert(i, m)
+                n += 1
+        return n
+
+    def c_zrem(self, a):
+        z = self._typed(a[0], _ZSet)
+        if z is None:
+            return 0
+        n = 0
+        for m in a[1:]:
+            i = bisect.bisect_left(z, m)
+            if i < len(z) and z[i] == m:
+                del z[i]
+                n += 1
+        return n
+
+    def c_zrangebylex(self, a):
+        z = self._typed(a[0], _ZSet) or []
+        lo, hi = a[1], a[2]
+        i = 0 if lo == "-" else (bisect.bisect_left(z, lo[1:]) if lo[0] == "[" else bisect.bisect_right(z, lo[1:]))
+        j = len(z) if hi == "+" else (bisect.bisect_right(z, hi[1:]) if hi[0] == "[" else bisect.bisect_left(z, hi[1:]))
+        out = z[i:j]
+        if len(a) >= 6 and a[3].upper() == "LIMIT":
+            off, cnt = int(a[4]), int(a[5])
+            out = out[off:] if cnt < 0 else out[off:off + cnt]
+        return list(out)
+
+    # lists
+    def c_rpush(self, a):
+        l = self._typed(a[0], _List)
+        if l is None:
+            l = self.values[a[0]] = _List()
+        l.extend(a[1:])
+        return len(l)
+
+    def c_llen(self, a):
+        l = self._typed(a[0], _List)
+        return len(l) if l is not None else 0
+
+    def c_lrange(self, a):
+        l = self._typed(a[0], _List) or []
+        n = len(l)
+        start, stop = int(a[1]), int(a[2])
+        start = max(0, start + n if start < 0 else start)
+        stop = stop + n if stop < 0 else stop
+        return list(l[start:stop + 1])
+
+
+class _ZSet(list):
+    pass
+
+
+class _List(list):
+    pass
+
+
+def _reply(v: Any) -> bytes:
+    if v is None:
+        return b"$-1\r\n"
+    if isinstance(v, _Error):
+        return b"-" + str(v).encode("utf-8") + b"\r\n"
+    if isinstance(v, int):
+        return b":%d\r\n" % v
+    if isinstance(v, list):
+        return b"*%d\r\n" % len(v) + b"".join(_reply(x) for x in v)
+    if v in ("OK", "PONG"):
+        return b"+" + v.encode() + b"\r\n"
+    return encode([v])[4:]   # drop the "*1\r\n" array header, keep the bulk string
+
+
+def _read_command(f) -> Optional[List[str]]:
+    line = f.readline()
+    if not line:
+        return None
+    if line[:1] != b"*":
+        return line.decode("utf-8").split()   # inline command (telnet)
+    args = []
+    for _ in range(int(line[1:-2])):
+        n = int(f.readline()[1:-2])
+        args.append(f.read(n + 2)[:-2].decode("utf-8"))
+    return args
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.data = _Data()
+        data = self.data
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                while True:
+                    try:
+                        cmd = _read_command(self.rfile)
+                    except (ValueError, ConnectionError):
+                        return
+                    if not cmd:
+                        return
+                    if cmd[0].upper() == "QUIT":
+                        self.wfile.write(b"+OK\r\n")
+                        return
+                    try:
+                        res = data.run(cmd[0], cmd[1:])
+                    except _Error as e:
+                        res = e
+                    except (IndexError, ValueError):
+                        res = _Error(f"ERR wrong arguments for '{cmd[0]}'")
+                    self.wfile.write(_reply(res))
+
+        super().__init__((host, port), Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "RespServer":
+        threading.Thread(target=self.serve_forever, name="resp-stand-in", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Redis-protocol stand-in for local runs")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6390)
+    args = ap.parse_args()
+    srv = RespServer(args.host, args.port)
+    print("listening on", srv.url)
+    srv.serve_forever()
@@ -0,0 +1,110 @@
+import heapq, os, zlib
+from typing import Any, Dict, List, Optional, Tuple
+from .base import StateBackend
+
+# namespaces keyed by a whole session key ("summary:arena:42"): placed with that session
+SESSION_SCOPED = ("summary:",)
+
+def shard_of(key: str, n: int) -> int:
+    """Stable shard index for `key`: crc32 of the session id, i.e. the part after
+    the first ':' ("mp:42" and "arena:42" land on the same shard; "summary:arena:42"
+    goes with "arena:42")."""
+    while key.startswith(SESSION_SCOPED):
+        key = key.split(":", 1)[1]
+    sid = key.split(":", 1)[1] if ":" in key else key
+    return zlib.crc32(sid.encode("utf-8")) % n if n > 1 else 0
+
+def shard_paths(path: str, n: int) -> List[str]:
+    """salesbot.db -> salesbot.0-of-4.db ... salesbot.3-of-4.db (n <= 1: the file itself)."""
+    if n <= 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}.{i}-of-{n}{ext or '.db'}" for i in range(n)]
+
+
+class ShardedBackend(StateBackend):
+    """Spreads sessions over several backends by shard_of(key).
+
+    Single-key operations go to one shard, so writers on different shards never
+    share a lock or a SQLite write transaction; scans and admin queries fan out
+    and merge. Changing the shard count needs a rebalance (see shard_tool).
+    """
+
+    name = "sharded"
+
+    def __init__(self, shards: List[StateBackend]):
+        if not shards:
+            raise ValueError("at least one shard required")
+        self.shards = list(shards)
+        self.shared = any(s.shared for s in self.shards)
+        self.parallel_writes = sum(s.parallel_writes for s in self.shards)
+
+    def shard(self, key: str) -> StateBackend:
+        return self.shards[shard_of(key, len(self.shards))]
+
+    # ---- kv ----
+
+    def get(self, key: str) -> Optional[str]:
+        return self.shard(key).get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self.shard(key).set(key, value)
+
+    def delete(self, key: str) -> int:
+        return self.shard(key).delete(key)
+
+    def scan(self, prefix: str, limit: int = 100, after_key: Optional[str] = None) -> List[Tuple[str, str]]:
+        # every shard returns its first `limit` keys in order; the global page is
+        # the first `limit` of their merge, so the cursor stays a plain key
+        parts = [s.scan(prefix, limit, after_key) for s in self.shards]
+        out = []
+        for item in heapq.merge(*parts, key=lambda kv: kv[0]):
+            if len(out) >= limit:
+                break
+            out.append(item)
+        return out
+
+    # ---- turns ----
+
+    def append_turn(self, session_key: str, role: str, content: str) -> None:
+        self.shard(session_key).append_turn(session_key, role, content)
+
+    def history(self, session_key: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.shard(session_key).history(session_key, last)
+
+    def history_range(self, session_key: str, after: int, upto: int) -> List[Dict[str, Any]]:
+        return self.shard(session_key).history_range(session_key, after, upto)
+
+    def turn_count(self, session_key: str, role: Optional[str] = None) -> int:
+        return self.shard(session_key).turn_count(session_key, role)
+
+    def clear_turns(self, session_key: str) -> int:
+        return self.shard(session_key).clear_turns(session_key)
+
+    def migrate_session(self, key: str, header: str, turns: List[Dict[str, Any]]) -> None:
+        self.shard(key).migrate_session(key, header, turns)
+
+    # ---- admin SQL: runs on every shard ----
+
+    def query(self, sql: str, args: tuple = ()) -> List[tuple]:
+        rows: List[tuple] = []
+        for s in self.shards:
+            rows.extend(s.query(sql, args))
+        return rows
+
+    def execute(self, sql: str, args: tuple = ()) -> int:
+        return sum(s.execute(sql, args) for s in self.shards)
+
+    def execute_batch(self, statements: List[Tuple[str, tuple]]) -> List[int]:
+        counts = [0] * len(statements)
+        for s in self.shards:
+            for i, n in enumerate(s.execute_batch(statements)):
+                counts[i] += n
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "shards": [s.stats() for s in self.shards]}
+
+    def close(self) -> None:
+        for s in self.shards:
+            s.close()
@@ -0,0 +1,304 @@
+import sqlite3, time, threading, os, queue
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Optional
+from ..group_commit import GroupCommitter
+from .base import StateBackend, prefix_range
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS kv (
+  key TEXT PRIMARY KEY,
+  value TEXT,
+  ts REAL
+);
+CREATE INDEX IF NOT EXISTS kv_ts_idx ON kv(ts);
+CREATE TABLE IF NOT EXISTS turns (
+  session_key TEXT NOT NULL,
+  seq INTEGER NOT NULL,
+  role TEXT,
+  content TEXT,
+  ts REAL,
+  PRIMARY KEY (session_key, seq)
+) WITHOUT ROWID;
+'''
+
+class ReaderPool:
+    """Read-only connections to a WAL database; each reader sees the last committed
+    state and never waits for the writer connection or its lock."""
+
+    def __init__(self, path: str, size: int):
+        self.uri = Path(path).resolve().as_uri() + "?mode=ro"
+        self.size = max(1, int(size))
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._mu = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.in_use = 0
+
+    def acquire(self) -> sqlite3.Connection:
+        t0 = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            self._slots.acquire()
+            wait = time.perf_counter() - t0
+            with self._mu:
+                self.waited += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+        with self._mu:
+            self.acquired += 1
+            self.in_use += 1
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        except Exception:
+            self.release(None)
+            raise
+        with self._mu:
+            self._all.append(conn)
+        return conn
+
+    def release(self, conn: Optional[sqlite3.Connection]) -> None:
+        if conn is not None:
+            self._idle.put(conn)
+        with self._mu:
+            self.in_use -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._mu:
+            return {
+                "size": self.size,
+                "open": len(self._all),
+                "in_use": self.in_use,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "wait_avg_ms": round(self.wait_total / self.waited * 1000, 3) if self.waited else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+    def close(self) -> None:
+        with self._mu:
+            conns, self._all = self._all, []
+        for c in conns:
+            try:
+                c.close()
+            except Exception:
+                pass
+
+
+class SQLiteBackend(StateBackend):
+    """Local SQLite file (WAL): one writer connection plus a pool of read-only
+    connections (STATE_READ_POOL, default 4; 0 = read on the writer); the default backend."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "salesbot.db", group_commit_ms: Optional[float] = None,
+                 read_pool: Optional[int] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # only takes effect on a fresh file; enables PRAGMA incremental_vacuum
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("PRAGMA synchronous=NORMAL;")
+        self._init_db()
+        if group_commit_ms is None:
+            group_commit_ms = float(os.environ.get("STATE_GROUP_COMMIT_MS", "0"))
+        # optional group commit: writes within the window share one transaction
+        self.group_commit: Optional[GroupCommitter] = None
+        if group_commit_ms > 0:
+            self.group_commit = GroupCommitter(self._exec_batch, window=group_commit_ms / 1000.0)
+            # the committer thread stays the single SQLite writer; callers only
+            # wait on it, and enough of them must be in flight to share a batch
+            self.parallel_writes = int(os.environ.get("STATE_GROUP_COMMIT_WAITERS", "64"))
+        if read_pool is None:
+            read_pool = int(os.environ.get("STATE_READ_POOL", "4"))
+        self.readers: Optional[ReaderPool] = None
+        if read_pool > 0 and path != ":memory:":
+            self.readers = ReaderPool(path, read_pool)
+
+    def _init_db(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            for stmt in _SCHEMA.strip().split(';'):
+                s = stmt.strip()
+                if s:
+                    cur.execute(s)
+            cur.close()
+
+    def _exec(self, sql: str, args: tuple=()):
+        # simple retry for SQLITE_BUSY
+        backoff = 0.01
+        for _ in range(5):
+            try:
+                with self._lock:
+                    cur = self._conn.cursor()
+                    cur.execute(sql, args)
+                    self._conn.commit()
+                    return cur
+            except sqlite3.OperationalError as e:
+                if "database is locked" in str(e).lower():
+                    time.sleep(backoff)
+                    backoff *= 2
+                    continue
+                raise
+        raise RuntimeError("SQLite busy, retries exceeded")
+
+    def _exec_batch(self, statements: List[Tuple[str, tuple]]) -> List[int]:
+        # one transaction for the whole batch, same busy retry as _exec
+        backoff = 0.01
+        for _ in range(5):
+            try:
+                with self._lock:
+                    cur = self._conn.cursor()
+                    cur.execute("BEGIN IMMEDIATE")
+                    try:
+                        counts = []
+                        for sql, args in statements:
+                            cur.execute(sql, args)
+                            counts.append(cur.rowcount or 0)
+                        cur.execute("COMMIT")
+                    except Exception:
+                        cur.execute("ROLLBACK")
+                        raise
+                    finally:
+                        cur.close()
+                    return counts
+            except sqlite3.OperationalError as e:
+                if "database is locked" in str(e).lower():
+                    time.sleep(backoff)
+                    backoff *= 2
+                    continue
+                raise
+        raise RuntimeError("SQLite busy, retries exceeded")
+
+    def _read(self, sql: str, args: tuple=()) -> List[tuple]:
+        if self.readers is None:
+            cur = self._exec(sql, args)
+            rows = cur.fetchall()
+            cur.close()
+            return rows
+        backoff = 0.01
+        for _ in range(5):
+            conn = self.readers.acquire()
+            try:
+                return conn.execute(sql, args).fetchall()
+            except sqlite3.OperationalError as e:
+                if "database is locked" not in str(e).lower():
+                    raise
+            finally:
+                self.readers.release(conn)
+            time.sleep(backoff)
+            backoff *= 2
+        raise RuntimeError("SQLite busy, retries exceeded")
+
+    def _write(self, sql: str, args: tuple=()) -> int:
+        if self.group_commit is not None:
+            return self.group_commit.submit(sql, args).result()
+        cur = self._exec(sql, args)
+        n = cur.rowcount or 0
+        cur.close()
+        return n
+
+    # ---- raw SQL on the writer connection, for modules that keep their own tables ----
+
+    def query(self, sql: str, args: tuple=()) -> List[tuple]:
+        cur = self._exec(sql, args)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    def execute(self, sql: str, args: tuple=()) -> int:
+        return self._write(sql, args)
+
+    def execute_batch(self, statements: List[Tuple[str, tuple]]) -> List[int]:
+        return self._exec_batch(statements)
+
+    # ---- kv ----
+
+    def get(self, key: str) -> Optional[str]:
+        rows = self._read("SELECT value FROM kv WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set(self, key: str, value: str) -> None:
+        self._write("REPLACE INTO kv(key, value, ts) VALUES(?,?,?)", (key, value, time.time()))
+
+    def delete(self, key: str) -> int:
+        return self._write("DELETE FROM kv WHERE key = ?", (key,))
+
+    def scan(self, prefix: str, limit: int = 100, after_key: Optional[str] = None) -> List[Tuple[str,str]]:
+        # key >= lo AND key < hi is served by the primary-key index, unlike LIKE 'prefix%'
+        lo, hi = prefix_range(prefix)
+        sql = "SELECT key, value FROM kv WHERE key " + (">" if after_key is not None and after_key >= lo else ">=") + " ?"
+        args: tuple = (after_key if after_key is not None and after_key >= lo else lo,)
+        if hi is not None:
+            sql += " AND key < ?"
+            args += (hi,)
+        rows = self._read(sql + " ORDER BY key LIMIT ?", args + (int(limit),))
+        return [(k,v) for k,v in rows]
+
+    # ---- turns ----
+
+    def append_turn(self, session_key: str, role: str, content: str) -> None:
+        # append-only: cost per turn does not depend on session length
+        self._write(
+            "INSERT INTO turns(session_key, seq, role, content, ts) "
+            "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM turns WHERE session_key = ?",
+            (session_key, role, content, time.time(), session_key))
+
+    def history(self, session_key: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        if last is None:
+            rows = self._read("SELECT seq, role, content, ts FROM turns WHERE session_key = ? ORDER BY seq", (session_key,))
+        else:
+            rows = self._read("SELECT seq, role, content, ts FROM turns WHERE session_key = ? ORDER BY seq DESC LIMIT ?", (session_key, max(0, int(last))))[::-1]
+        return [{"seq": seq, "role": role, "content": content, "ts": ts} for seq, role, content, ts in rows]
+
+    def history_range(self, session_key: str, after: int, upto: int) -> List[Dict[str, Any]]:
+        rows = self._read("SELECT seq, role, content, ts FROM turns WHERE session_key = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                          (session_key, int(after), int(upto)))
+        return [{"seq": seq, "role": role, "content": content, "ts": ts} for seq, role, content, ts in rows]
+
+    def turn_count(self, session_key: str, role: Optional[str] = None) -> int:
+        if role is None:
+            rows = self._read("SELECT COALESCE(MAX(seq), 0) FROM turns WHERE session_key = ?", (session_key,))
+        else:
+            rows = self._read("SELECT COUNT(*) FROM turns WHERE session_key = ? AND role = ?", (session_key, role))
+        return int(rows[0][0]) if rows else 0
+
+    def clear_turns(self, session_key: str) -> int:
+        return self._write("DELETE FROM turns WHERE session_key = ?", (session_key,))
+
+    def migrate_session(self, key: str, header: str, turns: List[Dict[str, Any]]) -> None:
+        # one transaction: turns rows plus the slimmed-down header
+        ts = time.time()
+        stmts = [
+            ("INSERT OR IGNORE INTO turns(session_key, seq, role, content, ts) VALUES(?,?,?,?,?)",
+             (key, i + 1, m.get("role"), m.get("content"), ts))
+            for i, m in enumerate(turns)
+        ]
+        stmts.append(("REPLACE INTO kv(key, value, ts) VALUES(?,?,?)", (key, header, ts)))
+        self._exec_batch(stmts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "group_commit": self.group_commit.stats() if self.group_commit else None,
+            "read_pool": self.readers.stats() if self.readers else None,
+        }
+
+    def close(self):
+        if self.group_commit is not None:
+            self.group_commit.close()
+        if self.readers is not None:
+            self.readers.close()
+        try:
+            self._conn.close()
+        except Exception:
+            pass
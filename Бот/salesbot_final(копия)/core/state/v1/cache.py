@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+class SessionCache:
+    """Bounded LRU of decoded session objects with hit/miss counters."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = max(0, int(capacity))
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        if self.capacity == 0:
+            return
+        with self._lock:
+            self._put_locked(key, value)
+
+    def add(self, key: str, value: Any) -> Any:
+        # insert only if absent, so a slow load never overwrites a newer write;
+        # returns whatever the cache holds for the key afterwards
+        if self.capacity == 0:
+            return value
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+            self._put_locked(key, value)
+            return value
+
+    def _put_locked(self, key: str, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,104 @@
+import queue, threading, time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+Statement = Tuple[str, tuple]
+
+class GroupCommitter:
+    """Coalesces writes that arrive within `window` seconds into one transaction.
+
+    `execute_batch(statements)` runs all statements in a single transaction and
+    returns their rowcounts (rolling back if any statement fails). A submitter's
+    future resolves only after COMMIT, so whoever waits on it is released once the
+    write is durable. When a batch fails it is replayed one statement per
+    transaction, so only the bad write's future gets the error.
+    """
+
+    def __init__(self, execute_batch: Callable[[List[Statement]], List[int]], window: float = 0.005, max_batch: int = 256):
+        self.execute_batch = execute_batch
+        self.window = max(0.0, float(window))
+        self.max_batch = max(1, int(max_batch))
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._stopped = False
+        self.batches = 0
+        self.writes = 0
+        self.replays = 0
+        self._thread = threading.Thread(target=self._run, name="state-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, args: tuple = ()) -> Future:
+        fut: Future = Future()
+        if self._stopped:
+            fut.set_exception(RuntimeError("group committer is closed"))
+            return fut
+        self._queue.put((sql, args, fut))
+        return fut
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List[Tuple[str, tuple, Future]]) -> None:
+        try:
+            counts = self.execute_batch([(sql, args) for sql, args, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            self._replay(batch)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, _, fut), n in zip(batch, counts):
+            fut.set_result(n)
+
+    def _replay(self, batch: List[Tuple[str, tuple, Future]]) -> None:
+        # the failed transaction was rolled back; each write gets its own
+        self.replays += 1
+        for sql, args, fut in batch:
+            try:
+                n = self.execute_batch([(sql, args)])[0]
+            except Exception as e:
+                fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.writes += 1
+            fut.set_result(n)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": round(self.window * 1000, 3),
+            "batches": self.batches,
+            "writes": self.writes,
+            "replays": self.replays,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+            "pending": self.pending(),
+        }
+
+    def close(self) -> None:
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
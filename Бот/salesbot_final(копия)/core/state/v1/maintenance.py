@@ -0,0 +1,249 @@
+import os, threading, time
+from typing import Any, Dict, List, Optional
+from .store import StateStore, prefix_range
+from .backends import SQLiteBackend, ShardedBackend
+
+DAY = 86400.0
+
+# idle time (seconds since the last write, kv.ts) after which a key is dropped;
+# invoice:/payment: records have no policy and are kept forever
+DEFAULT_TTLS: Dict[str, float] = {
+    "mp:": 30 * DAY,
+    "arena:": 30 * DAY,
+    "obj:": 30 * DAY,
+    "us:": 30 * DAY,
+    "dragon:": 30 * DAY,
+    "exam:": 90 * DAY,
+    "error:": 30 * DAY,
+    "err:": 30 * DAY,
+    "invoice_tl:": 180 * DAY,
+    "summary:": 30 * DAY,
+}
+
+def load_ttls() -> Dict[str, float]:
+    """DEFAULT_TTLS overridden by STATE_TTLS, e.g. "mp:=7d,error:=12h,exam:=0" (0 disables)."""
+    return parse_ttls(os.environ.get("STATE_TTLS", ""), DEFAULT_TTLS)
+
+
+def parse_duration(val: str) -> float:
+    """Duration like "7d" / "12h" / "30m" / "45s" / bare seconds; ValueError on garbage."""
+    val = val.strip().lower()
+    mult = {"s": 1.0, "m": 60.0, "h": 3600.0, "d": DAY}.get(val[-1:], None)
+    return float(val[:-1]) * mult if mult else float(val)
+
+
+def parse_ttls(raw: str, defaults: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Comma list like "name=7d,other=12h,off=0" over `defaults` (0 removes the entry)."""
+    ttls = dict(defaults or {})
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        prefix, val = part.rsplit("=", 1)
+        try:
+            secs = parse_duration(val)
+        except ValueError:
+            continue
+        if secs > 0:
+            ttls[prefix.strip()] = secs
+        else:
+            ttls.pop(prefix.strip(), None)
+    return ttls
+
+
+class Maintenance:
+    """TTL sweeper and SQLite housekeeping for a StateStore.
+
+    Every `interval` seconds: expired keys (and their dialog turns) are deleted in
+    batches of `batch` rows, each batch its own short transaction, then the WAL is
+    checkpointed with TRUNCATE. Every `analyze_interval` seconds free pages are
+    reclaimed with incremental_vacuum and planner statistics refreshed (ANALYZE).
+    Only the SQLite backend needs this (each shard file when sharded); other
+    backends expire keys themselves.
+    """
+
+    def __init__(self, store: StateStore, ttls: Optional[Dict[str, float]] = None,
+                 interval: Optional[float] = None, analyze_interval: Optional[float] = None,
+                 batch: Optional[int] = None):
+        self.store = store
+        backend = store.backend
+        shards = backend.shards if isinstance(backend, ShardedBackend) else [backend]
+        self.dbs: List[SQLiteBackend] = [b for b in shards if isinstance(b, SQLiteBackend)]
+        self.ttls = ttls if ttls is not None else load_ttls()
+        self.interval = interval if interval is not None else float(os.environ.get("STATE_SWEEP_INTERVAL", "600"))
+        self.analyze_interval = analyze_interval if analyze_interval is not None else float(os.environ.get("STATE_ANALYZE_INTERVAL", str(DAY)))
+        self.batch = batch if batch is not None else int(os.environ.get("STATE_SWEEP_BATCH", "500"))
+        self.last_sweep: Optional[float] = None
+        self.last_checkpoint: Optional[float] = None
+        self.last_vacuum: Optional[float] = None
+        self.last_analyze: Optional[float] = None
+        self.last_deleted: Dict[str, int] = {}
+        self.total_deleted = 0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- sweeping ----
+
+    def sweep_prefix(self, prefix: str, ttl: float, now: Optional[float] = None) -> int:
+        return sum(self._sweep_db(db, prefix, ttl, now) for db in self.dbs)
+
+    def _sweep_db(self, db: SQLiteBackend, prefix: str, ttl: float, now: Optional[float]) -> int:
+        cutoff = (now or time.time()) - ttl
+        lo, hi = prefix_range(prefix)
+        where = "key >= ? AND ts < ?" + (" AND key < ?" if hi is not None else "")
+        args = (lo, cutoff) + ((hi,) if hi is not None else ())
+        deleted = 0
+        while not self._stop.is_set():
+            # candidates from a reader; the delete re-checks ts, so a key touched since is kept
+            keys = [r[0] for r in db._read(f"SELECT key FROM kv WHERE {where} LIMIT ?", args + (self.batch,))]
+            if not keys:
+                break
+            stmts = []
+            for k in keys:
+                stmts.append(("DELETE FROM kv WHERE key = ? AND ts < ?", (k, cutoff)))
+                # turns go only with their kv row: a session written to since keeps its history
+                stmts.append(("DELETE FROM turns WHERE session_key = ? AND NOT EXISTS (SELECT 1 FROM kv WHERE key = ?)", (k, k)))
+            counts = db._exec_batch(stmts)
+            for k in keys:
+                self.store.cache.pop(k)
+            deleted += sum(counts[0::2])
+            if len(keys) < self.batch:
+                break
+            # let foreground writers in between batches
+            time.sleep(0.01)
+        return deleted
+
+    def sweep(self) -> Dict[str, int]:
+        now = time.time()
+        res = {p: self.sweep_prefix(p, ttl, now) for p, ttl in self.ttls.items()}
+        self.last_deleted = res
+        self.total_deleted += sum(res.values())
+        self.last_sweep = time.time()
+        return res
+
+    # ---- housekeeping ----
+
+    def checkpoint(self) -> List[Any]:
+        # [busy, log, checkpointed] summed over shard files
+        total = [0, 0, 0]
+        for db in self.dbs:
+            cur = db._exec("PRAGMA wal_checkpoint(TRUNCATE)")
+            row = cur.fetchone()
+            cur.close()
+            if row:
+                total = [a + b for a, b in zip(total, row)]
+        self.last_checkpoint = time.time()
+        return total
+
+    def vacuum(self, pages: int = 1000, convert: bool = False) -> bool:
+        done = [self._vacuum_db(db, pages, convert) for db in self.dbs]
+        if any(done):
+            self.last_vacuum = time.time()
+        return all(done)
+
+    def _vacuum_db(self, db: SQLiteBackend, pages: int, convert: bool) -> bool:
+        # incremental_vacuum only works on files in auto_vacuum=INCREMENTAL mode;
+        # older files need one full VACUUM to switch (convert=True, manual runs only)
+        if self._pragma(db, "auto_vacuum") != 2:
+            if not convert:
+                return False
+            db._exec("PRAGMA auto_vacuum=INCREMENTAL").close()
+            db._exec("VACUUM").close()
+            return True
+        cur = db._exec(f"PRAGMA incremental_vacuum({int(pages)})")
+        cur.fetchall()
+        cur.close()
+        return True
+
+    def analyze(self) -> None:
+        for db in self.dbs:
+            db._exec("ANALYZE").close()
+        self.last_analyze = time.time()
+
+    def run_once(self, full: bool = False) -> Dict[str, Any]:
+        if not self.dbs:
+            return {"skipped": self.store.backend.name}
+        res: Dict[str, Any] = {"deleted": self.sweep(), "checkpoint": self.checkpoint()}
+        due = self.last_analyze is None or time.time() - self.last_analyze >= self.analyze_interval
+        if full or due:
+            res["vacuum"] = self.vacuum(convert=full)
+            self.analyze()
+        return res
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+
+    def start(self) -> "Maintenance":
+        if not self.dbs:
+            return self
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="state-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    # ---- reporting ----
+
+    def _pragma(self, db: SQLiteBackend, name: str) -> Any:
+        rows = db._read(f"PRAGMA {name}")
+        return rows[0][0] if rows else None
+
+    def report(self) -> Dict[str, Any]:
+        if not self.dbs:
+            return {"backend": self.store.backend.name, "ttls": dict(self.ttls), "running": False}
+        size = lambda p: os.path.getsize(p) if os.path.exists(p) else 0
+        prefixes: Dict[str, int] = {}
+        turns = free = 0
+        # full scans: through the reader pool, not under the writer lock
+        for db in self.dbs:
+            for p, n in db._read(
+                    "SELECT CASE WHEN instr(key, ':') > 0 THEN substr(key, 1, instr(key, ':')) ELSE key END AS prefix, "
+                    "COUNT(*) FROM kv GROUP BY prefix ORDER BY prefix"):
+                prefixes[p] = prefixes.get(p, 0) + n
+            turns += db._read("SELECT COUNT(*) FROM turns")[0][0]
+            free += (self._pragma(db, "freelist_count") or 0) * (self._pragma(db, "page_size") or 0)
+        report = {
+            "path": self.store.path,
+            "db_bytes": sum(size(db.path) for db in self.dbs),
+            "wal_bytes": sum(size(db.path + "-wal") for db in self.dbs),
+            "free_bytes": free,
+            "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(self._pragma(self.dbs[0], "auto_vacuum"), "unknown"),
+            "rows_by_prefix": dict(sorted(prefixes.items())),
+            "turns": turns,
+            "ttls": dict(self.ttls),
+            "last_sweep": self.last_sweep,
+            "last_checkpoint": self.last_checkpoint,
+            "last_vacuum": self.last_vacuum,
+            "last_analyze": self.last_analyze,
+            "last_deleted": self.last_deleted,
+            "total_deleted": self.total_deleted,
+            "last_error": self.last_error,
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+        if len(self.dbs) > 1:
+            report["shards"] = [db.path for db in self.dbs]
+        return report
+
+
+_SHARED: Dict[str, Maintenance] = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_maintenance(store: StateStore) -> Maintenance:
+    """Process-wide Maintenance for `store` (not started)."""
+    key = os.path.abspath(store.path)
+    with _SHARED_LOCK:
+        m = _SHARED.get(key)
+        if m is None:
+            m = Maintenance(store)
+            _SHARED[key] = m
+    return m
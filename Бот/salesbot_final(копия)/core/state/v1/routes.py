@@ -0,0 +1,33 @@
+from typing import Optional
+from fastapi import APIRouter
+from .store import get_store
+from .maintenance import get_maintenance
+
+router = APIRouter(prefix="/state/v1", tags=["state"])
+
+# sync handlers: FastAPI runs them in its threadpool, off the event loop
+
+@router.get("/health")
+def health():
+    return {"ok": True, "version": "v1"}
+
+@router.get("/stats")
+def stats():
+    store = get_store()
+    report = get_maintenance(store).report()
+    report["backend"] = store.backend_stats()
+    report["cache"] = store.cache_stats()
+    report["group_commit"] = store.group_commit.stats() if store.group_commit else None
+    return {"ok": True, **report}
+
+@router.post("/maintenance/run")
+def run_maintenance(full: bool = False):
+    return {"ok": True, **get_maintenance(get_store()).run_once(full=full)}
+
+@router.get("/keys")
+def keys(prefix: str = "", after: Optional[str] = None, limit: int = 100):
+    """Paged key listing: pass `next` from the previous response as `after`.
+    Keys only: the endpoint is unauthenticated and values hold invoices/payments."""
+    limit = max(1, min(limit, 1000))
+    items, cursor = get_store().scan_page(prefix, after_key=after, limit=limit)
+    return {"ok": True, "items": [{"key": k} for k, _ in items], "next": cursor}
@@ -0,0 +1,107 @@
+"""Shard layout tool for the SQLite state backend (run while the bot is stopped).
+
+    python -m core.state.v1.shard_tool status --shards 4
+    python -m core.state.v1.shard_tool rebalance --from 1 --to 4 [--delete-source]
+
+rebalance copies kv rows (keeping their ts, so TTLs are unaffected) and dialog
+turns from the `--from` layout into the `--to` layout, routing every session by
+shard_of(); it is idempotent and can be re-run after an interruption. Then start
+the bot with STATE_SHARDS set to the new count. Other tables (errors) stay put.
+"""
+import argparse, json, os
+from typing import Any, Dict, List
+from .backends import SQLiteBackend, shard_of, shard_paths
+
+def _open(paths: List[str]) -> List[SQLiteBackend]:
+    return [SQLiteBackend(p, group_commit_ms=0) for p in paths]
+
+def _count(db: SQLiteBackend, table: str) -> int:
+    return db.query(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+def status(path: str, shards: int) -> Dict[str, Any]:
+    out = []
+    for i, p in enumerate(shard_paths(path, shards)):
+        if not os.path.exists(p):
+            out.append({"path": p, "missing": True})
+            continue
+        db = _open([p])[0]
+        misplaced = 0
+        after = ""
+        while True:
+            keys = [r[0] for r in db.query("SELECT key FROM kv WHERE key > ? ORDER BY key LIMIT 1000", (after,))]
+            if not keys:
+                break
+            misplaced += sum(1 for k in keys if shard_of(k, shards) != i)
+            after = keys[-1]
+        out.append({"path": db.path, "bytes": os.path.getsize(db.path), "kv": _count(db, "kv"),
+                    "turns": _count(db, "turns"), "misplaced": misplaced})
+        db.close()
+    return {"shards": out}
+
+def rebalance(path: str, src: int, dst: int, batch: int = 1000, delete_source: bool = False) -> Dict[str, Any]:
+    src_paths, dst_paths = shard_paths(path, src), shard_paths(path, dst)
+    if src_paths == dst_paths:
+        return {"moved_kv": 0, "moved_turns": 0, "note": "same layout"}
+    sources, targets = _open(src_paths), _open(dst_paths)
+    moved_kv = moved_turns = 0
+    for s in sources:
+        after = ""
+        while True:
+            rows = s.query("SELECT key, value, ts FROM kv WHERE key > ? ORDER BY key LIMIT ?", (after, batch))
+            if not rows:
+                break
+            per: Dict[int, list] = {}
+            for k, v, ts in rows:
+                per.setdefault(shard_of(k, dst), []).append(("REPLACE INTO kv(key, value, ts) VALUES(?,?,?)", (k, v, ts)))
+            for i, stmts in per.items():
+                targets[i].execute_batch(stmts)
+            moved_kv += len(rows)
+            after = rows[-1][0]
+        last = ("", 0)
+        while True:
+            rows = s.query("SELECT session_key, seq, role, content, ts FROM turns WHERE (session_key, seq) > (?, ?) "
+                           "ORDER BY session_key, seq LIMIT ?", last + (batch,))
+            if not rows:
+                break
+            per = {}
+            for row in rows:
+                per.setdefault(shard_of(row[0], dst), []).append(
+                    ("REPLACE INTO turns(session_key, seq, role, content, ts) VALUES(?,?,?,?,?)", row))
+            for i, stmts in per.items():
+                targets[i].execute_batch(stmts)
+            moved_turns += len(rows)
+            last = (rows[-1][0], rows[-1][1])
+    res: Dict[str, Any] = {
+        "moved_kv": moved_kv,
+        "moved_turns": moved_turns,
+        "targets": [{"path": t.path, "kv": _count(t, "kv"), "turns": _count(t, "turns")} for t in targets],
+    }
+    if delete_source:
+        # only the rows: the source file may also hold other tables (errors)
+        for s in sources:
+            s.execute_batch([("DELETE FROM kv", ()), ("DELETE FROM turns", ())])
+        res["source_cleared"] = src_paths
+    for db in sources + targets:
+        db.close()
+    return res
+
+def main():
+    ap = argparse.ArgumentParser(description="SQLite state shards: status and rebalance")
+    ap.add_argument("command", choices=["status", "rebalance"])
+    ap.add_argument("--path", default="salesbot.db")
+    ap.add_argument("--shards", type=int, default=int(os.environ.get("STATE_SHARDS", "1")))
+    ap.add_argument("--from", dest="src", type=int, default=1)
+    ap.add_argument("--to", dest="dst", type=int, default=None)
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--delete-source", action="store_true")
+    args = ap.parse_args()
+    if args.command == "status":
+        res = status(args.path, args.shards)
+    else:
+        if args.dst is None:
+            ap.error("rebalance needs --to")
+        res = rebalance(args.path, args.src, args.dst, args.batch, args.delete_source)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
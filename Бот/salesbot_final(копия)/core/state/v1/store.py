@@ -1,76 +1,136 @@
+import threading, json, os
+from typing import Any, Dict, Iterator, List, Tuple, Optional
+from .cache import SessionCache
+from .group_commit import GroupCommitter
+from .backends import StateBackend, make_backend, prefix_range
 
-import sqlite3, time, threading
-from typing import List, Tuple, Optional
+class StateStore:
+    """Session state on a pluggable StateBackend plus an in-process LRU of decoded sessions.
 
-_SCHEMA = '''
-CREATE TABLE IF NOT EXISTS kv (
-  key TEXT PRIMARY KEY,
-  value TEXT,
-  ts REAL
-);
-CREATE INDEX IF NOT EXISTS kv_ts_idx ON kv(ts);
-'''
+    The backend comes from STATE_BACKEND (see backends.make_backend) unless passed
+    explicitly. With a backend shared between processes (redis) the session cache
+    defaults to off, because another worker may have written the session since.
+    """
 
-class StateStore:
-    def __init__(self, path: str = "salesbot.db"):
+    def __init__(self, path: str = "salesbot.db", cache_size: Optional[int] = None,
+                 group_commit_ms: Optional[float] = None, backend: Optional[StateBackend] = None):
         self.path = path
-        self._lock = threading.RLock()
-        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
-        self._conn.execute("PRAGMA journal_mode=WAL;")
-        self._conn.execute("PRAGMA synchronous=NORMAL;")
-        self._init_db()
-
-    def _init_db(self):
-        with self._lock:
-            cur = self._conn.cursor()
-            for stmt in _SCHEMA.strip().split(';'):
-                s = stmt.strip()
-                if s:
-                    cur.execute(s)
-            cur.close()
-
-    def _exec(self, sql: str, args: tuple=()):
-        # simple retry for SQLITE_BUSY
-        backoff = 0.01
-        for _ in range(5):
-            try:
-                with self._lock:
-                    cur = self._conn.cursor()
-                    cur.execute(sql, args)
-                    self._conn.commit()
-                    return cur
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    time.sleep(backoff)
-                    backoff *= 2
-                    continue
-                raise
-        raise RuntimeError("SQLite busy, retries exceeded")
+        self.backend = backend if backend is not None else make_backend(path, group_commit_ms)
+        if cache_size is None:
+            default = "0" if self.backend.shared else "1024"
+            cache_size = int(os.environ.get("STATE_CACHE_SIZE", default))
+        self.cache = SessionCache(cache_size)
+
+    @property
+    def group_commit(self) -> Optional[GroupCommitter]:
+        return getattr(self.backend, "group_commit", None)
+
+    # ---- raw SQL on the shared connection, for modules that keep their own tables ----
+
+    def query(self, sql: str, args: tuple=()) -> List[tuple]:
+        return self.backend.query(sql, args)
+
+    def execute(self, sql: str, args: tuple=()) -> int:
+        return self.backend.execute(sql, args)
+
+    def execute_batch(self, statements: List[Tuple[str, tuple]]) -> List[int]:
+        return self.backend.execute_batch(statements)
 
     def get(self, key: str) -> Optional[str]:
-        cur = self._exec("SELECT value FROM kv WHERE key = ?", (key,))
-        row = cur.fetchone()
-        cur.close()
-        return row[0] if row else None
+        return self.backend.get(key)
 
     def set(self, key: str, value: str) -> None:
-        ts = time.time()
-        self._exec("REPLACE INTO kv(key, value, ts) VALUES(?,?,?)", (key, value, ts))
+        self.backend.set(key, value)
+        self.cache.pop(key)
+
+    def get_json(self, key: str) -> Any:
+        # decoded object is shared with the cache: mutate it only to save it back via set_json
+        obj = self.cache.get(key)
+        if obj is not None:
+            return obj
+        return self._load_json(key)
+
+    def _load_json(self, key: str) -> Any:
+        raw = self.get(key)
+        if raw is None:
+            return None
+        return self.cache.add(key, json.loads(raw))
+
+    def set_json(self, key: str, obj: Any) -> None:
+        # write-through: the cache is only updated once the row is stored
+        self.set(key, json.dumps(obj, ensure_ascii=False))
+        self.cache.put(key, obj)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
 
     def delete(self, key: str) -> int:
-        cur = self._exec("DELETE FROM kv WHERE key = ?", (key,))
-        n = cur.rowcount or 0
-        cur.close()
-        return n
+        self.cache.pop(key)
+        return self.backend.delete(key)
+
+    def get_session(self, key: str) -> Any:
+        # session header blob; legacy blobs that still carry the whole dialog
+        # inline are split once: turns go to the turns table, the rest stays in kv
+        obj = self.get_json(key)
+        if isinstance(obj, dict) and isinstance(obj.get("history"), list):
+            header = {k: v for k, v in obj.items() if k != "history"}
+            turns = [m for m in obj["history"] if isinstance(m, dict)]
+            self.backend.migrate_session(key, json.dumps(header, ensure_ascii=False), turns)
+            self.cache.put(key, header)
+            obj = header
+        return obj
 
-    def scan(self, prefix: str, limit: int = 100) -> List[Tuple[str,str]]:
-        cur = self._exec("SELECT key, value FROM kv WHERE key LIKE ? ORDER BY key LIMIT ?", (prefix + "%", limit))
-        rows = cur.fetchall()
-        cur.close()
-        return [(k,v) for k,v in rows]
+    def append_turn(self, session_key: str, role: str, content: str) -> None:
+        # append-only: cost per turn does not depend on session length
+        self.backend.append_turn(session_key, role, content)
+
+    def history(self, session_key: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.backend.history(session_key, last)
+
+    def history_range(self, session_key: str, after: int, upto: int) -> List[Dict[str, Any]]:
+        return self.backend.history_range(session_key, after, upto)
+
+    def turn_count(self, session_key: str, role: Optional[str] = None) -> int:
+        return self.backend.turn_count(session_key, role)
+
+    def clear_turns(self, session_key: str) -> int:
+        return self.backend.clear_turns(session_key)
+
+    def scan(self, prefix: str, limit: int = 100, after_key: Optional[str] = None) -> List[Tuple[str,str]]:
+        return self.backend.scan(prefix, int(limit), after_key)
+
+    def scan_page(self, prefix: str, after_key: Optional[str] = None, limit: int = 100) -> Tuple[List[Tuple[str,str]], Optional[str]]:
+        """One page of `prefix` keys after `after_key`, plus the cursor for the next page (None at the end)."""
+        items = self.scan(prefix, limit=limit, after_key=after_key)
+        cursor = items[-1][0] if limit > 0 and len(items) == limit else None
+        return items, cursor
+
+    def iter_scan(self, prefix: str, batch: int = 500, after_key: Optional[str] = None) -> Iterator[Tuple[str,str]]:
+        """Stream every `prefix` key page by page; memory stays bounded by `batch`."""
+        while True:
+            items, after_key = self.scan_page(prefix, after_key=after_key, limit=batch)
+            yield from items
+            if after_key is None:
+                return
+
+    def backend_stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
 
     def close(self):
-        try:
-            self._conn.close()
-        except Exception:
-            pass
+        self.backend.close()
+
+
+_SHARED: Dict[str, StateStore] = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_store(path: str = "salesbot.db") -> StateStore:
+    """Process-wide StateStore for `path` (one backend connection, one session cache)."""
+    key = os.path.abspath(path)
+    store = _SHARED.get(key)
+    if store is None:
+        with _SHARED_LOCK:
+            store = _SHARED.get(key)
+            if store is None:
+                store = StateStore(path)
+                _SHARED[key] = store
+    return store
@@ -1,2 +1,2 @@
-from .pipeline import VoicePipeline
-__all__=['VoicePipeline']
+from .pipeline import VoicePipeline, get_voice_pipeline
+__all__=['VoicePipeline','get_voice_pipeline']
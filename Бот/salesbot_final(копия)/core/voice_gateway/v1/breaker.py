@@ -0,0 +1,191 @@
+"""
+Circuit breaker для LLM API и задержки между повторами.
+
+  closed    — запросы идут; по последним LLM_BREAKER_WINDOW (20) исходам считается доля ошибок
+  open      — доля ошибок ≥ LLM_BREAKER_ERROR_RATE (0.5) при минимум LLM_BREAKER_MIN_CALLS (5):
+              запросы сразу уходят в локальный фоллбек, без таймаутов и повторов
+  half_open — через LLM_BREAKER_OPEN_SECS (15) пропускается LLM_BREAKER_PROBES (1) пробный запрос;
+              успех закрывает, ошибка снова открывает с удвоенной паузой (до LLM_BREAKER_OPEN_MAX, 120)
+
+Ошибка — исключение (таймаут, обрыв), HTTP 5xx или неразборчивый ответ; 429 и очередь
+ограничителя сюда не считаются (это limiter.py), прочие 4xx — тоже: это ошибка
+запроса, её не повторяют.
+Breaker свой у каждого endpoint'а (router.py): один деградировавший не отрезает
+здоровых. get_breaker() — группа: state "closed", пока закрыт хоть один; фоллбек
+без запроса — когда открыты все.
+Повторы: full jitter, random(0, min(LLM_RETRY_CAP, LLM_RETRY_BASE × 2^n)).
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, window: Optional[int] = None, error_rate: Optional[float] = None,
+                 min_calls: Optional[int] = None, open_secs: Optional[float] = None,
+                 probes: Optional[int] = None) -> None:
+        env = os.environ.get
+        self.window = int(window if window is not None else env("LLM_BREAKER_WINDOW", "20"))
+        self.error_rate = float(error_rate if error_rate is not None else env("LLM_BREAKER_ERROR_RATE", "0.5"))
+        self.min_calls = int(min_calls if min_calls is not None else env("LLM_BREAKER_MIN_CALLS", "5"))
+        self.open_secs = float(open_secs if open_secs is not None else env("LLM_BREAKER_OPEN_SECS", "15"))
+        self.open_max = float(env("LLM_BREAKER_OPEN_MAX", "120"))
+        self.max_probes = int(probes if probes is not None else env("LLM_BREAKER_PROBES", "1"))
+        self.retry_base = float(env("LLM_RETRY_BASE", "0.2"))
+        self.retry_cap = float(env("LLM_RETRY_CAP", "2.0"))
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=max(1, self.window))
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._cooldown = self.open_secs
+        self._probes = 0
+        self.opens = 0
+        self.short_circuited = 0
+        self.retries = 0
+        self.retries_429 = 0
+        self.last_error: Optional[str] = None
+
+    def _open_locked(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._probes = 0
+        self.opens += 1
+
+    def available(self) -> bool:
+        """Пропустит ли allow() запрос сейчас; ничего не меняет (для выбора endpoint'а)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= self._cooldown
+            return self._probes < self.max_probes
+
+    def allow(self) -> bool:
+        """Можно ли слать запрос. Каждый allow() == True должен закончиться record()."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self._cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and self._probes < self.max_probes:
+                self._probes += 1
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, ok: Optional[bool], error: Optional[str] = None) -> None:
+        """ok=None — исход не про здоровье API (429, очередь, отмена): слот пробы просто освобождается."""
+        with self._lock:
+            if error:
+                self.last_error = error[:200]
+            if self.state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if ok is True:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    self._cooldown = self.open_secs
+                elif ok is False:
+                    self._cooldown = min(self.open_max, self._cooldown * 2)
+                    self._open_locked(time.monotonic())
+                return
+            if ok is None or self.state != CLOSED:
+                return
+            self._outcomes.append(ok)
+            n = len(self._outcomes)
+            if n >= self.min_calls and self._outcomes.count(False) / n >= self.error_rate:
+                self._open_locked(time.monotonic())
+
+    def retry_delay(self, attempt: int, throttled: bool = False) -> float:
+        """Пауза перед повтором номер `attempt` (1, 2, ...); заодно считает повторы.
+        После 429 паузу держит ограничитель — здесь 0."""
+        with self._lock:
+            if throttled:
+                self.retries_429 += 1
+            else:
+                self.retries += 1
+        if throttled:
+            return 0.0
+        return random.uniform(0, min(self.retry_cap, self.retry_base * (2 ** max(0, attempt - 1))))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = len(self._outcomes)
+            out: Dict[str, Any] = {
+                "state": self.state,
+                "error_rate": round(self._outcomes.count(False) / n, 3) if n else 0.0,
+                "window": n,
+                "opens": self.opens,
+                "short_circuited": self.short_circuited,
+                "retries": self.retries,
+                "retries_429": self.retries_429,
+                "last_error": self.last_error,
+            }
+            if self.state != CLOSED:
+                out["retry_in_s"] = round(max(0.0, self._opened_at + self._cooldown - time.monotonic()), 1)
+            return out
+
+
+class BreakerGroup:
+    """Breaker'ы endpoint'ов по имени + общие повторы; состояние — лучшее из endpoint'ов."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._retries = CircuitBreaker()    # только retry_delay и счётчики повторов
+        self.short_circuited = 0            # запросы сразу в фоллбек: открыты все
+
+    def endpoint(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            br = self._breakers.get(name)
+            if br is None:
+                br = self._breakers[name] = CircuitBreaker()
+            return br
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            states = [b.state for b in self._breakers.values()]
+        if not states or CLOSED in states:
+            return CLOSED
+        return HALF_OPEN if HALF_OPEN in states else OPEN
+
+    def retry_delay(self, attempt: int, throttled: bool = False) -> float:
+        return self._retries.retry_delay(attempt, throttled)
+
+    def short_circuit(self) -> None:
+        with self._lock:
+            self.short_circuited += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            eps = {name: b.stats() for name, b in self._breakers.items()}
+        retries = self._retries.stats()
+        errors = [s["last_error"] for s in eps.values() if s["last_error"]]
+        return {
+            "state": self.state,
+            "opens": sum(s["opens"] for s in eps.values()),
+            "short_circuited": self.short_circuited,
+            "retries": retries["retries"],
+            "retries_429": retries["retries_429"],
+            "last_error": errors[-1] if errors else None,
+            "endpoints": eps,
+        }
+
+
+_BREAKER: Optional[BreakerGroup] = None
+_BREAKER_LOCK = threading.Lock()
+
+
+def get_breaker() -> BreakerGroup:
+    global _BREAKER
+    if _BREAKER is None:
+        with _BREAKER_LOCK:
+            if _BREAKER is None:
+                _BREAKER = BreakerGroup()
+    return _BREAKER
@@ -0,0 +1,245 @@
+"""
+Контекст диалога для промптов с бюджетом токенов.
+
+  msg = await build_session_context(self.store, self.sid, system, self.llm)
+
+В промпт попадают system, затем резюме старых реплик (если есть), затем
+последние реплики, сколько влезает в LLM_CONTEXT_TOKENS (1500). Реплики,
+которые не влезли, сворачиваются в резюме (LLM_CONTEXT_SUMMARY_TOKENS, 300):
+оно хранится в ключе "summary:<sid>" и обновляется в фоне, когда
+накопилось LLM_CONTEXT_SUMMARY_EVERY (6) новых выпавших реплик. Без LLM
+(нет ключа / breaker открыт) резюме собирается из обрывков реплик.
+Токены считаются локальной оценкой, без токенайзера.
+
+Под context cache провайдера начало промпта держится стабильным: реплики
+выпадают из окна блоками по LLM_CONTEXT_DROP_BLOCK (6), а не по одной, а
+переменное (tail, см. prompts.py) ставится перед последней репликой.
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .prompts import Prompt, with_tail
+
+_MSG_OVERHEAD = 4   # служебные токены на сообщение в chat-формате
+
+_SUMMARY_SYSTEM = (
+    "Ты ведёшь краткое резюме тренировочного диалога продаж. Обнови резюме с учётом новых реплик: "
+    "кто клиент, что уже обсудили, возражения, договорённости, тон. Только факты, без оценок, "
+    "не длиннее {words} слов."
+)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Грубая оценка для BPE-токенайзеров: ~4 символа ASCII или ~2.5 символа кириллицы на токен."""
+    if not text:
+        return 0
+    n = len(text)
+    extra = len(text.encode("utf-8")) - n     # ≈ число не-ASCII символов
+    return int((n - extra) / 4 + extra / 2.5) + 1
+
+
+def message_tokens(m: Dict[str, Any]) -> int:
+    return estimate_tokens(m.get("content")) + _MSG_OVERHEAD
+
+
+def pack_turns(turns: List[Dict[str, Any]], budget: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Самые свежие реплики в пределах budget → (влезли, выпали); порядок сохраняется.
+    Последняя реплика (текущий вопрос) берётся всегда, даже если одна превышает бюджет."""
+    used = 0
+    start = len(turns)
+    for i in range(len(turns) - 1, -1, -1):
+        t = message_tokens(turns[i])
+        if used + t > budget and i < len(turns) - 1:
+            break
+        used += t
+        start = i
+    return turns[start:], turns[:start]
+
+
+def _as_messages(turns: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    return [{"role": t.get("role") or "user", "content": t.get("content") or ""} for t in turns]
+
+
+def _trim_tokens(text: str, tokens: int) -> str:
+    if estimate_tokens(text) <= tokens:
+        return text
+    # хвост важнее: в нём последние события
+    keep = max(1, int(len(text) * tokens / max(1, estimate_tokens(text))))
+    return "…" + text[-keep:]
+
+
+async def _same_turn(store: Any, sid: str, turn: Dict[str, Any]) -> bool:
+    now = await store.history_range(sid, turn["seq"] - 1, turn["seq"])
+    return bool(now) and now[0].get("ts") == turn.get("ts") and now[0].get("content") == turn.get("content")
+
+
+class ContextBuilder:
+    def __init__(self, budget: Optional[int] = None, summary_tokens: Optional[int] = None,
+                 summarize_every: Optional[int] = None, max_turns: Optional[int] = None) -> None:
+        env = os.environ.get
+        self.budget = int(budget if budget is not None else env("LLM_CONTEXT_TOKENS", "1500"))
+        self.summary_tokens = int(summary_tokens if summary_tokens is not None else env("LLM_CONTEXT_SUMMARY_TOKENS", "300"))
+        self.summarize_every = int(summarize_every if summarize_every is not None else env("LLM_CONTEXT_SUMMARY_EVERY", "6"))
+        # сколько последних реплик вообще читать из хранилища для упаковки
+        self.max_turns = int(max_turns if max_turns is not None else env("LLM_CONTEXT_MAX_TURNS", "60"))
+        # окно сдвигается только на границах блоков seq — префикс промпта не меняется каждый ход
+        self.drop_block = max(1, int(env("LLM_CONTEXT_DROP_BLOCK", "6")))
+        self._refreshing: Dict[str, "asyncio.Task[Any]"] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.dropped_turns = 0
+        self.summaries = 0
+
+    # ---- сборка ----
+
+    def _align(self, turns: List[Dict[str, Any]], start: int) -> int:
+        if not start or self.drop_block == 1:
+            return start
+        for i in range(start, len(turns) - 1):
+            if (turns[i].get("seq", i + 1) - 1) % self.drop_block == 0:
+                return i
+        return len(turns) - 1
+
+    def build(self, system: str, turns: List[Dict[str, Any]], summary: Optional[str] = None,
+              tail: Optional[str] = None) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """[system, резюме?, ...последние реплики] в пределах бюджета → (messages, выпавшие реплики).
+        tail — переменная системная реплика перед последней репликой."""
+        head = [{"role": "system", "content": system}]
+        if summary:
+            head.append({"role": "system", "content": "Ранее в диалоге: " + summary})
+        left = self.budget - sum(message_tokens(m) for m in head) - (estimate_tokens(tail) + _MSG_OVERHEAD if tail else 0)
+        kept, dropped = pack_turns(turns, max(0, left))
+        start = self._align(turns, len(dropped))
+        kept, dropped = turns[start:], turns[:start]
+        self.builds += 1
+        self.dropped_turns += len(dropped)
+        return with_tail(head + _as_messages(kept), tail), dropped
+
+    # ---- резюме ----
+
+    def _summary_messages(self, summary: Optional[str], turns: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        lines = "\n".join(f"{t.get('role')}: {t.get('content')}" for t in turns)
+        body = (f"Текущее резюме: {summary}\n\n" if summary else "") + "Новые реплики:\n" + lines
+        return Prompt([
+            {"role": "system", "content": _SUMMARY_SYSTEM.format(words=max(20, int(self.summary_tokens / 2)))},
+            {"role": "user", "content": _trim_tokens(body, self.budget)},
+        ], "context.summary")
+
+    def _local_summary(self, summary: Optional[str], turns: List[Dict[str, Any]]) -> str:
+        parts = [summary] if summary else []
+        parts += [f"{t.get('role')}: {(t.get('content') or '')[:80]}" for t in turns]
+        return _trim_tokens(" | ".join(parts), self.summary_tokens)
+
+    @staticmethod
+    def _llm_ready(llm: Any) -> bool:
+        if llm is None or not getattr(llm, "api_key", None):
+            return False
+        breaker = getattr(llm, "breaker", None)
+        return breaker is None or breaker.state == "closed"
+
+    def summarize(self, llm: Any, summary: Optional[str], turns: List[Dict[str, Any]]) -> str:
+        self.summaries += 1
+        if not self._llm_ready(llm):
+            return self._local_summary(summary, turns)
+        text = llm.chat(self._summary_messages(summary, turns), priority="background")
+        return _trim_tokens((text or "").strip(), self.summary_tokens) or self._local_summary(summary, turns)
+
+    async def asummarize(self, llm: Any, summary: Optional[str], turns: List[Dict[str, Any]]) -> str:
+        self.summaries += 1
+        if not self._llm_ready(llm):
+            return self._local_summary(summary, turns)
+        text = await llm.achat(self._summary_messages(summary, turns), priority="background")
+        return _trim_tokens((text or "").strip(), self.summary_tokens) or self._local_summary(summary, turns)
+
+    # ---- сессии движков (AsyncStateStore + turns) ----
+
+    async def _refresh(self, store: Any, sid: str, llm: Any, upto: int) -> None:
+        key = summary_key(sid)
+        cur = await store.get_json(key) or {}
+        done = int(cur.get("upto", 0))
+        if upto <= done:
+            return
+        turns = await store.history_range(sid, done, upto)
+        if not turns:
+            return
+        text = await self.asummarize(llm, cur.get("text"), turns)
+        # пока ждали LLM, сессию могли сбросить (clear_turns + reset_session_context):
+        # пишем, только если резюме то же и последняя свёрнутая реплика на месте
+        last = turns[-1]
+        if not await _same_turn(store, sid, last) or int((await store.get_json(key) or {}).get("upto", 0)) != done:
+            return
+        await store.set_json(key, {"upto": last["seq"], "text": text})
+        if not await _same_turn(store, sid, last):
+            # сброс успел проскочить между проверкой и записью
+            await store.delete(key)
+
+    def _schedule(self, store: Any, sid: str, llm: Any, upto: int) -> None:
+        with self._lock:
+            task = self._refreshing.get(sid)
+            if task is not None and not task.done():
+                return
+            task = asyncio.get_running_loop().create_task(self._refresh(store, sid, llm, upto))
+            self._refreshing[sid] = task
+        task.add_done_callback(lambda t: self._refreshing.pop(sid, None) if self._refreshing.get(sid) is t else None)
+
+    async def session_context(self, store: Any, sid: str, system: str, llm: Any = None,
+                              site: Optional[str] = None, tail: Optional[str] = None) -> Prompt:
+        turns = await store.history(sid, self.max_turns)
+        summary = await store.get_json(summary_key(sid)) or {}
+        upto = int(summary.get("upto", 0))
+        # реплики, уже вошедшие в резюме, второй раз не кладём
+        turns = [t for t in turns if t["seq"] > upto]
+        msgs, dropped = self.build(system, turns, summary.get("text"), tail)
+        # не в промпте и не в резюме: выпавшие по бюджету и всё, что старше окна max_turns
+        gap = dropped[-1]["seq"] if dropped else (turns[0]["seq"] - 1 if turns else upto)
+        if gap - upto >= self.summarize_every:
+            # резюме догоняет в фоне, текущий ответ его не ждёт
+            self._schedule(store, sid, llm, gap)
+        return Prompt(msgs, site)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_tokens": self.budget,
+            "builds": self.builds,
+            "dropped_turns": self.dropped_turns,
+            "summaries": self.summaries,
+            "refreshing": len(self._refreshing),
+        }
+
+
+_BUILDER: Optional[ContextBuilder] = None
+
+
+def get_context_builder() -> ContextBuilder:
+    global _BUILDER
+    if _BUILDER is None:
+        _BUILDER = ContextBuilder()
+    return _BUILDER
+
+
+async def build_session_context(store: Any, sid: str, system: str, llm: Any = None,
+                                site: Optional[str] = None, tail: Optional[str] = None) -> Prompt:
+    return await get_context_builder().session_context(store, sid, system, llm, site, tail)
+
+
+def summary_key(sid: str) -> str:
+    # отдельный префикс: не попадает в сканы и TTL сессий, на шардах лежит рядом с сессией
+    return "summary:" + sid
+
+
+async def reset_session_context(store: Any, sid: str) -> None:
+    await store.delete(summary_key(sid))
+
+
+def fit_history(history: Optional[List[Dict[str, Any]]], budget: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Хвост чужой истории (из запроса) в пределах бюджета — вместо json.dumps(...)[:N] посреди структуры."""
+    kept, _ = pack_turns([h for h in (history or []) if isinstance(h, dict)],
+                         budget if budget is not None else get_context_builder().budget)
+    return kept
+
+
+def history_json(history: Optional[List[Dict[str, Any]]], budget: Optional[int] = None) -> str:
+    return json.dumps(fit_history(history, budget), ensure_ascii=False)
@@ -0,0 +1,248 @@
+"""
+Hedged requests: медленный запрос к LLM дублируется, побеждает первый ответ.
+
+Если ответ (для стрима — первый кусок) не пришёл за наблюдаемый p95 своего
+места вызова (Prompt.site), уходит второй такой же запрос; кто ответил
+первым — тот и ответ, второй отменяется (соединение закрывается, слот
+ограничителя освобождается). Так один медленный ответ из хвоста DeepSeek
+не становится худшим ходом арены.
+
+  - LLM_HEDGE=1 включает (по умолчанию выкл); только priority="interactive" и только async
+  - LLM_HEDGE_BUDGET (0.05) — дублей не больше этой доли от всех запросов процесса
+  - LLM_HEDGE_MIN_SAMPLES (20) — пока замеров места вызова меньше, не дублируем
+  - LLM_HEDGE_MIN_DELAY (0.2 сек) — нижняя граница задержки дубля
+  - LLM_HEDGE_WINDOW (200) — сколько последних замеров держать на место вызова
+  - stats(): hedged / hedge_won / primary_won / budget_denied и p95 по местам вызова
+"""
+import asyncio
+import collections
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+
+def _pct(values: Any, p: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(p * len(s)))]
+
+
+class _Site:
+    def __init__(self, window: int) -> None:
+        self.samples: Deque[float] = collections.deque(maxlen=window)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_won = 0
+        self.primary_won = 0
+
+
+class Hedger:
+    def __init__(self, budget: Optional[float] = None, min_samples: Optional[int] = None,
+                 min_delay: Optional[float] = None, window: Optional[int] = None,
+                 enabled: Optional[bool] = None) -> None:
+        env = os.environ.get
+        self.enabled = enabled if enabled is not None else \
+            env("LLM_HEDGE", "0").lower() in ("1", "true", "yes", "on")
+        self.budget = float(budget if budget is not None else env("LLM_HEDGE_BUDGET", "0.05"))
+        self.min_samples = int(min_samples if min_samples is not None else env("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.min_delay = float(min_delay if min_delay is not None else env("LLM_HEDGE_MIN_DELAY", "0.2"))
+        self.window = int(window if window is not None else env("LLM_HEDGE_WINDOW", "200"))
+        self._lock = threading.Lock()
+        self._sites: Dict[str, _Site] = {}
+        self.requests = 0
+        self.hedged = 0
+        self.budget_denied = 0
+
+    def _site(self, site: Optional[str]) -> _Site:
+        name = site or "untagged"
+        st = self._sites.get(name)
+        if st is None:
+            st = self._sites[name] = _Site(self.window)
+        return st
+
+    def delay(self, site: Optional[str]) -> Optional[float]:
+        """Через сколько дублировать; None — не дублировать (мало замеров)."""
+        with self._lock:
+            st = self._site(site)
+            if len(st.samples) < self.min_samples:
+                return None
+            return max(self.min_delay, _pct(st.samples, 0.95))
+
+    def observe(self, site: Optional[str], seconds: float) -> None:
+        with self._lock:
+            self._site(site).samples.append(seconds)
+
+    def _begin(self, site: Optional[str]) -> None:
+        with self._lock:
+            self.requests += 1
+            self._site(site).requests += 1
+
+    def _acquire(self, site: Optional[str]) -> bool:
+        # бюджет считается от всех запросов процесса, включая ещё не дошедшие до p95
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.requests:
+                self.budget_denied += 1
+                return False
+            self.hedged += 1
+            self._site(site).hedged += 1
+            return True
+
+    def _won(self, site: Optional[str], hedge: bool) -> None:
+        with self._lock:
+            st = self._site(site)
+            if hedge:
+                st.hedge_won += 1
+            else:
+                st.primary_won += 1
+
+    # ---- обычный запрос ----
+
+    async def run(self, site: Optional[str], call: Callable[[], Awaitable[Tuple[Optional[str], Optional[str]]]]
+                  ) -> Tuple[Optional[str], Optional[str]]:
+        """call() → (текст, ошибка), как _LLMClient._achat; ответ с текстом побеждает ошибку."""
+        if not self.enabled:
+            return await call()
+        self._begin(site)
+        started = time.monotonic()
+        delay = self.delay(site)
+        primary = asyncio.ensure_future(call())
+        try:
+            if delay is None:
+                res = await asyncio.shield(primary)
+            else:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if done or not self._acquire(site):
+                    res = await asyncio.shield(primary)
+                else:
+                    return await self._race(site, primary, asyncio.ensure_future(call()), started)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if res[0] is not None:
+            self.observe(site, time.monotonic() - started)
+        return res
+
+    async def _race(self, site: Optional[str], primary: "asyncio.Future[Any]",
+                    hedge: "asyncio.Future[Any]", started: float) -> Tuple[Optional[str], Optional[str]]:
+        pending = {primary, hedge}
+        res: Tuple[Optional[str], Optional[str]] = (None, None)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    res = t.result()
+                    if res[0] is not None:
+                        self._won(site, t is hedge)
+                        # если выиграл дубль, первый шёл не меньше этого: замер не даёт p95 съехать вниз
+                        self.observe(site, time.monotonic() - started)
+                        return res
+            return res
+        finally:
+            for t in pending:
+                t.cancel()
+
+    # ---- стрим: гонка до первого куска ----
+
+    async def stream(self, site: Optional[str], open_stream: Callable[[], AsyncIterator[str]],
+                     on_winner: Optional[Callable[[AsyncIterator[str]], None]] = None) -> AsyncIterator[str]:
+        """Куски из того потока, что первым дал непустой кусок; второй закрывается."""
+        if not self.enabled:
+            winner = open_stream()
+            if on_winner is not None:
+                on_winner(winner)
+            async for d in winner:
+                yield d
+            return
+        self._begin(site)
+        started = time.monotonic()
+        delay = self.delay(site)
+        streams = [open_stream()]
+        firsts = {asyncio.ensure_future(streams[0].__anext__()): streams[0]}
+        winner: Optional[AsyncIterator[str]] = None
+        first: Optional[str] = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(set(firsts), timeout=delay)
+                if not done and self._acquire(site):
+                    streams.append(open_stream())
+                    firsts[asyncio.ensure_future(streams[1].__anext__())] = streams[1]
+            pending = set(firsts)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    try:
+                        first = t.result()
+                    except StopAsyncIteration:
+                        continue
+                    winner = firsts[t]
+                    break
+        finally:
+            # проигравший поток сначала дожидается отмены, иначе aclose() упадёт на "already running"
+            rest = [t for t in firsts if not t.done()]
+            for t in rest:
+                t.cancel()
+            await asyncio.gather(*rest, return_exceptions=True)
+            for s in streams:
+                if s is not winner:
+                    await _aclose(s)
+        if winner is None:
+            # оба потока кончились без кусков — вызывающий сам решает про фоллбек
+            if on_winner is not None:
+                on_winner(streams[-1])
+            return
+        if on_winner is not None:
+            on_winner(winner)
+        if len(streams) > 1:
+            self._won(site, winner is streams[1])
+        self.observe(site, time.monotonic() - started)
+        yield first
+        async for d in winner:
+            yield d
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sites = {}
+            for name, st in sorted(self._sites.items()):
+                p95 = _pct(st.samples, 0.95)
+                sites[name] = {
+                    "requests": st.requests, "hedged": st.hedged, "hedge_won": st.hedge_won,
+                    "primary_won": st.primary_won, "samples": len(st.samples),
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                }
+            won = sum(s["hedge_won"] for s in sites.values())
+            return {
+                "enabled": self.enabled,
+                "budget": self.budget,
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+                "hedge_won": won,
+                "hedge_win_rate": round(won / self.hedged, 4) if self.hedged else 0.0,
+                "budget_denied": self.budget_denied,
+                "sites": sites,
+            }
+
+
+async def _aclose(stream: Any) -> None:
+    close = getattr(stream, "aclose", None)
+    if close is None:
+        return
+    try:
+        await close()
+    except Exception:
+        pass
+
+
+_HEDGER: Optional[Hedger] = None
+_HEDGER_LOCK = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    global _HEDGER
+    if _HEDGER is None:
+        with _HEDGER_LOCK:
+            if _HEDGER is None:
+                _HEDGER = Hedger()
+    return _HEDGER
@@ -0,0 +1,270 @@
+"""
+Глобальный ограничитель запросов к LLM (один на процесс, для sync и async вызовов).
+
+  - не больше LLM_MAX_IN_FLIGHT (16) запросов одновременно
+  - token bucket: LLM_RATE запросов/сек (20, 0 = без ограничения), запас LLM_BURST (2 × rate)
+  - очередь с приоритетами: interactive (диалоги, /coach) обслуживается раньше background (анализ)
+  - 429 + Retry-After: выдача слотов приостанавливается на указанное время
+  - ожидание в очереди ограничено LLM_QUEUE_TIMEOUT (30 сек) → LimiterTimeout
+  - sync acquire() из потока с работающим event loop не ждёт: слот либо свободен сразу,
+    либо LimiterTimeout (ожидание заблокировало бы loop, а слоты держат его же корутины)
+"""
+import asyncio
+import email.utils
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+PRIORITIES = {"interactive": 0, "background": 1}
+
+
+class LimiterTimeout(TimeoutError):
+    pass
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Retry-After: секунды или HTTP-дата."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return default
+
+
+def _on_loop_thread() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class _Waiter:
+    __slots__ = ("prio", "wake", "granted", "abandoned", "t0")
+
+    def __init__(self, prio: int, wake: Callable[[], None]) -> None:
+        self.prio = prio
+        self.wake = wake
+        self.granted = False
+        self.abandoned = False
+        self.t0 = time.monotonic()
+
+
+class _ClassStats:
+    def __init__(self) -> None:
+        self.granted = 0
+        self.timeouts = 0
+        self.waits: Deque[float] = deque(maxlen=1000)
+
+    def as_dict(self, queued: int) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+        return {
+            "queued": queued,
+            "granted": self.granted,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            "wait_p95_ms": pct(0.95),
+            "wait_max_ms": round(waits[-1] * 1000, 2) if waits else 0.0,
+        }
+
+
+class LLMLimiter:
+    def __init__(self, max_in_flight: Optional[int] = None, rate: Optional[float] = None,
+                 burst: Optional[float] = None, queue_timeout: Optional[float] = None) -> None:
+        env = os.environ.get
+        self.max_in_flight = int(max_in_flight if max_in_flight is not None else env("LLM_MAX_IN_FLIGHT", "16"))
+        self.rate = float(rate if rate is not None else env("LLM_RATE", "20"))
+        self.burst = float(burst if burst is not None else env("LLM_BURST", str(max(1.0, 2 * self.rate))))
+        self.queue_timeout = float(queue_timeout if queue_timeout is not None else env("LLM_QUEUE_TIMEOUT", "30"))
+        self._lock = threading.Lock()
+        self._heap: List[Any] = []
+        self._seq = itertools.count()
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self.in_flight = 0
+        self.throttled = 0
+        self._classes: Dict[int, _ClassStats] = {p: _ClassStats() for p in PRIORITIES.values()}
+
+    @staticmethod
+    def _prio(priority: Any) -> int:
+        if isinstance(priority, int):
+            return priority
+        return PRIORITIES.get(priority or "interactive", 0)
+
+    # ---- core (под self._lock) ----
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _dispatch_locked(self) -> Optional[float]:
+        """Раздаёт слоты ожидающим; возвращает, через сколько секунд попробовать снова."""
+        now = time.monotonic()
+        self._refill(now)
+        while self._heap and self.in_flight < self.max_in_flight:
+            w: _Waiter = self._heap[0][2]
+            if w.abandoned:
+                heapq.heappop(self._heap)
+                continue
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self.rate > 0 and self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            heapq.heappop(self._heap)
+            self._grant_locked(w, now)
+            w.wake()
+        return None
+
+    def _grant_locked(self, w: _Waiter, now: float) -> None:
+        w.granted = True
+        self.in_flight += 1
+        if self.rate > 0:
+            self._tokens -= 1
+        st = self._classes.setdefault(w.prio, _ClassStats())
+        st.granted += 1
+        st.waits.append(now - w.t0)
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            delay = self._dispatch_locked()
+            if delay is not None and (self._timer is None or not self._timer.is_alive()):
+                self._timer = threading.Timer(delay + 0.001, self._tick)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _tick(self) -> None:
+        with self._lock:
+            self._timer = None
+        self._dispatch()
+
+    def _enqueue(self, prio: int, wake: Callable[[], None]) -> _Waiter:
+        w = _Waiter(prio, wake)
+        with self._lock:
+            heapq.heappush(self._heap, (prio, next(self._seq), w))
+        self._dispatch()
+        return w
+
+    def _give_up(self, w: _Waiter, timed_out: bool) -> bool:
+        """Убирает ожидающего из очереди; True — слот ему уже выдан и теперь его."""
+        with self._lock:
+            if w.granted:
+                return True
+            w.abandoned = True
+            if timed_out:
+                self._classes.setdefault(w.prio, _ClassStats()).timeouts += 1
+        self._dispatch()
+        return False
+
+    # ---- public ----
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._dispatch()
+
+    def backoff(self, seconds: float) -> None:
+        """429: новых слотов не выдавать `seconds` секунд."""
+        with self._lock:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+        self._dispatch()
+
+    async def acquire_async(self, priority: Any = "interactive", timeout: Optional[float] = None) -> None:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def _done() -> None:
+            if not fut.done():
+                fut.set_result(None)
+
+        w = self._enqueue(self._prio(priority), lambda: loop.call_soon_threadsafe(_done))
+        timeout = self.queue_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(fut, timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            if self._give_up(w, True):
+                return
+            raise LimiterTimeout(f"LLM queue wait > {timeout}s")
+        except BaseException:
+            if self._give_up(w, False):
+                self.release()
+            raise
+
+    def acquire(self, priority: Any = "interactive", timeout: Optional[float] = None) -> None:
+        ev = threading.Event()
+        w = self._enqueue(self._prio(priority), ev.set)
+        if _on_loop_thread():
+            # слот выдаётся синхронно в _enqueue, если он есть; ждать здесь — встать loop'у поперёк
+            if ev.is_set() or self._give_up(w, False):
+                return
+            raise LimiterTimeout("LLM queue full: sync call on the event loop thread, use achat()")
+        timeout = self.queue_timeout if timeout is None else timeout
+        if not ev.wait(timeout if timeout > 0 else None):
+            if self._give_up(w, True):
+                return
+            raise LimiterTimeout(f"LLM queue wait > {timeout}s")
+
+    @asynccontextmanager
+    async def aslot(self, priority: Any = "interactive", timeout: Optional[float] = None):
+        await self.acquire_async(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def slot(self, priority: Any = "interactive", timeout: Optional[float] = None):
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            queued: Dict[int, int] = {}
+            for prio, _, w in self._heap:
+                if not w.abandoned:
+                    queued[prio] = queued.get(prio, 0) + 1
+            names = {v: k for k, v in PRIORITIES.items()}
+            return {
+                "max_in_flight": self.max_in_flight,
+                "rate": self.rate,
+                "burst": self.burst,
+                "in_flight": self.in_flight,
+                "tokens": round(self._tokens, 2),
+                "queue_depth": sum(queued.values()),
+                "throttled_429": self.throttled,
+                "blocked_for_ms": round(max(0.0, self._blocked_until - time.monotonic()) * 1000),
+                "classes": {names.get(p, str(p)): st.as_dict(queued.get(p, 0)) for p, st in sorted(self._classes.items())},
+            }
+
+
+_LIMITER: Optional[LLMLimiter] = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_limiter() -> LLMLimiter:
+    global _LIMITER
+    if _LIMITER is None:
+        with _LIMITER_LOCK:
+            if _LIMITER is None:
+                _LIMITER = LLMLimiter()
+    return _LIMITER
@@ -0,0 +1,231 @@
+"""
+Кэш ответов LLM для детерминированных промптов.
+
+Ключ — sha256 от модели и нормализованных сообщений. Два уровня:
+  - память: LRU (LLM_CACHE_SIZE записей, по умолчанию 2048)
+  - диск:   таблица llm_cache в SQLite (файл состояния, либо LLM_CACHE_DB)
+Кэш включается на месте вызова: llm.achat(msg, cache="dragon.advice").
+TTL: аргумент ttl=, иначе LLM_CACHE_TTLS ("dragon.advice=7d,persona.coach=1d"),
+иначе LLM_CACHE_TTL (1d). LLM_CACHE=0 выключает кэш целиком.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.state.v1 import SQLiteBackend, get_store
+from core.state.v1.group_commit import GroupCommitter
+from core.state.v1.maintenance import parse_duration, parse_ttls
+
+_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS llm_cache (
+      key TEXT PRIMARY KEY,
+      site TEXT,
+      model TEXT,
+      value TEXT,
+      ts REAL,
+      expires REAL
+    ) WITHOUT ROWID''',
+    "CREATE INDEX IF NOT EXISTS llm_cache_expires_idx ON llm_cache(expires)",
+]
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], fmt: Optional[str] = None) -> str:
+    # пробелы и переводы строк не меняют смысл промпта, но ломают совпадение
+    norm = [[m.get("role", "user"), " ".join(str(m.get("content", "")).split())] for m in messages]
+    # fmt (например "json") — другой формат ответа на тот же промпт, ключ обычных запросов не меняется
+    raw = json.dumps([model, norm] + ([fmt] if fmt else []), ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _SiteStats:
+    __slots__ = ("hits", "disk_hits", "misses", "stores")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class LLMCache:
+    def __init__(self, db: Optional[SQLiteBackend] = None, capacity: Optional[int] = None,
+                 default_ttl: Optional[float] = None) -> None:
+        self.enabled = os.environ.get("LLM_CACHE", "1").lower() not in ("0", "false", "no", "off")
+        self.capacity = int(capacity if capacity is not None else os.environ.get("LLM_CACHE_SIZE", "2048"))
+        if default_ttl is None:
+            default_ttl = parse_duration(os.environ.get("LLM_CACHE_TTL", "1d"))
+        self.default_ttl = default_ttl
+        self.ttls = parse_ttls(os.environ.get("LLM_CACHE_TTLS", ""))
+        self._mem: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sites: Dict[str, _SiteStats] = {}
+        self._last_prune = 0.0
+        self.db = db
+        self.writer: Optional[GroupCommitter] = None
+        if db is not None:
+            db.execute_batch([(s, ()) for s in _SCHEMA])
+            # записи уходят на диск фоновым потоком, ответ пользователю их не ждёт
+            self.writer = GroupCommitter(db.execute_batch, window=0.05, max_batch=500)
+
+    def ttl_for(self, site: str, ttl: Optional[float] = None) -> float:
+        if ttl is not None:
+            return float(ttl)
+        return self.ttls.get(site, self.default_ttl)
+
+    def _site(self, site: str) -> _SiteStats:
+        st = self._sites.get(site)
+        if st is None:
+            st = self._sites.setdefault(site, _SiteStats())
+        return st
+
+    # ---- memory tier ----
+
+    def _mem_get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            item = self._mem.get(key)
+            if item is None:
+                return None
+            if item[1] <= now:
+                del self._mem[key]
+                return None
+            self._mem.move_to_end(key)
+            return item[0]
+
+    def _mem_put(self, key: str, value: str, expires: float) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._mem[key] = (value, expires)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.capacity:
+                self._mem.popitem(last=False)
+
+    # ---- disk tier ----
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        if self.db is None:
+            return None
+        try:
+            rows = self.db.query("SELECT value, expires FROM llm_cache WHERE key = ? AND expires > ?", (key, now))
+        except Exception:
+            return None
+        return (rows[0][0], rows[0][1]) if rows else None
+
+    # ---- public ----
+
+    def get(self, site: str, key: str) -> Optional[str]:
+        now = time.time()
+        st = self._site(site)
+        value = self._mem_get(key, now)
+        if value is None:
+            hit = self._disk_get(key, now)
+            if hit is not None:
+                value = hit[0]
+                self._mem_put(key, value, hit[1])
+                st.disk_hits += 1
+        if value is None:
+            st.misses += 1
+        else:
+            st.hits += 1
+        return value
+
+    async def aget(self, site: str, key: str) -> Optional[str]:
+        # память — прямо в event loop, диск — в потоке
+        now = time.time()
+        value = self._mem_get(key, now)
+        if value is not None:
+            self._site(site).hits += 1
+            return value
+        if self.db is None:
+            self._site(site).misses += 1
+            return None
+        return await asyncio.to_thread(self.get, site, key)
+
+    def put(self, site: str, key: str, model: str, value: str, ttl: Optional[float] = None) -> None:
+        secs = self.ttl_for(site, ttl)
+        if secs <= 0 or not isinstance(value, str):
+            return
+        now = time.time()
+        self._mem_put(key, value, now + secs)
+        self._site(site).stores += 1
+        if self.writer is not None:
+            self.writer.submit("REPLACE INTO llm_cache(key, site, model, value, ts, expires) VALUES(?,?,?,?,?,?)",
+                               (key, site, model, value, now, now + secs))
+            if now - self._last_prune > 3600:
+                self._last_prune = now
+                self.writer.submit("DELETE FROM llm_cache WHERE expires <= ?", (now,))
+
+    def clear(self, site: Optional[str] = None) -> int:
+        # в памяти site не хранится: она сбрасывается целиком, диск — по site
+        with self._lock:
+            n = len(self._mem)
+            self._mem.clear()
+        if self.db is not None:
+            if site is None:
+                n = self.db.execute("DELETE FROM llm_cache")
+            else:
+                n = self.db.execute("DELETE FROM llm_cache WHERE site = ?", (site,))
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        sites = {name: st.as_dict() for name, st in sorted(self._sites.items())}
+        hits = sum(s["hits"] for s in sites.values())
+        misses = sum(s["misses"] for s in sites.values())
+        out: Dict[str, Any] = {
+            "enabled": self.enabled,
+            "memory": {"size": len(self._mem), "capacity": self.capacity},
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "sites": sites,
+        }
+        if self.db is not None:
+            try:
+                out["disk"] = {"path": self.db.path, "rows": self.db.query("SELECT COUNT(*) FROM llm_cache")[0][0],
+                               "writer": self.writer.stats() if self.writer else None}
+            except Exception:
+                out["disk"] = {"path": self.db.path}
+        return out
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+_CACHE: Optional[LLMCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                db: Optional[SQLiteBackend] = None
+                path = os.environ.get("LLM_CACHE_DB")
+                try:
+                    if path:
+                        db = SQLiteBackend(path)
+                    else:
+                        backend = get_store().backend
+                        # состояние в Redis/шардах — дисковый уровень в отдельном локальном файле
+                        db = backend if isinstance(backend, SQLiteBackend) else SQLiteBackend("llm_cache.db")
+                except Exception:
+                    db = None
+                _CACHE = LLMCache(db)
+    return _CACHE
@@ -0,0 +1,349 @@
+"""In-process DeepSeek-compatible stand-in for load tests without spending quota.
+
+Speaks the POST .../chat/completions shape _LLMClient expects: JSON
+{"choices": [{"message": {"content": ...}}]}, or SSE chunks
+{"choices": [{"delta": {"content": ...}}]} + "data: [DONE]" when the body
+has "stream": true. Faults are injected per request:
+
+  latency       time to first byte: fixed:S | uniform:A,B | normal:MEAN,SD |
+                lognormal:MEDIAN,SIGMA | exp:MEAN (seconds)
+  error_rate    share of HTTP 500/502/503 answers
+  throttle_rate share of 429 answers with Retry-After: retry_after
+  max_rps       server-side limit, excess requests get 429 (0 = off)
+  drop_rate     share of connections closed without an answer
+  tokens        words in a reply; token_delay — pause between SSE chunks
+  prefix_cache  emulate DeepSeek context caching: "usage" reports
+                prompt_cache_hit_tokens for the longest prefix (64-token
+                blocks, ~3 chars per token) already seen by this server
+
+    python -m core.voice_gateway.v1.mock_server --port 8089 --latency lognormal:0.3,0.5 --throttle-rate 0.05
+    DEEPSEEK_API_KEY=mock DEEPSEEK_API_URL=http://127.0.0.1:8089/v1/chat/completions python run_bot.py
+
+GET /mock/stats returns counters, POST /mock/config updates any of the
+knobs above at runtime (JSON body), POST /mock/reset zeroes the counters.
+"""
+import argparse, hashlib, http.server, json, math, random, sys, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+_DEFAULTS: Dict[str, Any] = {
+    "latency": "fixed:0.05",
+    "error_rate": 0.0,
+    "throttle_rate": 0.0,
+    "retry_after": 1.0,
+    "max_rps": 0.0,
+    "drop_rate": 0.0,
+    "tokens": 24,
+    "token_delay": 0.01,
+    "prefix_cache": True,
+}
+
+_CACHE_BLOCK = 64          # токенов в блоке context cache
+_CHARS_PER_TOKEN = 3       # грубо для смеси кириллицы и JSON-разметки
+_SEEN_MAX = 200_000
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    kind, _, args = (spec or "fixed:0").partition(":")
+    a = [float(x) for x in args.split(",") if x.strip()] or [0.0]
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda rnd: a[0]
+    if kind == "uniform":
+        return lambda rnd: rnd.uniform(a[0], a[1])
+    if kind == "normal":
+        return lambda rnd: max(0.0, rnd.gauss(a[0], a[1]))
+    if kind == "lognormal":
+        # MEDIAN, SIGMA: хвост как у живого API — p99 в разы больше медианы
+        return lambda rnd: rnd.lognormvariate(math.log(max(a[0], 1e-6)), a[1])
+    if kind == "exp":
+        return lambda rnd: rnd.expovariate(1.0 / max(a[0], 1e-6))
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.streamed = 0
+        self.dropped = 0
+        self.client_gone = 0     # клиент закрыл соединение раньше ответа (отмена, hedging)
+        self.by_status: Dict[int, int] = {}
+        self.by_model: Dict[str, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "streamed": self.streamed,
+                "dropped": self.dropped,
+                "client_gone": self.client_gone,
+                "by_status": {str(k): v for k, v in sorted(self.by_status.items())},
+                "by_model": dict(sorted(self.by_model.items())),
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+
+class MockDeepSeek(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, seed: Optional[int] = None, **config: Any):
+        self.config = dict(_DEFAULTS)
+        self.stats = _Stats()
+        self._rnd = random.Random(seed)
+        self._rnd_lock = threading.Lock()
+        self._window: list = []      # отметки времени за последнюю секунду (max_rps)
+        self._seen: "OrderedDict[bytes, None]" = OrderedDict()   # хэши префиксов для prefix_cache
+        self.configure(**config)
+        super().__init__((host, port), _Handler)
+
+    def configure(self, **config: Any) -> None:
+        unknown = set(config) - set(_DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown mock options: {sorted(unknown)}")
+        self.config.update({k: v for k, v in config.items() if v is not None})
+        self._latency = parse_latency(self.config["latency"])
+
+    def _roll(self) -> Dict[str, Any]:
+        """Судьба одного запроса: задержка и исход."""
+        c = self.config
+        with self._rnd_lock:
+            delay = self._latency(self._rnd)
+            r = self._rnd.random()
+            status = self._rnd.choice((500, 502, 503))
+        now = time.monotonic()
+        over = False
+        if c["max_rps"]:
+            with self._rnd_lock:
+                self._window = [t for t in self._window if now - t < 1.0]
+                over = len(self._window) >= c["max_rps"]
+                if not over:
+                    self._window.append(now)
+        if r < c["drop_rate"]:
+            return {"delay": delay, "outcome": "drop"}
+        r -= c["drop_rate"]
+        if over or r < c["throttle_rate"]:
+            # 429 отвечает сразу, как настоящий лимитер на входе
+            return {"delay": 0.0, "outcome": 429}
+        r -= c["throttle_rate"]
+        if r < c["error_rate"]:
+            return {"delay": delay, "outcome": status}
+        return {"delay": delay, "outcome": 200}
+
+    def usage(self, messages: Any, completion_tokens: int) -> Dict[str, int]:
+        text = json.dumps(messages, ensure_ascii=False, separators=(",", ":"))
+        prompt_tokens = max(1, len(text) // _CHARS_PER_TOKEN)
+        hit = 0
+        if self.config["prefix_cache"]:
+            step = _CACHE_BLOCK * _CHARS_PER_TOKEN
+            h = hashlib.sha1()
+            keys = []
+            for end in range(step, len(text) + 1, step):
+                h.update(text[end - step:end].encode("utf-8"))
+                keys.append(h.digest())
+            with self._rnd_lock:
+                for k in keys:
+                    if k not in self._seen:
+                        break
+                    hit += _CACHE_BLOCK
+                    self._seen.move_to_end(k)
+                for k in keys:
+                    self._seen[k] = None
+                while len(self._seen) > _SEEN_MAX:
+                    self._seen.popitem(last=False)
+        hit = min(hit, prompt_tokens)
+        return {"prompt_tokens": prompt_tokens, "prompt_cache_hit_tokens": hit,
+                "prompt_cache_miss_tokens": prompt_tokens - hit, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            with self.stats.lock:
+                self.stats.client_gone += 1
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> "MockDeepSeek":
+        threading.Thread(target=self.serve_forever, name="deepseek-stand-in", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def _reply_words(messages: Any, n: int) -> list:
+    last = ""
+    if isinstance(messages, list) and messages:
+        last = str((messages[-1] or {}).get("content") or "")
+    seed = last.split()[:6] or ["ответ"]
+    return ["mock:"] + [seed[i % len(seed)] for i in range(max(0, n - 1))]
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockDeepSeek
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _json(self, status: int, obj: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Any:
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        return json.loads(raw) if raw else {}
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/mock/stats":
+            self._json(200, {"stats": self.server.stats.as_dict(), "config": self.server.config})
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:
+        srv = self.server
+        try:
+            body = self._body()
+        except ValueError:
+            self._json(400, {"error": {"message": "invalid JSON"}})
+            return
+        path = self.path.rstrip("/")
+        if path == "/mock/config":
+            try:
+                srv.configure(**body)
+            except (TypeError, ValueError) as e:
+                self._json(400, {"error": {"message": str(e)}})
+                return
+            self._json(200, {"config": srv.config})
+            return
+        if path == "/mock/reset":
+            with srv.stats.lock:
+                srv.stats.reset()
+            self._json(200, {"ok": True})
+            return
+        if not path.endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._json(401, {"error": {"message": "missing API key"}})
+            return
+
+        st = srv.stats
+        with st.lock:
+            st.requests += 1
+            model = str(body.get("model") or "")
+            st.by_model[model] = st.by_model.get(model, 0) + 1
+            st.in_flight += 1
+            st.peak_in_flight = max(st.peak_in_flight, st.in_flight)
+        try:
+            self._complete(srv, body)
+        finally:
+            with st.lock:
+                st.in_flight -= 1
+
+    def _count(self, status: int) -> None:
+        with self.server.stats.lock:
+            self.server.stats.by_status[status] = self.server.stats.by_status.get(status, 0) + 1
+
+    def _complete(self, srv: MockDeepSeek, body: Dict[str, Any]) -> None:
+        fate = srv._roll()
+        if fate["delay"]:
+            time.sleep(fate["delay"])
+        outcome = fate["outcome"]
+        if outcome == "drop":
+            with srv.stats.lock:
+                srv.stats.dropped += 1
+            self.close_connection = True
+            return
+        if outcome == 429:
+            self._count(429)
+            self._json(429, {"error": {"message": "rate limit exceeded", "type": "rate_limit"}},
+                       {"Retry-After": f"{srv.config['retry_after']:g}"})
+            return
+        if outcome != 200:
+            self._count(outcome)
+            self._json(outcome, {"error": {"message": "mock upstream error"}})
+            return
+
+        self._count(200)
+        words = _reply_words(body.get("messages"), int(srv.config["tokens"]))
+        usage = srv.usage(body.get("messages"), len(words))
+        model = body.get("model") or "deepseek-chat"
+        if not body.get("stream"):
+            self._json(200, {
+                "id": f"mock-{time.time_ns()}",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        with srv.stats.lock:
+            srv.stats.streamed += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(data: str) -> None:
+            raw = data.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(raw), raw))
+            self.wfile.flush()
+
+        delay = float(srv.config["token_delay"])
+        for i, w in enumerate(words):
+            if i and delay:
+                time.sleep(delay)
+            delta = {"choices": [{"index": 0, "delta": {"content": (" " if i else "") + w}, "finish_reason": None}]}
+            chunk("data: " + json.dumps(delta, ensure_ascii=False) + "\n\n")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk("data: " + json.dumps({"choices": [], "usage": usage}) + "\n\n")
+        chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="DeepSeek-compatible stand-in for local runs and load tests")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--latency", default=_DEFAULTS["latency"])
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--throttle-rate", type=float, default=0.0)
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    ap.add_argument("--max-rps", type=float, default=0.0)
+    ap.add_argument("--drop-rate", type=float, default=0.0)
+    ap.add_argument("--tokens", type=int, default=_DEFAULTS["tokens"])
+    ap.add_argument("--token-delay", type=float, default=_DEFAULTS["token_delay"])
+    ap.add_argument("--no-prefix-cache", action="store_true")
+    args = ap.parse_args()
+    srv = MockDeepSeek(args.host, args.port, seed=args.seed, latency=args.latency, error_rate=args.error_rate,
+                       throttle_rate=args.throttle_rate, retry_after=args.retry_after, max_rps=args.max_rps,
+                       drop_rate=args.drop_rate, tokens=args.tokens, token_delay=args.token_delay,
+                       prefix_cache=not args.no_prefix_cache)
+    print("listening on", srv.url)
+    srv.serve_forever()
@@ -1,18 +1,23 @@
+import asyncio
+import json
 import os
+import threading
 import time
-from typing import List, Dict, Optional
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 
-# Попробуем взять HTTP-клиент из integrations.patch_v4 / patch_v3
-_HTTP_CLIENT = None
+from .breaker import get_breaker
+from .hedge import get_hedger
+from .limiter import LimiterTimeout, get_limiter, parse_retry_after
+from .prompts import get_prompt_stats
+from .router import LLMRouter, Route
+from .singleflight import get_single_flight
+
+# Пул HTTP/1.1 keep-alive соединений: httpx (async + sync), иначе requests.Session
 try:
-    from integrations.patch_v4.http_client import http_post  # type: ignore
-    _HTTP_CLIENT = ("v4", http_post)
+    import httpx  # type: ignore
 except Exception:
-    try:
-        from integrations.patch_v3.http_client import http_post  # type: ignore
-        _HTTP_CLIENT = ("v3", http_post)
-    except Exception:
-        _HTTP_CLIENT = None
+    httpx = None  # type: ignore
 
 # Фоллбек на requests (если есть)
 try:
@@ -63,6 +68,83 @@ def _normalize_messages_for_deepseek(
     return normalized
 
 
+class _HttpPool:
+    """
+    Один пул соединений на процесс: TCP+TLS к DeepSeek устанавливается один раз
+    и переиспользуется всеми вызовами.
+      - async: httpx.AsyncClient на каждый event loop (клиент привязан к loop'у)
+      - sync:  httpx.Client (или requests.Session, если httpx нет)
+    Лимиты: LLM_POOL_MAX_CONNECTIONS (20), LLM_POOL_MAX_KEEPALIVE (= max connections),
+    LLM_POOL_KEEPALIVE_EXPIRY (60 сек).
+    """
+
+    def __init__(self) -> None:
+        self.max_connections = int(_read_env("LLM_POOL_MAX_CONNECTIONS", "20"))
+        # keep-alive < max_connections заставляет httpcore закрывать и заново
+        # открывать соединения под нагрузкой, поэтому по умолчанию они равны
+        self.max_keepalive = int(_read_env("LLM_POOL_MAX_KEEPALIVE", str(self.max_connections)))
+        self.keepalive_expiry = float(_read_env("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+        self._lock = threading.Lock()
+        self._sync: Any = None
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def _limits(self) -> Any:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def sync_client(self) -> Any:
+        if self._sync is None:
+            with self._lock:
+                if self._sync is None:
+                    if httpx is not None:
+                        self._sync = httpx.Client(limits=self._limits())
+                    elif requests is not None:
+                        sess = requests.Session()
+                        adapter = requests.adapters.HTTPAdapter(
+                            pool_connections=1, pool_maxsize=self.max_connections
+                        )
+                        sess.mount("https://", adapter)
+                        sess.mount("http://", adapter)
+                        self._sync = sess
+        return self._sync
+
+    def async_client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        client = self._async.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self._limits())
+            self._async[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+            client = self._async.pop(loop, None)
+            if client is not None:
+                await client.aclose()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._sync = self._sync, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+_POOL = _HttpPool()
+
+
+def get_http_pool() -> _HttpPool:
+    return _POOL
+
+
 class _LLMClient:
     """
     Обёртка над DeepSeek (или совместимым сервисом).
@@ -80,78 +162,457 @@ class _LLMClient:
       response:
         либо { "output": "..." }
         либо { "choices": [ { "message": { "content": "..." } } ] }
+
+    achat() — основной путь для aiogram/FastAPI (не блокирует event loop),
+    chat() — синхронный шим для старых вызовов; оба ходят через общий пул соединений.
+    cache="<место вызова>" включает кэш ответов (см. llm_cache.py), ttl= — своё время жизни.
+    Одинаковые одновременные запросы склеиваются в один (singleflight.py).
+    astream() — тот же ответ кусками (SSE) для постепенной доставки в Telegram;
+    achat(..., on_delta=feed) — то же самое, но с полным текстом на выходе.
+    Все запросы идут через общий ограничитель (limiter.py): priority="interactive"
+    для диалогов, "background" для анализа. При лежащем API circuit breaker
+    (breaker.py, свой у каждого endpoint'а) сразу отдаёт локальный фоллбек.
+    semantic=(пространство, реплика) — семантический кэш (semantic_cache.py): ответ на
+    похожую реплику того же пространства отдаётся без запроса.
+    json_mode=True просит ответ одним JSON-объектом (response_format json_object);
+    разбор и проверка схемы — на вызывающей стороне; без ответа API (нет ключа, ошибки,
+    открыт breaker) json_mode возвращает None вместо локального фоллбека.
+    LLM_HEDGE=1 — медленный интерактивный запрос дублируется после p95 своего
+    места вызова, побеждает первый ответ (hedge.py).
+    LLM_ENDPOINTS — несколько совместимых endpoint'ов с весами и выбором по
+    задержке/ошибкам, LLM_MODEL_OVERRIDES — модель по месту вызова (router.py).
     """
 
     def __init__(self) -> None:
-        self.api_url = _read_env(
-            "DEEPSEEK_API_URL",
-            "https://api.deepseek.com/v1/chat/completions",
-        )
-        self.api_key = _read_env("DEEPSEEK_API_KEY", None)
+        self.router = LLMRouter()
+        # основной endpoint; остальные — в self.router
+        self.api_url = self.router.primary.url
+        self.api_key = self.router.api_key
         self.timeout = float(_read_env("HTTP_TIMEOUT", "15"))
         self.retries = int(_read_env("HTTP_RETRIES", "2"))
-        self.model = _read_env("DEEPSEEK_MODEL", "deepseek-chat")
-
-    def chat(self, messages: List[Dict[str, str]]) -> str:
-        # Если ключа нет или вообще нет HTTP-клиента — локальный коуч-ответ
-        if not self.api_key or (_HTTP_CLIENT is None and requests is None):
-            return self._local_echo(messages)
-
-        safe_messages = _normalize_messages_for_deepseek(messages)
-
+        self.model = self.router.primary.model
+        self.pool = get_http_pool()
+        self.flights = get_single_flight()
+        self.limiter = get_limiter()
+        self.breaker = get_breaker()
+        self.hedger = get_hedger()
+
+    def _request(self, messages: List[Dict[str, str]], stream: bool = False,
+                 json_mode: bool = False, route: Optional[Route] = None) -> Dict[str, Any]:
         payload: Dict[str, object] = {
-            "model": self.model,
-            "messages": safe_messages,
+            "model": route.model if route else self.model,
+            "messages": _normalize_messages_for_deepseek(messages),
         }
+        if stream:
+            payload["stream"] = True
+            # usage (в т.ч. prompt_cache_hit_tokens) приходит последним чанком
+            payload["stream_options"] = {"include_usage": True}
+        if json_mode:
+            # JSON Output: ответ — один JSON-объект; в промпте должны быть слово "json" и пример формата
+            payload["response_format"] = {"type": "json_object"}
         headers = {
-            "Authorization": f"Bearer {self.api_key}",
+            "Authorization": f"Bearer {route.key if route else self.api_key}",
             "Content-Type": "application/json",
         }
-
+        return {"json": payload, "headers": headers, "timeout": self.timeout}
+
+    @staticmethod
+    def _parse(data: Any) -> Optional[str]:
+        if isinstance(data, dict):
+            # Вариант { "output": "..." }
+            if "output" in data and isinstance(data["output"], str):
+                return data["output"]
+
+            # Вариант OpenAI-стиля с choices
+            if "choices" in data and data["choices"]:
+                ch = data["choices"][0]
+                msg = (ch.get("message") or {}).get("content")
+                if isinstance(msg, str):
+                    return msg
+        return None
+
+    def _model_for(self, messages: Any) -> str:
+        return self.router.model_for(getattr(messages, "site", None))
+
+    def _cache(self, site: Optional[str]) -> Any:
+        if not site:
+            return None
+        from .llm_cache import get_llm_cache
+        cache = get_llm_cache()
+        return cache if cache.enabled else None
+
+    @staticmethod
+    def _semantic(semantic: Optional[Tuple[str, str]]) -> Any:
+        if not semantic:
+            return None
+        from .semantic_cache import get_semantic_cache
+        sem = get_semantic_cache()
+        return sem if sem.enabled else None
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        cache: Optional[str] = None,
+        ttl: Optional[float] = None,
+        on_delta: Optional[Callable[[str], Awaitable[Any]]] = None,
+        priority: str = "interactive",
+        json_mode: bool = False,
+        semantic: Optional[Tuple[str, str]] = None,
+    ) -> Optional[str]:
+        if on_delta is not None:
+            # потоковый режим: куски уходят в on_delta, возвращается весь текст
+            parts: List[str] = []
+            async for delta in self.astream(messages, cache, ttl, priority):
+                parts.append(delta)
+                await on_delta(delta)
+            return "".join(parts)
+        # Если ключа нет или вообще нет HTTP-клиента — локальный коуч-ответ
+        if not self.api_key or (httpx is None and requests is None):
+            return None if json_mode else self._local_echo(messages)
+        if httpx is None:
+            # без httpx async-пула нет: синхронный шим в потоке
+            return await asyncio.to_thread(self.chat, messages, cache, ttl, priority, json_mode, semantic)
+
+        from .llm_cache import cache_key
+        key = cache_key(self._model_for(messages), messages, "json" if json_mode else None)
+        store = self._cache(cache)
+        if store is not None:
+            hit = await store.aget(cache, key)
+            if hit is not None:
+                return hit
+        sem = self._semantic(semantic)
+        if sem is not None:
+            hit = sem.lookup(*semantic)
+            if hit is not None:
+                return hit
+        # одинаковый запрос уже в полёте — ждём его ответ, а не шлём второй
+        out, err = await self.flights.ado(f"{priority}:{key}", lambda: self._hedged(messages, priority, json_mode))
+        if store is not None and out is not None:
+            store.put(cache, key, self._model_for(messages), out, ttl)
+        if sem is not None and out is not None:
+            sem.put(semantic[0], semantic[1], out)
+        if out is None:
+            # Если всё упало — аккуратно деградируем (такой ответ не кэшируется);
+            # JSON-режиму коуч-текст не нужен: None, вызывающий не чинит то, чего API не присылал
+            return None if json_mode else self._local_echo(messages, error=err)
+        return out
+
+    @staticmethod
+    def _usage(messages: Any, data: Any) -> None:
+        if isinstance(data, dict) and data.get("usage"):
+            get_prompt_stats().record(getattr(messages, "site", None), data["usage"])
+
+    def _read(self, r: Any, messages: Any = None) -> Tuple[Optional[str], Optional[str]]:
+        if r.status_code >= 500:
+            return None, f"HTTP {r.status_code}"
+        data = r.json()
+        self._usage(messages, data)
+        out = self._parse(data)
+        if out is None:
+            return None, f"unexpected response: {str(data)[:200]}"
+        return out, None
+
+    @staticmethod
+    def _rejected(r: Any) -> Optional[str]:
+        """4xx кроме 429 (400 — слишком длинный промпт, 401 — ключ): ошибка запроса, а не endpoint'а.
+        Повтор не поможет, в breaker/EWMA не считается — иначе один кривой запрос открывает цепь всем."""
+        if 400 <= r.status_code < 500 and r.status_code != 429:
+            return f"HTTP {r.status_code} (не повторяем)"
+        return None
+
+    def _throttled(self, r: Any) -> bool:
+        # 429: весь процесс притормаживает на Retry-After, повтор ждёт в очереди ограничителя
+        if r.status_code != 429:
+            return False
+        self.limiter.backoff(parse_retry_after(r.headers.get("retry-after")))
+        return True
+
+    def _hedged(
+        self, messages: List[Dict[str, str]], priority: str = "interactive", json_mode: bool = False
+    ) -> Awaitable[Tuple[Optional[str], Optional[str]]]:
+        call = lambda: self._achat(messages, priority, json_mode)  # noqa: E731
+        if priority != "interactive":
+            # фоновому анализу хвост латентности не важен — дубли только для диалогов
+            return call()
+        return self.hedger.run(getattr(messages, "site", None), call)
+
+    async def _achat(
+        self, messages: List[Dict[str, str]], priority: str = "interactive", json_mode: bool = False
+    ) -> Tuple[Optional[str], Optional[str]]:
+        site = getattr(messages, "site", None)
         last_err: Optional[str] = None
-
-        for _ in range(max(1, self.retries)):
+        throttled = False
+        avoid = None
+
+        for attempt in range(max(1, self.retries)):
+            if attempt:
+                # после 429 паузу держит ограничитель, иначе — jittered backoff
+                await asyncio.sleep(self.breaker.retry_delay(attempt, throttled))
+            # каждая попытка выбирает endpoint заново; повтор — мимо того, что подвёл
+            route = self._pick(site, avoid)
+            if route is None:
+                return None, last_err or "circuit open"
+            ok: Optional[bool] = None
+            throttled = False
+            req = self._request(messages, json_mode=json_mode, route=route)
             try:
-                # Вариант через integrations.patch_*
-                if _HTTP_CLIENT is not None:
-                    _, http_post = _HTTP_CLIENT
-                    resp = http_post(
-                        self.api_url,
-                        json=payload,
-                        headers=headers,
-                        timeout=self.timeout,
-                    )
-                    data = resp if isinstance(resp, dict) else {}
-                else:
-                    # Вариант через requests
-                    assert requests is not None  # для type checker
-                    r = requests.post(
-                        self.api_url,
-                        json=payload,
-                        headers=headers,
-                        timeout=self.timeout,
-                    )
-                    data = r.json()
-
-                if isinstance(data, dict):
-                    # Вариант { "output": "..." }
-                    if "output" in data and isinstance(data["output"], str):
-                        return data["output"]
-
-                    # Вариант OpenAI-стиля с choices
-                    if "choices" in data and data["choices"]:
-                        ch = data["choices"][0]
-                        msg = (ch.get("message") or {}).get("content")
-                        if isinstance(msg, str):
-                            return msg
-
-                last_err = f"unexpected response: {str(data)[:200]}"
+                async with self.limiter.aslot(priority):
+                    r = await self.pool.async_client().post(route.go(), **req)
+                    # до освобождения слота, чтобы следующий ждущий уже видел паузу
+                    throttled = self._throttled(r)
+                if throttled:
+                    last_err = "429 rate limited"
+                    continue
+                rejected = self._rejected(r)
+                if rejected:
+                    return None, rejected
+                out, last_err = self._read(r, messages)
+                ok = out is not None
+                if ok:
+                    return out, None
+            except LimiterTimeout as e:
+                return None, str(e)
             except Exception as e:  # noqa: BLE001
+                ok, last_err = False, str(e)
+            finally:
+                route.endpoint.breaker.record(ok, last_err if ok is False else None)
+                avoid = self._routed(route, ok, throttled, last_err)
+
+        return None, last_err
+
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        cache: Optional[str] = None,
+        ttl: Optional[float] = None,
+        priority: str = "interactive",
+    ) -> AsyncIterator[str]:
+        """
+        Ответ кусками по мере генерации (SSE, "stream": true).
+        Склейка всех кусков = то, что вернул бы achat(). Попадание в кэш,
+        локальный режим и фоллбек отдаются одним куском.
+        """
+        if not self.api_key or httpx is None:
+            yield await self.achat(messages, cache, ttl, priority=priority)
+            return
+
+        from .llm_cache import cache_key
+        key = cache_key(self._model_for(messages), messages)
+        store = self._cache(cache)
+        if store is not None:
+            hit = await store.aget(cache, key)
+            if hit is not None:
+                yield hit
+                return
+
+        attempts: Dict[Any, Dict[str, Any]] = {}
+        won: List[Any] = []
+
+        def open_stream() -> AsyncIterator[str]:
+            st: Dict[str, Any] = {"err": None, "complete": False}
+            it = self._astream(messages, priority, st)
+            attempts[it] = st
+            return it
+
+        if priority == "interactive":
+            # гонка до первого куска: медленный стрим дублируется после p95 (hedge.py)
+            source = self.hedger.stream(getattr(messages, "site", None), open_stream, won.append)
+        else:
+            source = open_stream()
+            won.append(source)
+        parts: List[str] = []
+        async for delta in source:
+            parts.append(delta)
+            yield delta
+        st = attempts.get(won[0]) if won else None
+        st = st or {"err": None, "complete": False}
+
+        if not parts:
+            yield self._local_echo(messages, error=st["err"])
+        elif store is not None and st["complete"]:
+            store.put(cache, key, self._model_for(messages), "".join(parts), ttl)
+
+    async def _astream(
+        self, messages: List[Dict[str, str]], priority: str, st: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """Одна попытка стрима с повторами; итог (ошибка, дошёл ли до конца) — в st."""
+        site = getattr(messages, "site", None)
+        last_err: Optional[str] = None
+        parts: List[str] = []
+
+        complete = False
+        throttled = False
+        avoid = None
+
+        for attempt in range(max(1, self.retries)):
+            if attempt:
+                await asyncio.sleep(self.breaker.retry_delay(attempt, throttled))
+            route = self._pick(site, avoid)
+            if route is None:
+                last_err = last_err or "circuit open"
+                break
+            ok: Optional[bool] = None
+            throttled = False
+            req = self._request(messages, stream=True, route=route)
+            try:
+                async with self.limiter.aslot(priority), \
+                        self.pool.async_client().stream("POST", route.go(), **req) as r:
+                    if self._throttled(r):
+                        throttled = True
+                        last_err = "429 rate limited"
+                        continue
+                    rejected = self._rejected(r)
+                    if rejected:
+                        last_err = rejected
+                        break
+                    if r.status_code >= 500:
+                        ok, last_err = False, f"HTTP {r.status_code}"
+                        continue
+                    if "text/event-stream" not in r.headers.get("content-type", ""):
+                        # сервер проигнорировал stream — обычный JSON-ответ
+                        data = json.loads(await r.aread())
+                        self._usage(messages, data)
+                        out = self._parse(data)
+                        if out is None:
+                            ok, last_err = False, f"unexpected response: {str(data)[:200]}"
+                            continue
+                        route.mark()
+                        parts.append(out)
+                        yield out
+                    else:
+                        async for line in r.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            chunk = line[5:].strip()
+                            if chunk == "[DONE]":
+                                break
+                            try:
+                                obj = json.loads(chunk)
+                                self._usage(messages, obj)
+                                if not obj.get("choices"):
+                                    continue
+                                delta = (obj["choices"][0].get("delta") or {}).get("content")
+                            except Exception:
+                                continue
+                            if delta:
+                                route.mark()
+                                parts.append(delta)
+                                yield delta
+                ok = bool(parts)
+                if parts:
+                    complete = True
+                    break
+                last_err = "empty stream"
+            except LimiterTimeout as e:
                 last_err = str(e)
-                time.sleep(0.25)
+                break
+            except Exception as e:  # noqa: BLE001
+                ok, last_err = False, str(e)
+                if parts:
+                    # часть ответа уже у пользователя — повтор дал бы дубль
+                    break
+            finally:
+                route.endpoint.breaker.record(ok, last_err if ok is False else None)
+                avoid = self._routed(route, ok, throttled, last_err)
+
+        st["err"] = last_err
+        st["complete"] = complete
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        cache: Optional[str] = None,
+        ttl: Optional[float] = None,
+        priority: str = "interactive",
+        json_mode: bool = False,
+        semantic: Optional[Tuple[str, str]] = None,
+    ) -> Optional[str]:
+        # Если ключа нет или вообще нет HTTP-клиента — локальный коуч-ответ
+        if not self.api_key or (httpx is None and requests is None):
+            return None if json_mode else self._local_echo(messages)
+
+        from .llm_cache import cache_key
+        key = cache_key(self._model_for(messages), messages, "json" if json_mode else None)
+        store = self._cache(cache)
+        if store is not None:
+            hit = store.get(cache, key)
+            if hit is not None:
+                return hit
+        sem = self._semantic(semantic)
+        if sem is not None:
+            hit = sem.lookup(*semantic)
+            if hit is not None:
+                return hit
+        out, err = self.flights.do(f"{priority}:{key}", lambda: self._chat(messages, priority, json_mode))
+        if store is not None and out is not None:
+            store.put(cache, key, self._model_for(messages), out, ttl)
+        if sem is not None and out is not None:
+            sem.put(semantic[0], semantic[1], out)
+        if out is None:
+            # Если всё упало — аккуратно деградируем (такой ответ не кэшируется);
+            # JSON-режиму коуч-текст не нужен: None, вызывающий не чинит то, чего API не присылал
+            return None if json_mode else self._local_echo(messages, error=err)
+        return out
+
+    def _chat(
+        self, messages: List[Dict[str, str]], priority: str = "interactive", json_mode: bool = False
+    ) -> Tuple[Optional[str], Optional[str]]:
+        site = getattr(messages, "site", None)
+        last_err: Optional[str] = None
+        throttled = False
+        avoid = None
+
+        for attempt in range(max(1, self.retries)):
+            if attempt:
+                time.sleep(self.breaker.retry_delay(attempt, throttled))
+            route = self._pick(site, avoid)
+            if route is None:
+                return None, last_err or "circuit open"
+            ok: Optional[bool] = None
+            throttled = False
+            req = self._request(messages, json_mode=json_mode, route=route)
+            try:
+                with self.limiter.slot(priority):
+                    r = self.pool.sync_client().post(route.go(), **req)
+                    throttled = self._throttled(r)
+                if throttled:
+                    last_err = "429 rate limited"
+                    continue
+                rejected = self._rejected(r)
+                if rejected:
+                    return None, rejected
+                out, last_err = self._read(r, messages)
+                ok = out is not None
+                if ok:
+                    return out, None
+            except LimiterTimeout as e:
+                return None, str(e)
+            except Exception as e:  # noqa: BLE001
+                ok, last_err = False, str(e)
+            finally:
+                route.endpoint.breaker.record(ok, last_err if ok is False else None)
+                avoid = self._routed(route, ok, throttled, last_err)
+
+        return None, last_err
+
+    def _pick(self, site: Optional[str], avoid: Any) -> Optional[Route]:
+        """Endpoint попытки, чей breaker уже пропустил запрос; None — открыты у всех."""
+        for _ in range(len(self.router.endpoints)):
+            route = self.router.pick(site, avoid)
+            if route is not None and route.endpoint.breaker.allow():
+                return route
+            if route is None:
+                break
+            # пробу half_open успел занять другой запрос — к соседу
+            avoid = route.endpoint
+        self.breaker.short_circuit()
+        return None
 
-        # Если всё упало — аккуратно деградируем
-        return self._local_echo(messages, error=last_err)
+    def _routed(self, route: Route, ok: Optional[bool], throttled: bool, err: Optional[str]) -> Any:
+        """Исход попытки → EWMA endpoint'а; возвращает endpoint, который обходить при повторе."""
+        # 429 для breaker не ошибка API, а для выбора endpoint'а — повод уйти к соседу
+        self.router.record(route, False if throttled else ok, err)
+        return route.endpoint if throttled or ok is False else None
 
     def _local_echo(
         self,
@@ -213,6 +674,15 @@ class _TTSStub:
         return b"[tts-stub]"
 
 
+# переменные, которые клиенты читают при создании; их смена — повод для reload()
+_CONFIG_ENV = ("DEEPSEEK_API_URL", "DEEPSEEK_API_KEY", "DEEPSEEK_MODEL", "HTTP_TIMEOUT", "HTTP_RETRIES",
+               "LLM_ENDPOINTS", "LLM_ENDPOINTS_FILE", "LLM_MODEL_OVERRIDES")
+
+
+def _config_snapshot() -> Dict[str, Optional[str]]:
+    return {name: _read_env(name) for name in _CONFIG_ENV}
+
+
 class VoicePipeline:
     """
     Основной фасад голосового шлюза.
@@ -220,9 +690,70 @@ class VoicePipeline:
       - llm: чат-API (DeepSeek + фоллбек)
       - asr: распознавание (стаб)
       - tts: синтез (стаб)
+
+    Компоненты создаются при первом обращении. В коде берите общий экземпляр
+    get_voice_pipeline(), а не VoicePipeline() на каждый запрос; после смены
+    DEEPSEEK_* / HTTP_* — reload() (или POST /voice_gateway/v1/reload).
     """
 
+    _FACTORIES: Dict[str, Callable[[], Any]] = {
+        "llm": lambda: _LLMClient(),
+        "asr": lambda: _ASRStub(),
+        "tts": lambda: _TTSStub(),
+    }
+
     def __init__(self) -> None:
-        self.llm = _LLMClient()
-        self.asr = _ASRStub()
-        self.tts = _TTSStub()
\ No newline at end of file
+        self._lock = threading.Lock()
+        self._parts: Dict[str, Any] = {}
+        self._config = _config_snapshot()
+        self.reloads = 0
+
+    def _part(self, name: str) -> Any:
+        part = self._parts.get(name)
+        if part is None:
+            with self._lock:
+                part = self._parts.get(name)
+                if part is None:
+                    part = self._parts[name] = self._FACTORIES[name]()
+        return part
+
+    @property
+    def llm(self) -> _LLMClient:
+        return self._part("llm")
+
+    @property
+    def asr(self) -> _ASRStub:
+        return self._part("asr")
+
+    @property
+    def tts(self) -> _TTSStub:
+        return self._part("tts")
+
+    def reload(self, force: bool = False) -> List[str]:
+        """Пересоздаёт компоненты, если конфиг изменился (или force). Возвращает изменившиеся
+        переменные. Пул соединений, ограничитель и breaker общие на процесс и сохраняют состояние."""
+        with self._lock:
+            config = _config_snapshot()
+            changed = [k for k in _CONFIG_ENV if config[k] != self._config.get(k)]
+            if changed or force:
+                # уже взятые ссылки (vp.llm внутри идущего запроса) доработают со старым клиентом
+                self._parts = {}
+                self._config = config
+                self.reloads += 1
+            return changed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"initialized": sorted(self._parts), "reloads": self.reloads}
+
+
+_PIPELINE: Optional[VoicePipeline] = None
+_PIPELINE_LOCK = threading.Lock()
+
+
+def get_voice_pipeline() -> VoicePipeline:
+    global _PIPELINE
+    if _PIPELINE is None:
+        with _PIPELINE_LOCK:
+            if _PIPELINE is None:
+                _PIPELINE = VoicePipeline()
+    return _PIPELINE
\ No newline at end of file
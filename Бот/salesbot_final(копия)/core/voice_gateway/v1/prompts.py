@@ -0,0 +1,126 @@
+"""
+Сборка промптов со стабильным префиксом (под context cache DeepSeek).
+
+DeepSeek кэширует общий префикс запросов (блоками по 64 токена) — совпадение
+должно быть байт-в-байт с начала. Поэтому:
+
+  - системный префикс у каждого места вызова один и тот же: регистрируется
+    один раз константой (register_prefix), нормализуется (NFC, пробелы);
+    ничего переменного (этап, эмоция, тип клиента) в нём нет
+  - дальше идёт то, что растёт, но не меняется (резюме, история диалога)
+  - переменное (tail) — системной репликой перед последней репликой пользователя
+
+    SYSTEM = register_prefix("arena.client", "Ты клиент. Реагируй естественно.")
+    msg = build_prompt("arena.client", text, tail=f"Твой образ: {persona}")
+
+Prompt — это list сообщений с меткой места вызова (.site). По ней клиент
+складывает usage ответа: prompt_cache_hit_tokens / prompt_cache_miss_tokens →
+stats() и GET /voice_gateway/v1/llm/stats → prompts.
+"""
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+_WS = re.compile(r"[ \t]+")
+
+
+class Prompt(list):
+    """Список сообщений + место вызова (для учёта usage)."""
+
+    def __init__(self, messages: Iterable[Dict[str, str]] = (), site: Optional[str] = None) -> None:
+        super().__init__(messages)
+        self.site = site
+
+
+def canonical(text: str) -> str:
+    # одинаковый смысл → одинаковые байты: NFC, без хвостовых пробелов и пустых строк по краям
+    text = unicodedata.normalize("NFC", text or "").replace("\r\n", "\n")
+    return "\n".join(_WS.sub(" ", line).strip() for line in text.strip().split("\n"))
+
+
+_PREFIXES: Dict[str, str] = {}
+_LOCK = threading.Lock()
+
+
+def register_prefix(site: str, text: str) -> str:
+    """Системный префикс места вызова; возвращает канонический текст."""
+    text = canonical(text)
+    with _LOCK:
+        _PREFIXES[site] = text
+    return text
+
+
+def system_prefix(site: str) -> str:
+    return _PREFIXES[site]
+
+
+def tag(messages: Iterable[Dict[str, str]], site: Optional[str]) -> Prompt:
+    return Prompt(messages, site)
+
+
+def with_tail(messages: List[Dict[str, str]], tail: Optional[str]) -> List[Dict[str, str]]:
+    """Вставляет переменную системную реплику перед последним сообщением."""
+    if not tail:
+        return list(messages)
+    note = {"role": "system", "content": canonical(tail)}
+    if not messages:
+        return [note]
+    return list(messages[:-1]) + [note, messages[-1]]
+
+
+def build_prompt(site: str, user: str, tail: Optional[str] = None,
+                 history: Optional[List[Dict[str, str]]] = None) -> Prompt:
+    """[префикс места] + history + [tail] + [user]."""
+    msgs = [{"role": "system", "content": system_prefix(site)}]
+    msgs += history or []
+    msgs.append({"role": "user", "content": user})
+    return Prompt(with_tail(msgs, tail), site)
+
+
+# ---- учёт usage ----
+
+_USAGE_FIELDS = ("prompt_tokens", "prompt_cache_hit_tokens", "prompt_cache_miss_tokens", "completion_tokens")
+
+
+class PromptStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict[str, int]] = {}
+
+    def record(self, site: Optional[str], usage: Any) -> None:
+        if not isinstance(usage, dict):
+            return
+        with self._lock:
+            st = self._sites.setdefault(site or "untagged", {"requests": 0, **{f: 0 for f in _USAGE_FIELDS}})
+            st["requests"] += 1
+            for f in _USAGE_FIELDS:
+                v = usage.get(f)
+                if isinstance(v, int):
+                    st[f] += v
+
+    @staticmethod
+    def _share(st: Dict[str, int]) -> float:
+        seen = st["prompt_cache_hit_tokens"] + st["prompt_cache_miss_tokens"]
+        return round(st["prompt_cache_hit_tokens"] / seen, 4) if seen else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sites = {k: dict(v, cached_share=self._share(v)) for k, v in sorted(self._sites.items())}
+        total = {"requests": 0, **{f: 0 for f in _USAGE_FIELDS}}
+        for v in sites.values():
+            for k in total:
+                total[k] += v[k]
+        return {"total": dict(total, cached_share=self._share(total)), "sites": sites,
+                "prefixes": {k: len(v) for k, v in sorted(_PREFIXES.items())}}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._sites.clear()
+
+
+_STATS = PromptStats()
+
+
+def get_prompt_stats() -> PromptStats:
+    return _STATS
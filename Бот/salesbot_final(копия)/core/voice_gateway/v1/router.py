@@ -0,0 +1,254 @@
+"""
+Маршрутизация запросов LLM по нескольким OpenAI-совместимым endpoint'ам.
+
+По умолчанию endpoint один — DEEPSEEK_API_URL / DEEPSEEK_API_KEY / DEEPSEEK_MODEL,
+как раньше. Несколько — списком в LLM_ENDPOINTS (JSON) или файлом LLM_ENDPOINTS_FILE:
+
+    [{"name": "deepseek", "url": "https://api.deepseek.com/v1/chat/completions",
+      "key_env": "DEEPSEEK_API_KEY", "model": "deepseek-chat", "weight": 3},
+     {"name": "reserve", "url": "http://10.0.0.5:8000/v1/chat/completions",
+      "key": "local", "model": "qwen2.5-7b-instruct", "weight": 1}]
+
+Каждая попытка (и повтор, и hedge-дубль) выбирает endpoint заново: случайно
+пропорционально weight × здоровье, где здоровье — скользящие средние (EWMA,
+LLM_ROUTER_ALPHA 0.2) задержки и доли ошибок. Endpoint с долей ошибок выше
+LLM_ROUTER_EJECT (0.5) выводится из оборота, пока не восстановится; на такие
+уходит LLM_ROUTER_PROBE (2%) трафика, чтобы заметить восстановление. Повтор
+после ошибки идёт на другой endpoint, если он есть. У каждого endpoint'а свой
+circuit breaker (breaker.py): с открытым breaker'ом endpoint не выбирается, а
+pick() возвращает None, только когда открыты все. Endpoint без ключа (key_env не
+задан) при загрузке отключается с предупреждением в лог — если ключ есть у других.
+
+Модель по месту вызова (Prompt.site) — LLM_MODEL_OVERRIDES (JSON):
+
+    {"objections.classify": "deepseek-lite",          # только модель
+     "dragon_rules.*": "reserve:qwen2.5-7b-instruct"}  # endpoint:модель
+
+Ключ — точное имя места вызова или префикс с ".*". Если закреплённый endpoint
+выведен из оборота (или открыт его breaker), место вызова уходит в общий пул с
+моделями endpoint'ов пула; на закреплённый идёт та же доля проб.
+stats() — по endpoint'ам.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .breaker import CircuitBreaker, get_breaker
+
+log = logging.getLogger(__name__)
+
+
+def _read_endpoints() -> List[Dict[str, Any]]:
+    raw = os.environ.get("LLM_ENDPOINTS")
+    path = os.environ.get("LLM_ENDPOINTS_FILE")
+    if not raw and path:
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+    if raw:
+        items = json.loads(raw)
+        if isinstance(items, dict):
+            items = [dict(v, name=k) for k, v in items.items()]
+        return items
+    return [{
+        "name": "deepseek",
+        "url": os.environ.get("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions"),
+        "key_env": "DEEPSEEK_API_KEY",
+        "model": os.environ.get("DEEPSEEK_MODEL", "deepseek-chat"),
+    }]
+
+
+class Endpoint:
+    def __init__(self, name: str, url: str, key: Optional[str], model: str, weight: float = 1.0) -> None:
+        self.name = name
+        self.url = url
+        self.key = key
+        self.model = model
+        self.weight = max(0.0, float(weight))
+        self.latency: Optional[float] = None   # EWMA, сек
+        self.errors = 0.0                      # EWMA доли ошибок
+        self.requests = 0
+        self.failures = 0
+        self.picks = 0
+        self.last_error: Optional[str] = None
+        # общий на процесс по имени: переживает reload() пайплайна
+        self.breaker: CircuitBreaker = get_breaker().endpoint(name)
+
+    @classmethod
+    def from_config(cls, i: int, c: Dict[str, Any], default_model: str) -> "Endpoint":
+        key = c.get("key")
+        if key is None and c.get("key_env"):
+            key = os.environ.get(c["key_env"])
+        return cls(str(c.get("name") or f"ep{i}"), c["url"], key or None,
+                   str(c.get("model") or default_model), c.get("weight", 1.0))
+
+
+class Route:
+    """Куда идёт одна попытка: endpoint + модель."""
+    __slots__ = ("endpoint", "model", "started", "answered")
+
+    def __init__(self, endpoint: Endpoint, model: str) -> None:
+        self.endpoint = endpoint
+        self.model = model
+        self.started = time.monotonic()
+        self.answered: Optional[float] = None
+
+    def go(self) -> str:
+        """URL запроса; засекает время уже после очереди ограничителя."""
+        self.started = time.monotonic()
+        return self.endpoint.url
+
+    def mark(self) -> None:
+        # для стрима задержка endpoint'а — до первого куска, а не до конца генерации
+        if self.answered is None:
+            self.answered = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        return self.endpoint.url
+
+    @property
+    def key(self) -> Optional[str]:
+        return self.endpoint.key
+
+
+class LLMRouter:
+    def __init__(self, endpoints: Optional[List[Dict[str, Any]]] = None,
+                 overrides: Optional[Dict[str, Any]] = None) -> None:
+        env = os.environ.get
+        default_model = env("DEEPSEEK_MODEL", "deepseek-chat")
+        conf = endpoints if endpoints is not None else _read_endpoints()
+        self.endpoints = [Endpoint.from_config(i, c, default_model) for i, c in enumerate(conf)]
+        if not self.endpoints:
+            raise ValueError("LLM_ENDPOINTS: no endpoints")
+        self._disabled = set()
+        if any(e.key for e in self.endpoints):
+            # без ключа endpoint ответит только 401 ("Bearer None"); если ключей нет ни у кого —
+            # это локальный режим, список не трогаем
+            for e in self.endpoints:
+                if not e.key:
+                    log.warning("LLM endpoint %s (%s) disabled: no API key", e.name, e.url)
+                    self._disabled.add(e.name)
+            self.endpoints = [e for e in self.endpoints if e.key]
+        self._by_name = {e.name: e for e in self.endpoints}
+        self.overrides: Dict[str, Any] = overrides if overrides is not None else json.loads(env("LLM_MODEL_OVERRIDES") or "{}")
+        self.alpha = float(env("LLM_ROUTER_ALPHA", "0.2"))
+        self.eject = float(env("LLM_ROUTER_EJECT", "0.5"))
+        self.probe = float(env("LLM_ROUTER_PROBE", "0.02"))
+        self._rnd = random.Random()
+        self._lock = threading.Lock()
+
+    @property
+    def primary(self) -> Endpoint:
+        return self.endpoints[0]
+
+    @property
+    def api_key(self) -> Optional[str]:
+        # есть хоть один ключ — не локальный режим
+        return next((e.key for e in self.endpoints if e.key), None)
+
+    # ---- модель по месту вызова ----
+
+    def _override(self, site: Optional[str]) -> Optional[Any]:
+        if not site or not self.overrides:
+            return None
+        if site in self.overrides:
+            return self.overrides[site]
+        best = None
+        for pattern, value in self.overrides.items():
+            # самый длинный префикс "objections.*" побеждает
+            if pattern.endswith(".*") and site.startswith(pattern[:-1]) and (best is None or len(pattern) > len(best[0])):
+                best = (pattern, value)
+        return best[1] if best else None
+
+    def _target(self, site: Optional[str]) -> Tuple[Optional[Endpoint], Optional[str]]:
+        ov = self._override(site)
+        if ov is None:
+            return None, None
+        if isinstance(ov, dict):
+            if ov.get("endpoint") in self._disabled:
+                return None, None
+            return self._by_name.get(ov.get("endpoint") or ""), ov.get("model")
+        name, sep, model = str(ov).partition(":")
+        if sep and name in self._disabled:
+            # закреплённый endpoint отключён (нет ключа) — общий пул с его моделями
+            return None, None
+        if sep and name in self._by_name:
+            return self._by_name[name], model or None
+        return None, str(ov)
+
+    def model_for(self, site: Optional[str]) -> str:
+        """Модель места вызова (для ключа кэша): override или модель основного endpoint'а."""
+        ep, model = self._target(site)
+        return model or (ep or self.primary).model
+
+    # ---- выбор ----
+
+    def _health(self, e: Endpoint, ref: float) -> float:
+        lat = e.latency if e.latency is not None else ref
+        return e.weight * (ref / max(lat, 0.05)) * (1.0 - e.errors) ** 2
+
+    def pick(self, site: Optional[str] = None, avoid: Optional[Endpoint] = None) -> Optional[Route]:
+        """None — breaker открыт у всех endpoint'ов."""
+        pinned, model = self._target(site)
+        if pinned is not None:
+            if pinned.breaker.available() and (pinned.errors < self.eject or self._rnd.random() < self.probe):
+                return self._take(pinned, model or pinned.model)
+            # закреплённый выведен из оборота: в пул; модель из override — только для него самого
+            avoid = pinned
+        with self._lock:
+            pool = [e for e in self.endpoints if e.weight > 0] or list(self.endpoints)
+            pool = [e for e in pool if e.breaker.available()]
+            if not pool:
+                return None
+            if avoid is not None and len(pool) > 1:
+                pool = [e for e in pool if e is not avoid]
+            healthy = [e for e in pool if e.errors < self.eject]
+            sick = [e for e in pool if e.errors >= self.eject]
+            if sick and (not healthy or self._rnd.random() < self.probe):
+                chosen = self._rnd.choice(sick)
+            else:
+                known = [e.latency for e in healthy if e.latency is not None]
+                ref = min(known) if known else 1.0
+                weights = [self._health(e, ref) for e in healthy]
+                chosen = self._rnd.choices(healthy, weights=weights)[0] if sum(weights) > 0 else self._rnd.choice(healthy)
+        if pinned is not None and chosen is not pinned:
+            model = None
+        return self._take(chosen, model or chosen.model)
+
+    def _take(self, e: Endpoint, model: str) -> Route:
+        with self._lock:
+            e.picks += 1
+        return Route(e, model)
+
+    def record(self, route: Route, ok: Optional[bool], error: Optional[str] = None) -> None:
+        """ok=None — исход не про endpoint (отмена, очередь ограничителя): не учитываем."""
+        if ok is None:
+            return
+        e = route.endpoint
+        took = (route.answered or time.monotonic()) - route.started
+        a = self.alpha
+        with self._lock:
+            e.requests += 1
+            e.errors = (1 - a) * e.errors + a * (0.0 if ok else 1.0)
+            if ok:
+                e.latency = took if e.latency is None else (1 - a) * e.latency + a * took
+            else:
+                e.failures += 1
+                e.last_error = (error or "")[:200] or None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            eps = {}
+            for e in self.endpoints:
+                eps[e.name] = {
+                    "url": e.url, "model": e.model, "weight": e.weight, "picks": e.picks,
+                    "requests": e.requests, "failures": e.failures,
+                    "latency_ewma_ms": round(e.latency * 1000, 1) if e.latency is not None else None,
+                    "error_ewma": round(e.errors, 4), "ejected": e.errors >= self.eject,
+                    "breaker": e.breaker.state, "last_error": e.last_error,
+                }
+            return {"endpoints": eps, "overrides": dict(self.overrides)}
@@ -0,0 +1,45 @@
+from typing import Optional
+from fastapi import APIRouter
+
+router = APIRouter(prefix="/voice_gateway/v1", tags=["voice_gateway"])
+
+# синхронные обработчики: FastAPI выполняет их в своём пуле потоков, вне event loop
+
+@router.get("/health")
+def health():
+    from .breaker import get_breaker
+    llm = get_breaker().stats()
+    # open — LLM недоступен, ответы идут из локального фоллбека
+    return {"ok": True, "version": "v1", "llm": llm, "degraded": llm["state"] != "closed"}
+
+@router.get("/llm/stats")
+def llm_stats():
+    from .breaker import get_breaker
+    from .context import get_context_builder
+    from .hedge import get_hedger
+    from .llm_cache import get_llm_cache
+    from .limiter import get_limiter
+    from .pipeline import get_voice_pipeline
+    from .prompts import get_prompt_stats
+    from .semantic_cache import get_semantic_cache
+    from .singleflight import get_single_flight
+    return {"ok": True, "cache": get_llm_cache().stats(), "single_flight": get_single_flight().stats(),
+            "limiter": get_limiter().stats(), "breaker": get_breaker().stats(),
+            "context": get_context_builder().stats(), "pipeline": get_voice_pipeline().stats(),
+            "semantic_cache": get_semantic_cache().stats(), "prompts": get_prompt_stats().stats(),
+            "hedge": get_hedger().stats(), "router": get_voice_pipeline().llm.router.stats()}
+
+@router.post("/llm/cache/clear")
+def llm_cache_clear(site: Optional[str] = None):
+    from .llm_cache import get_llm_cache
+    from .semantic_cache import get_semantic_cache
+    # в семантическом кэше site чистит и свои пространства: "mp.coach" → все "mp.coach:<этап>"
+    return {"ok": True, "deleted": get_llm_cache().clear(site), "semantic_deleted": get_semantic_cache().clear(site)}
+
+@router.post("/reload")
+def reload_pipeline(force: bool = False):
+    # после смены DEEPSEEK_* / HTTP_* в окружении процесса
+    from .pipeline import get_voice_pipeline
+    vp = get_voice_pipeline()
+    changed = vp.reload(force)
+    return {"ok": True, "changed": changed, "reloaded": bool(changed) or force, "reloads": vp.reloads}
@@ -0,0 +1,208 @@
+"""
+Семантический кэш ответов LLM: похожая по смыслу реплика → сохранённый ответ.
+
+    text = await vp.llm.achat(msg, semantic=("mp.coach:greeting", user_line))
+
+Реплика превращается в вектор hashing-векторизатором (слова, пары слов и
+символьные 3-граммы → SEMANTIC_CACHE_DIM измерений, без словаря и обучения),
+дальше косинус со всеми ранее отвеченными репликами того же пространства
+(обычно сайт + этап). Похожесть ≥ SEMANTIC_CACHE_THRESHOLD (0.85) — отдаём
+сохранённый ответ без запроса к API.
+
+  - SEMANTIC_CACHE_SIZE (512) записей на пространство, вытесняется давно не использованная
+  - SEMANTIC_CACHE_TTL (1d) — время жизни записи
+  - SEMANTIC_CACHE=0 выключает; без numpy кэш выключен (numpy — опциональная зависимость)
+  - stats(): hits / misses по пространствам и гистограмма лучшей похожести на каждый поиск
+"""
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None  # type: ignore
+
+from core.state.v1.maintenance import parse_duration
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_BINS = 10   # гистограмма похожести: [0.0, 0.1) ... [0.9, 1.0]
+
+
+class HashingVectorizer:
+    def __init__(self, dim: int = 2048) -> None:
+        # степень двойки: индекс — младшие биты хэша
+        self.dim = 1 << max(6, int(dim - 1).bit_length())
+
+    @staticmethod
+    def features(text: str) -> List[str]:
+        words = _TOKEN.findall((text or "").lower().replace("ё", "е"))
+        out = ["w:" + w for w in words]
+        out += ["b:" + a + " " + b for a, b in zip(words, words[1:])]
+        for w in words:
+            # 3-граммы ловят разные окончания одного слова ("зовут" / "зовёт")
+            p = f"<{w}>"
+            out += ["c:" + p[i:i + 3] for i in range(len(p) - 2)]
+        return out
+
+    def transform(self, text: str) -> Any:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        feats = self.features(text)
+        if not feats:
+            return vec
+        h = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in feats), dtype=np.uint32, count=len(feats))
+        # знаковый хэш: коллизии гасят друг друга, а не складываются
+        signs = np.where(h & np.uint32(1 << 31), -1.0, 1.0).astype(np.float32)
+        np.add.at(vec, (h & np.uint32(self.dim - 1)).astype(np.intp), signs)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+
+class _Index:
+    """Матрица векторов ограниченной ёмкости: растёт удвоением, дальше строки
+    переиспользуются при вытеснении."""
+
+    def __init__(self, capacity: int, dim: int) -> None:
+        self.capacity = capacity
+        rows = min(capacity, 64)
+        self.vecs = np.zeros((rows, dim), dtype=np.float32)
+        self.values: List[Optional[str]] = [None] * rows
+        self.texts: List[str] = [""] * rows
+        self.used = np.zeros(rows, dtype=np.float64)      # последнее обращение
+        self.expires = np.zeros(rows, dtype=np.float64)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def search(self, q: Any, now: float) -> Tuple[int, float]:
+        if not self.size:
+            return -1, 0.0
+        sims = self.vecs[:self.size] @ q
+        sims[self.expires[:self.size] <= now] = -1.0
+        i = int(np.argmax(sims))
+        return i, float(sims[i])
+
+    def _grow(self) -> None:
+        rows = min(self.capacity, 2 * len(self.vecs))
+        extra = rows - len(self.vecs)
+        self.vecs = np.vstack([self.vecs, np.zeros((extra, self.vecs.shape[1]), dtype=np.float32)])
+        self.used = np.concatenate([self.used, np.zeros(extra)])
+        self.expires = np.concatenate([self.expires, np.zeros(extra)])
+        self.values += [None] * extra
+        self.texts += [""] * extra
+
+    def slot(self, now: float) -> int:
+        if self.size < self.capacity:
+            if self.size == len(self.vecs):
+                self._grow()
+            self.size += 1
+            return self.size - 1
+        expired = np.flatnonzero(self.expires[:self.size] <= now)
+        if len(expired):
+            return int(expired[0])
+        self.evictions += 1
+        return int(np.argmin(self.used))
+
+
+class SemanticCache:
+    def __init__(self, threshold: Optional[float] = None, size: Optional[int] = None,
+                 dim: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        env = os.environ.get
+        self.enabled = np is not None and env("SEMANTIC_CACHE", "1").lower() not in ("0", "false", "no", "off")
+        self.threshold = float(threshold if threshold is not None else env("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+        self.size = int(size if size is not None else env("SEMANTIC_CACHE_SIZE", "512"))
+        self.ttl = float(ttl if ttl is not None else parse_duration(env("SEMANTIC_CACHE_TTL", "1d")))
+        self.vectorizer = HashingVectorizer(int(dim if dim is not None else env("SEMANTIC_CACHE_DIM", "2048"))) \
+            if np is not None else None
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, _Index] = {}
+        self._hist = [0] * _BINS
+
+    def _index(self, space: str) -> _Index:
+        idx = self._indexes.get(space)
+        if idx is None:
+            idx = self._indexes[space] = _Index(max(1, self.size), self.vectorizer.dim)
+        return idx
+
+    def lookup(self, space: str, text: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        q = self.vectorizer.transform(text)
+        now = time.time()
+        with self._lock:
+            idx = self._index(space)
+            i, sim = idx.search(q, now)
+            self._hist[min(_BINS - 1, max(0, int(sim * _BINS)))] += 1
+            if i >= 0 and sim >= self.threshold:
+                idx.hits += 1
+                idx.used[i] = now
+                return idx.values[i]
+            idx.misses += 1
+            return None
+
+    def put(self, space: str, text: str, value: str) -> None:
+        if not self.enabled or not value:
+            return
+        q = self.vectorizer.transform(text)
+        if not q.any():
+            return
+        now = time.time()
+        with self._lock:
+            idx = self._index(space)
+            i, sim = idx.search(q, now)
+            if i < 0 or sim < 0.999:
+                # почти точный дубль перезаписывает свою строку, а не занимает новую
+                i = idx.slot(now)
+            idx.vecs[i] = q
+            idx.values[i] = value
+            idx.texts[i] = text[:200]
+            idx.used[i] = now
+            idx.expires[i] = now + self.ttl
+            idx.stores += 1
+
+    def clear(self, space: Optional[str] = None) -> int:
+        """space — пространство целиком или место вызова: "mp.coach" чистит и "mp.coach:<этап>"."""
+        with self._lock:
+            if space is None:
+                n = sum(i.size for i in self._indexes.values())
+                self._indexes.clear()
+                return n
+            names = [k for k in self._indexes if k == space or k.startswith(space + ":")]
+            return sum(self._indexes.pop(k).size for k in names)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            spaces = {}
+            for name, idx in sorted(self._indexes.items()):
+                total = idx.hits + idx.misses
+                spaces[name] = {
+                    "size": idx.size, "hits": idx.hits, "misses": idx.misses, "stores": idx.stores,
+                    "evictions": idx.evictions, "hit_rate": round(idx.hits / total, 4) if total else 0.0,
+                }
+            return {
+                "enabled": self.enabled,
+                "numpy": np is not None,
+                "threshold": self.threshold,
+                "capacity_per_space": self.size,
+                "dim": self.vectorizer.dim if self.vectorizer else None,
+                "spaces": spaces,
+                "similarity_histogram": {f"{b / _BINS:.1f}-{(b + 1) / _BINS:.1f}": n for b, n in enumerate(self._hist)},
+            }
+
+
+_SEMANTIC: Optional[SemanticCache] = None
+_SEMANTIC_LOCK = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    global _SEMANTIC
+    if _SEMANTIC is None:
+        with _SEMANTIC_LOCK:
+            if _SEMANTIC is None:
+                _SEMANTIC = SemanticCache()
+    return _SEMANTIC
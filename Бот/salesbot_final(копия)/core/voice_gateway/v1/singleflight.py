@@ -0,0 +1,106 @@
+"""
+Single-flight: одинаковые запросы к LLM, пришедшие одновременно, идут в API один раз.
+
+Первый вызов с данным ключом (лидер) делает HTTP-запрос, остальные ждут его
+результат. Async-вызовы склеиваются в пределах своего event loop, sync — в
+пределах процесса. LLM_SINGLE_FLIGHT=0 выключает.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self.enabled = os.environ.get("LLM_SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no", "off")
+        self._lock = threading.Lock()
+        self._sync: Dict[str, Future] = {}
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = \
+            weakref.WeakKeyDictionary()
+        self.leaders = 0
+        self.saved = 0
+
+    async def ado(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await call()
+        loop = asyncio.get_running_loop()
+        table = self._async.get(loop)
+        if table is None:
+            table = self._async.setdefault(loop, {})
+        fut = table.get(key)
+        if fut is not None:
+            self.saved += 1
+            try:
+                # shield: отмена ожидающего не должна отменять запрос лидера
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+            # лидера отменили — идём сами
+            self.saved -= 1
+            return await self.ado(key, call)
+
+        fut = loop.create_future()
+        table[key] = fut
+        self.leaders += 1
+        try:
+            res = await call()
+            fut.set_result(res)
+            return res
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # помечаем как прочитанное, если ждущих не было
+            raise
+        finally:
+            if table.get(key) is fut:
+                del table[key]
+
+    def do(self, key: str, call: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return call()
+        with self._lock:
+            fut = self._sync.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._sync[key] = fut
+                self.leaders += 1
+            else:
+                self.saved += 1
+        if not leader:
+            return fut.result()
+        try:
+            res = call()
+            fut.set_result(res)
+            return res
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._sync.get(key) is fut:
+                    del self._sync[key]
+
+    def stats(self) -> Dict[str, Any]:
+        in_flight = len(self._sync) + sum(len(t) for t in list(self._async.values()))
+        total = self.leaders + self.saved
+        return {
+            "enabled": self.enabled,
+            "upstream_calls": self.leaders,
+            "saved_calls": self.saved,
+            "saved_rate": round(self.saved / total, 4) if total else 0.0,
+            "in_flight": in_flight,
+        }
+
+
+_FLIGHTS = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _FLIGHTS
@@ -4,7 +4,16 @@ from typing import Any, Dict
 import os
 import requests
 
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+
+register_prefix(
+    "telegram_bot.assistant",
+    "Ты тёплый, живой ассистент проекта «На Счастье».\n"
+    "Отвечай коротко, по-человечески, без канцелярита, в тоне заботливого менеджера,\n"
+    "который помогает человеку создать персональную песню по его истории.\n"
+    "Задавай уточняющие вопросы по истории, эмоциям, поводу, но не дави на оплату."
+)
 
 router = APIRouter(
     prefix="/telegram_bot/v1",
@@ -85,20 +94,9 @@ async def telegram_webhook(update: Dict[str, Any]):
 
     # 2) Любой другой текст — отправляем в DeepSeek через VoicePipeline
     else:
-        vp = VoicePipeline()
-        system_prompt = (
-            "Ты тёплый, живой ассистент проекта «На Счастье».\n"
-            "Отвечай коротко, по-человечески, без канцелярита, в тоне заботливого менеджера,\n"
-            "который помогает человеку создать персональную песню по его истории.\n"
-            "Задавай уточняющие вопросы по истории, эмоциям, поводу, но не дави на оплату."
-        )
+        vp = get_voice_pipeline()
         try:
-            reply_text = vp.llm.chat(
-                [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": text},
-                ]
-            )
+            reply_text = await vp.llm.achat(build_prompt("telegram_bot.assistant", text))
         except Exception:
             # Если вдруг DeepSeek/VoicePipeline упал — не молчим.
             reply_text = (
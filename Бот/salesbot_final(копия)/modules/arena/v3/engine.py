@@ -1,12 +1,12 @@
 
 import time
 from .personas import PERSONAS
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
 
 class ArenaEngine:
     def __init__(self, mode: str="soft"):
         self.mode = mode if mode in PERSONAS else "soft"
-        self.pipeline = VoicePipeline()
+        self.pipeline = get_voice_pipeline()
         self.history = []
 
     def start(self):
@@ -38,7 +38,7 @@ def register_telegram(dp, registry):
         except:
             pass
         
-        arena = ArenaEngine(user_id)
+        arena = await ArenaEngine.open(user_id)
         state = arena.snapshot()
         
         client_types_ru = {
@@ -83,7 +83,7 @@ def register_telegram(dp, registry):
         
         user_id = str(message.from_user.id)
         arena = ArenaEngine(user_id)
-        arena.reset()
+        await arena.reset()
         
         # Clear active session
         try:
@@ -100,7 +100,7 @@ def register_telegram(dp, registry):
         from .engine import ArenaEngine
         
         user_id = str(message.from_user.id)
-        arena = ArenaEngine(user_id)
+        arena = await ArenaEngine.open(user_id)
         state = arena.snapshot()
         
         client_types_ru = {
@@ -1,8 +1,14 @@
 
-import json, random
+import copy, random
 from dataclasses import dataclass, asdict
-from core.state.v1 import StateStore
-from core.voice_gateway.v1 import VoicePipeline
+from typing import Optional
+from core.state.v1 import get_async_store
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.context import build_session_context, reset_session_context
+from core.voice_gateway.v1.prompts import register_prefix
+
+# постоянная часть промпта; тип/эмоция клиента — в tail, чтобы префикс кэшировался у провайдера
+SYSTEM = register_prefix("arena.client", "Ты клиент. Реагируй естественно.")
 
 EMOTIONS = ["calm","neutral","annoyed","angry","excited"]
 CLIENT_TYPES = [
@@ -17,58 +23,66 @@ class ArenaState:
     ctype: str
     emotion: str
     difficulty: str
-    history: list
     meta: dict
     def to_dict(self): return asdict(self)
 
 class ArenaEngine:
     def __init__(self, sid: str):
         self.sid=f"arena:{sid}"
-        self.store=StateStore("salesbot.db")
-        raw=self.store.get(self.sid)
-        if raw:
-            try:
-                d=json.loads(raw)
-                self.state=ArenaState(**d)
-            except:
-                self._reset()
-        else:
-            self._reset()
-
-        try: self.llm=VoicePipeline().llm
+        self.store=get_async_store()
+        self.state=None
+        try: self.llm=get_voice_pipeline().llm
         except: self.llm=None
 
-    def _reset(self):
+    @classmethod
+    async def open(cls, sid: str)->"ArenaEngine":
+        eng=cls(sid)
+        try:
+            d=await eng.store.get_session(eng.sid)
+            eng.state=ArenaState(**copy.deepcopy(d)) if d else None
+        except:
+            eng.state=None
+        if eng.state is None:
+            await eng._reset()
+        return eng
+
+    async def _reset(self):
+        await self.store.clear_turns(self.sid)
+        await reset_session_context(self.store, self.sid)
         self.state = ArenaState(
             ctype=random.choice(CLIENT_TYPES),
             emotion=random.choice(EMOTIONS),
             difficulty=random.choice(DIFFICULTY),
-            history=[],
             meta={"round":0}
         )
-        self._save()
+        await self._save()
 
-    def _save(self):
-        self.store.set(self.sid, json.dumps(self.state.to_dict(), ensure_ascii=False))
+    async def _save(self):
+        await self.store.set_json(self.sid, self.state.to_dict())
 
     def snapshot(self):
         return self.state.to_dict()
 
-    def handle(self, text: str)->dict:
-        self.state.history.append({"role":"user","content":text})
+    async def history(self, last: Optional[int]=None)->list:
+        return await self.store.history(self.sid, last)
+
+    async def turn_count(self, role: Optional[str] = None)->int:
+        return await self.store.turn_count(self.sid, role)
+
+    async def handle(self, text: str, on_delta=None)->dict:
+        await self.store.append_turn(self.sid, "user", text)
         self.state.meta["round"] += 1
 
         persona_desc=f"Тип: {self.state.ctype}. Эмоция: {self.state.emotion}. Сложность: {self.state.difficulty}."
         suggestion=None
         if self.llm:
             try:
-                msg=[
-                  {"role":"system","content":f"Ты клиент. {persona_desc} Реагируй естественно."},
-                  {"role":"user","content":text}
-                ]
-                suggestion=self.llm.chat(msg)
+                msg=await build_session_context(self.store, self.sid, SYSTEM, self.llm, site="arena.client", tail=persona_desc)
+                suggestion=await self.llm.achat(msg, on_delta=on_delta)
             except:
                 suggestion=None
+        if suggestion:
+            await self.store.append_turn(self.sid, "assistant", suggestion)
 
         # emotion shift
         if any(w in text.lower() for w in ["извиняюсь","понимаю","давайте","готов"]):
@@ -84,7 +98,7 @@ class ArenaEngine:
         if len(text)>20: score+=1
         if any(w in text.lower() for w in ["согласен","понимаю","давайте"]): score+=1
 
-        self._save()
+        await self._save()
 
         return {
             "ctype":self.state.ctype,
@@ -94,6 +108,6 @@ class ArenaEngine:
             "score":score
         }
 
-    def reset(self):
-        self._reset()
+    async def reset(self):
+        await self._reset()
         return {"ok":True}
@@ -1,6 +1,6 @@
 
 from fastapi import APIRouter, Request
-from .service import spawn_persona, step_dialog
+from .service import aspawn_persona, astep_dialog
 
 router = APIRouter(prefix="/arena_psy/v1", tags=["arena_psychotypes"])
 
@@ -11,7 +11,7 @@ async def health():
 @router.post("/spawn")
 async def spawn(req: Request):
     data = await req.json()
-    return spawn_persona(
+    return await aspawn_persona(
         difficulty=data.get("difficulty","medium"),
         psy_type=data.get("type"),
         context=data.get("context")
@@ -20,4 +20,4 @@ async def spawn(req: Request):
 @router.post("/step")
 async def step(req: Request):
     data = await req.json()
-    return step_dialog(data.get("state") or {}, data.get("manager_reply",""))
+    return await astep_dialog(data.get("state") or {}, data.get("manager_reply",""))
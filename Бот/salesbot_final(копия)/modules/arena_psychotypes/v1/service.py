@@ -1,7 +1,12 @@
 
 import json, random, re
 from typing import Dict, Any, Optional
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+
+# постоянные инструкции; тип / эмоция / давление — в tail
+register_prefix("psychotypes.spawn", "Ты играешь роль клиента. Говори кратко, натурально. Первая реплика — обозначь позицию.")
+register_prefix("psychotypes.step", "Ты клиент. Отвечай естественно, 1-3 фразы, соответствуя типу и эмоции. Если менеджер слаб — стань жестче; если хорош — смягчайся и продвигайся к следующему шагу.")
 
 EMO_STATES = ["calm","neutral","annoyed","angry"]
 DIFF_COEF = {"easy":0.6,"medium":1.0,"hard":1.4,"nightmare":1.8}
@@ -23,7 +28,7 @@ def _penalty(reply: str)->int:
     if re.search(r"успокойтесь|вы не правы", t): score += 2
     return score
 
-def spawn_persona(difficulty: str = "medium", psy_type: Optional[str] = None, context: Optional[str] = None)->dict:
+def _spawn(difficulty: str, psy_type: Optional[str], context: Optional[str]):
     if difficulty not in DIFF_COEF: difficulty = "medium"
     psy_type = psy_type or random.choice(list(PSY.keys()))
     persona = {
@@ -35,12 +40,19 @@ def spawn_persona(difficulty: str = "medium", psy_type: Optional[str] = None, co
         "context": context or ""
     }
     # стартовая реплика
-    vp = VoicePipeline()
-    msg = [
-        {"role":"system","content": f"Ты играешь роль клиента типа {psy_type}. Говори кратко, натурально. Первая реплика — обозначь позицию."},
-        {"role":"user","content": context or "Запрос: обсуждаем покупку медиа-продукта «На Счастье»."}
-    ]
-    first = vp.llm.chat(msg)
+    msg = build_prompt("psychotypes.spawn", context or "Запрос: обсуждаем покупку медиа-продукта «На Счастье».",
+                       tail=f"Тип клиента: {psy_type}.")
+    return persona, msg
+
+def spawn_persona(difficulty: str = "medium", psy_type: Optional[str] = None, context: Optional[str] = None)->dict:
+    persona, msg = _spawn(difficulty, psy_type, context)
+    first = get_voice_pipeline().llm.chat(msg)
+    persona["last_client"] = first
+    return {"ok": True, "state": persona, "client_reply": first}
+
+async def aspawn_persona(difficulty: str = "medium", psy_type: Optional[str] = None, context: Optional[str] = None)->dict:
+    persona, msg = _spawn(difficulty, psy_type, context)
+    first = await get_voice_pipeline().llm.achat(msg)
     persona["last_client"] = first
     return {"ok": True, "state": persona, "client_reply": first}
 
@@ -57,10 +69,8 @@ def _next_emotion(emotion: str, penalty: int, diff: str)->str:
     idx = max(0, min(len(EMO_STATES)-1, idx + shift))
     return EMO_STATES[idx]
 
-def step_dialog(state: Dict[str,Any], manager_reply: str)->dict:
+def _step(state: Dict[str,Any], manager_reply: str):
     st = dict(state or {})
-    if not st:
-        return {"ok": False, "error":"empty state"}
     penalty = _penalty(manager_reply)
     st["turn"] = int(st.get("turn",0)) + 1
     st["pressure"] = max(0.0, float(st.get("pressure",0.0)) + penalty * 0.2)
@@ -68,14 +78,23 @@ def step_dialog(state: Dict[str,Any], manager_reply: str)->dict:
     psy = st.get("type","cold")
 
     # шаблон реакции
-    sys_style = f"Ты клиент {psy}. Эмоция: {st['emotion']}. Давление: {st['pressure']:.1f}. Отвечай естественно, 1-3 фразы, соответствуя типу и эмоции. Если менеджер слаб — стань жестче; если хорош — смягчайся и продвигайся к следующему шагу."
-    vp = VoicePipeline()
-    msg = [
-        {"role":"system","content": sys_style},
-        {"role":"assistant","content": st.get("last_client","")},
-        {"role":"user","content": manager_reply}
-    ]
-    reply = vp.llm.chat(msg)
+    msg = build_prompt("psychotypes.step", manager_reply,
+                       tail=f"Тип клиента: {psy}. Эмоция: {st['emotion']}. Давление: {st['pressure']:.1f}.",
+                       history=[{"role":"assistant","content": st.get("last_client","")}])
+    return st, penalty, msg
+
+def step_dialog(state: Dict[str,Any], manager_reply: str)->dict:
+    if not state:
+        return {"ok": False, "error":"empty state"}
+    st, penalty, msg = _step(state, manager_reply)
+    reply = get_voice_pipeline().llm.chat(msg)
     st["last_client"] = reply
+    return {"ok": True, "state": st, "client_reply": reply, "penalty": penalty}
 
+async def astep_dialog(state: Dict[str,Any], manager_reply: str)->dict:
+    if not state:
+        return {"ok": False, "error":"empty state"}
+    st, penalty, msg = _step(state, manager_reply)
+    reply = await get_voice_pipeline().llm.achat(msg)
+    st["last_client"] = reply
     return {"ok": True, "state": st, "client_reply": reply, "penalty": penalty}
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 import os, json
-from .service import list_cases, get_case, top_seller_reply, coach_generate_pitch, arena_context
+from .service import list_cases, get_case, top_seller_reply, acoach_generate_pitch, arena_context
 
 router = APIRouter(prefix="/client_cases/v1", tags=["client_cases"])
 router_noversion = APIRouter(prefix="/client_cases", tags=["client_cases"])
@@ -100,7 +100,7 @@ async def coach_pitch(case_id: str, tone: str = "firm"):
     c = get_case(case_id)
     if not c:
         return JSONResponse({"error":"not found"}, status_code=404)
-    return {"pitch": coach_generate_pitch(c, tone)}
+    return {"pitch": await acoach_generate_pitch(c, tone)}
 
 @router.get("/arena/{case_id}")
 async def case_to_arena(case_id: str):
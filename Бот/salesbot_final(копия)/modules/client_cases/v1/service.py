@@ -1,11 +1,14 @@
 
 import os, json, random
 from typing import List, Dict, Any, Optional
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
 
 BASE = os.path.dirname(__file__)
 DATA = os.path.join(BASE, "data", "cases.json")
 
+register_prefix("cases.pitch", "Ты топ-продажник бренда «На Счастье». Короткий питч: ценность→структура→вопрос. 2–3 фразы.")
+
 def _load()->List[dict]:
     with open(DATA,"r",encoding="utf-8") as f:
         return json.load(f)
@@ -33,12 +36,20 @@ def get_case(case_id: str)->Optional[dict]:
 def top_seller_reply(case: dict)->str:
     return case.get("top_seller_answer") or case.get("best_practice_answer")
 
+def _pitch_prompt(case: dict):
+    return build_prompt("cases.pitch", json.dumps(case, ensure_ascii=False)[:2000])
+
 def coach_generate_pitch(case: dict, tone: str="firm")->str:
-    vp = VoicePipeline()
-    sys = "Ты топ-продажник бренда «На Счастье». Короткий питч: ценность→структура→вопрос. 2–3 фразы."
-    msg = [{"role":"system","content":sys},{"role":"user","content": json.dumps(case, ensure_ascii=False)[:2000]}]
+    vp = get_voice_pipeline()
+    try:
+        return vp.llm.chat(_pitch_prompt(case))
+    except Exception:
+        return top_seller_reply(case)
+
+async def acoach_generate_pitch(case: dict, tone: str="firm")->str:
+    vp = get_voice_pipeline()
     try:
-        return vp.llm.chat(msg)
+        return await vp.llm.achat(_pitch_prompt(case))
     except Exception:
         return top_seller_reply(case)
 
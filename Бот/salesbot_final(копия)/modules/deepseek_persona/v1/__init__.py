@@ -28,7 +28,8 @@ def register_telegram(dp, registry):
         Команда /coach <текст> - получить совет коуча
         Пример: /coach Как ответить клиенту на возражение о цене?
         """
-        from .service import persona_chat
+        from .service import apersona_chat
+        from telegram.streaming import StreamingReply
         
         # Получаем текст после команды
         text = command.args if command else None
@@ -41,9 +42,10 @@ def register_telegram(dp, registry):
             return
         
         try:
-            # Генерируем ответ коуча
-            reply = persona_chat(text, role="coach")
-            await message.reply(f"🎓 Совет коуча:\n\n{reply}")
+            # Генерируем ответ коуча, показывая его по мере генерации
+            async with StreamingReply(message, header="🎓 Совет коуча:\n\n", parse_mode=None) as sr:
+                reply = await apersona_chat(text, role="coach", cache="persona.coach", on_delta=sr.feed)
+                await sr.finish(f"🎓 Совет коуча:\n\n{reply}")
         except Exception as e:
             await message.reply(f"❌ Ошибка: {str(e)}")
     
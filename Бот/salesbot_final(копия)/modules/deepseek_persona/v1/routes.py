@@ -1,7 +1,7 @@
 
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
-from .service import load_persona, persona_chat, apply_persona
+from .service import load_persona, apersona_chat, apply_persona
 
 router = APIRouter(prefix="/deepseek_persona/v1", tags=["deepseek_persona"])
 
@@ -14,7 +14,7 @@ async def persona_chat_api(req: Request):
     data = await req.json()
     prompt = data.get("prompt", "")
     role = data.get("role", "coach")
-    return {"reply": persona_chat(prompt, role)}
+    return {"reply": await apersona_chat(prompt, role)}
 
 @router.post("/stylize")
 async def stylize_api(req: Request):
@@ -1,7 +1,8 @@
 
 import os, json, random
-from typing import Dict, Any
-from core.voice_gateway.v1 import VoicePipeline
+from typing import Dict, Any, List, Optional
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
 
 BASE = os.path.dirname(__file__)
 DATA = os.path.join(BASE, "data", "persona.json")
@@ -10,33 +11,68 @@ def load_persona()->Dict[str, Any]:
     with open(DATA, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def apply_persona(role: str, text: str)->str:
-    persona = load_persona()
-    blocks = persona.get("templates", {})
-    tone = persona.get("tone", {})
-    prefix = ""
+_CACHED: Dict[str, Any] = {"mtime": None, "persona": {}}
+
+def _persona()->Dict[str, Any]:
+    # persona.json читается и системный префикс собирается один раз на версию файла
+    mtime = os.path.getmtime(DATA)
+    if _CACHED["mtime"] != mtime:
+        persona = load_persona()
+        register_prefix("persona",
+            "Ты говоришь от имени бренда «На Счастье»: тёплый, уверенный стиль, "
+            "эмоции, искренность, уважение. Следуй правилам:\n" +
+            "\n".join(persona.get("rules", []))
+        )
+        _CACHED.update(mtime=mtime, persona=persona)
+    return _CACHED["persona"]
+
+def _persona_prefix(role: str)->str:
+    blocks = _persona().get("templates", {})
     if role == "coach":
-        prefix = random.choice(blocks.get("coach_opening", ["Смотри:"]))
+        return random.choice(blocks.get("coach_opening", ["Смотри:"]))
     elif role == "client_emotional":
-        prefix = random.choice(blocks.get("client_emotional", ["Мне важно…"]))
+        return random.choice(blocks.get("client_emotional", ["Мне важно…"]))
     elif role == "client_rational":
-        prefix = random.choice(blocks.get("client_rational", ["Мне нужно…"]))
-    return f"{prefix} {text}"
-
-def persona_chat(prompt: str, role: str="coach")->str:
-    persona = load_persona()
-    vp = VoicePipeline()
-    sys = (
-        "Ты говоришь от имени бренда «На Счастье»: тёплый, уверенный стиль, "
-        "эмоции, искренность, уважение. Следуй правилам:\n" +
-        "\n".join(persona.get("rules", []))
-    )
-    msg = [
-        {"role": "system", "content": sys},
-        {"role": "user", "content": prompt}
-    ]
+        return random.choice(blocks.get("client_rational", ["Мне нужно…"]))
+    return ""
+
+def apply_persona(role: str, text: str)->str:
+    return f"{_persona_prefix(role)} {text}"
+
+def _persona_messages(prompt: str)->List[Dict[str, str]]:
+    _persona()
+    return build_prompt("persona", prompt)
+
+def persona_chat(prompt: str, role: str="coach", cache: Optional[str]=None)->str:
+    vp = get_voice_pipeline()
+    msg = _persona_messages(prompt)
     try:
-        base = vp.llm.chat(msg)
+        base = vp.llm.chat(msg, cache=cache)
         return apply_persona(role, base)
     except Exception:
         return apply_persona(role, prompt)
+
+_STREAM_ERROR = "Не получилось ответить, попробуй ещё раз."
+
+async def apersona_chat(prompt: str, role: str="coach", cache: Optional[str]=None, on_delta=None)->str:
+    """Async persona_chat; с on_delta ответ отдаётся кусками по мере генерации (префикс роли — с первым куском)."""
+    vp = get_voice_pipeline()
+    msg = _persona_messages(prompt)
+    prefix = _persona_prefix(role) + " "
+    if on_delta is None:
+        try:
+            return prefix + await vp.llm.achat(msg, cache=cache)
+        except Exception:
+            return apply_persona(role, prompt)
+    streamed: List[str] = []
+    async def relay(delta: str):
+        # префикс уходит вместе с первым токеном LLM, иначе время до первого токена ничего не значит
+        if not delta:
+            return
+        streamed.append(delta)
+        await on_delta(prefix + delta if len(streamed) == 1 else delta)
+    try:
+        return prefix + await vp.llm.achat(msg, cache=cache, on_delta=relay)
+    except Exception:
+        # обрыв посреди потока: оставляем показанное, а не подменяем его текстом пользователя
+        return (prefix + "".join(streamed) + "…") if streamed else _STREAM_ERROR
@@ -1,6 +1,6 @@
 
 from fastapi import APIRouter, Request
-from .service import start_session, append_message, analyze_session, list_sessions
+from .service import start_session, append_message, aanalyze_session, list_sessions
 
 router = APIRouter(prefix="/dialog_memory/v1", tags=["dialog_memory"])
 
@@ -43,7 +43,7 @@ async def append(req: Request):
 @router.post("/analyze")
 async def analyze(req: Request):
     data = await req.json()
-    return analyze_session(data.get("manager_id"), data.get("session_id"))
+    return await aanalyze_session(data.get("manager_id"), data.get("session_id"))
 
 @router.get("/list/{manager_id}")
 async def list_all(manager_id: str):
@@ -1,7 +1,10 @@
 
 import os, json, time, uuid
 from typing import List, Dict, Any, Optional
-from core.voice_gateway.v1 import VoicePipeline
+from pydantic import BaseModel, Field, ValidationError
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.context import estimate_tokens, fit_history, get_context_builder
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix, tag
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "sessions")
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -45,40 +48,131 @@ def append_message(manager_id: str, session_id: str, role: str, content: str, st
     save_session(manager_id, session_id, record)
     return record
 
-def analyze_session(manager_id: str, session_id: str):
-    record = load_session(manager_id, session_id)
-    if not record:
-        return None
+def _transcript_window(record: dict, budget: int):
+    """-> (резюме, реплики для него или None, хвост истории) — хвост целыми репликами в пределах бюджета."""
+    history = record.get("history") or []
+    summary = record.get("summary") or {}
+    upto = int(summary.get("upto", 0))
+    if upto > len(history):
+        summary, upto = {}, 0
+    text = summary.get("text")
+    kept = fit_history(history[upto:], max(0, budget - estimate_tokens(text)))
+    older = len(history) - len(kept)
+    return text, (history[upto:older] if older > upto else None), kept
+
+def _transcript_text(record: dict, text: Optional[str], kept: list, budget: int, fold: Optional[list])->str:
+    if fold is not None:
+        # всё старше хвоста — в резюме record["summary"]
+        history = record.get("history") or []
+        older = len(history) - len(kept)
+        record["summary"] = {"upto": older, "text": text}
+        kept = fit_history(history[older:], max(0, budget - estimate_tokens(text)))
+    body = json.dumps(kept, ensure_ascii=False)
+    return f"Ранее в диалоге: {text}\n\nПоследние реплики: {body}" if text else body
+
+def _transcript(vp, record: dict, budget: int)->str:
+    text, fold, kept = _transcript_window(record, budget)
+    if fold is not None:
+        text = get_context_builder().summarize(vp.llm, text, fold)
+    return _transcript_text(record, text, kept, budget, fold)
 
-    vp = VoicePipeline()
-    msg = [
-        {"role": "system",
-         "content": "Ты анализируешь диалог менеджера. Выдели 3 ошибки, 3 сильные стороны и итоговый балл (0..100). Формат JSON: {errors:[], strengths:[], score:int}"},
-        {"role": "user", "content": json.dumps(record["history"], ensure_ascii=False)[:3000]}
-    ]
-    j = vp.llm.chat(msg)
+async def _atranscript(vp, record: dict, budget: int)->str:
+    text, fold, kept = _transcript_window(record, budget)
+    if fold is not None:
+        text = await get_context_builder().asummarize(vp.llm, text, fold)
+    return _transcript_text(record, text, kept, budget, fold)
+
+_ANALYSIS_SYSTEM = register_prefix("dialog_memory.analyze", (
+    "Ты анализируешь диалог менеджера. Выдели 3 ошибки, 3 сильные стороны, итоговый балл (0..100) "
+    "и 3 короткие рекомендации, как улучшить навыки менеджеру — сильно, чётко. "
+    "Ответь одним JSON-объектом без текста вокруг, пример: "
+    '{"errors": ["..."], "strengths": ["..."], "score": 70, "recommendations": ["..."]}'
+))
+
+class SessionAnalysis(BaseModel):
+    errors: List[str]
+    strengths: List[str]
+    score: int = Field(ge=0, le=100)
+    recommendations: List[str] = Field(min_length=1)
+
+def _parse_analysis(raw: Optional[str]):
+    """-> (SessionAnalysis | None, ошибка для repair-запроса)"""
+    if raw is None:
+        return None, "LLM недоступен"
+    text = raw.strip()
+    if text.startswith("```"):
+        # ```json ... ``` — частая обёртка даже в JSON-режиме
+        text = text.strip("`").strip()
+        if text[:4].lower() == "json":
+            text = text[4:]
     try:
-        data = json.loads(j)
-        record["errors"] = data.get("errors", [])
-        record["strengths"] = data.get("strengths", [])
-        record["score"] = int(data.get("score", 70))
-    except:
+        return SessionAnalysis.model_validate(json.loads(text)), None
+    except json.JSONDecodeError as e:
+        return None, f"невалидный JSON: {e}"
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, x['loc']))}: {x['msg']}" for x in e.errors()[:5])
+
+def _repair_prompt(msg, raw: str, err: str):
+    # одна попытка починки: модель видит свой ответ и что в нём не так
+    return tag(msg + [
+        {"role": "assistant", "content": (raw or "")[:2000]},
+        {"role": "user", "content": f"Ответ не прошёл проверку ({err}). Верни исправленный JSON-объект строго в формате из инструкции."}
+    ], msg.site)
+
+def _store_analysis(manager_id: str, session_id: str, record: dict, data, err):
+    if data is not None:
+        record["errors"] = data.errors[:3]
+        record["strengths"] = data.strengths[:3]
+        record["score"] = data.score
+        record["next_recommendations"] = data.recommendations[:3]
+        record.pop("analysis_error", None)
+    else:
         record["errors"] = ["Автоматическая ошибка"]
         record["strengths"] = ["Хороший тон"]
         record["score"] = 70
-
-    # Recommendations:
-    msg2 = [
-        {"role":"system", 
-         "content": "Дай 3 короткие рекомендации, как улучшить навыки менеджеру. Сильно, чётко."},
-        {"role":"user","content": json.dumps(record["errors"], ensure_ascii=False)}
-    ]
-    rec = vp.llm.chat(msg2)
-    record["next_recommendations"] = rec.split("\n")[:3]
+        record["next_recommendations"] = [
+            "Задавай 1–2 уточняющих вопроса перед предложением.",
+            "Переводи разговор о цене к ценности результата.",
+            "Заканчивай каждый ответ следующим шагом.",
+        ]
+        record["analysis_error"] = err
 
     save_session(manager_id, session_id, record)
     return record
 
+def _analysis_budget()->int:
+    return get_context_builder().budget - estimate_tokens(_ANALYSIS_SYSTEM)
+
+def analyze_session(manager_id: str, session_id: str):
+    record = load_session(manager_id, session_id)
+    if not record:
+        return None
+
+    vp = get_voice_pipeline()
+    msg = build_prompt("dialog_memory.analyze", _transcript(vp, record, _analysis_budget()))
+    # один запрос на ошибки/сильные стороны/балл/рекомендации, JSON-режим + проверка схемы
+    raw = vp.llm.chat(msg, priority="background", json_mode=True)
+    data, err = _parse_analysis(raw)
+    if data is None and raw is not None:
+        # чиним только кривой ответ API; None — LLM недоступен, повтор не поможет
+        data, err = _parse_analysis(vp.llm.chat(_repair_prompt(msg, raw, err), priority="background", json_mode=True))
+    return _store_analysis(manager_id, session_id, record, data, err)
+
+async def aanalyze_session(manager_id: str, session_id: str):
+    """То же для async-роутов: запросы к LLM не блокируют event loop."""
+    record = load_session(manager_id, session_id)
+    if not record:
+        return None
+
+    vp = get_voice_pipeline()
+    msg = build_prompt("dialog_memory.analyze", await _atranscript(vp, record, _analysis_budget()))
+    raw = await vp.llm.achat(msg, priority="background", json_mode=True)
+    data, err = _parse_analysis(raw)
+    if data is None and raw is not None:
+        # чиним только кривой ответ API; None — LLM недоступен, повтор не поможет
+        data, err = _parse_analysis(await vp.llm.achat(_repair_prompt(msg, raw, err), priority="background", json_mode=True))
+    return _store_analysis(manager_id, session_id, record, data, err)
+
 def list_sessions(manager_id: str):
     files = os.listdir(DATA_DIR)
     sessions = []
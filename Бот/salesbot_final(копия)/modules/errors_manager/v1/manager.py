@@ -1,10 +1,104 @@
+import traceback, json, time, os, threading
+from typing import Any, Dict, List, Optional
+from core.state.v1 import SQLiteBackend, get_store
+from core.state.v1.group_commit import GroupCommitter
+
+_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS errors (
+      id INTEGER PRIMARY KEY,
+      ts REAL NOT NULL,
+      module TEXT NOT NULL,
+      type TEXT,
+      message TEXT,
+      trace TEXT
+    )''',
+    "CREATE INDEX IF NOT EXISTS errors_ts_idx ON errors(ts)",
+    "CREATE INDEX IF NOT EXISTS errors_module_ts_idx ON errors(module, ts)",
+    "CREATE INDEX IF NOT EXISTS errors_type_ts_idx ON errors(type, ts)",
+]
+
+_INSERT = "INSERT INTO errors(ts, module, type, message, trace) VALUES(?,?,?,?,?)"
+
+
+class _ErrorLog:
+    """Per-database error writer: inserts are queued and committed in batches
+    by a background thread, so log_error() never waits for SQLite."""
+
+    def __init__(self, db: SQLiteBackend):
+        self.db = db
+        self.max_pending = int(os.environ.get("ERRORS_MAX_PENDING", "10000"))
+        self.keep = float(os.environ.get("ERRORS_KEEP_DAYS", "30")) * 86400
+        self.dropped = 0
+        self._last_prune = 0.0
+        self._last = None
+        self.db.execute_batch([(s, ()) for s in _SCHEMA])
+        self._migrate_kv()
+        window = float(os.environ.get("ERRORS_FLUSH_MS", "50")) / 1000.0
+        self.writer = GroupCommitter(db.execute_batch, window=window, max_batch=1000)
+
+    def _migrate_kv(self):
+        # errors used to be kv rows "error:{module}:{ts}"; move them over once
+        while True:
+            items = self.db.scan("error:", 500)
+            if not items:
+                return
+            stmts = []
+            for k, v in items:
+                try:
+                    e = json.loads(v)
+                    stmts.append((_INSERT, (float(e.get("time") or 0), str(e.get("module") or k.split(":")[1]),
+                                            e.get("type"), e.get("message"), e.get("trace"))))
+                except Exception:
+                    pass
+                stmts.append(("DELETE FROM kv WHERE key = ?", (k,)))
+            self.db.execute_batch(stmts)
+
+    def add(self, info: Dict[str, Any]) -> None:
+        # under an error storm the queue is bounded: excess records are counted, not stored
+        if self.writer.pending() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._last = self.writer.submit(_INSERT, (info["time"], info["module"], info["type"], info["message"], info["trace"]))
+        now = info["time"]
+        if self.keep > 0 and now - self._last_prune > 3600:
+            self._last_prune = now
+            self.writer.submit("DELETE FROM errors WHERE ts < ?", (now - self.keep,))
+
+    def flush(self, timeout: Optional[float] = 5.0) -> None:
+        fut = self._last
+        if fut is not None:
+            try:
+                fut.result(timeout)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        st = self.writer.stats()
+        st["dropped"] = self.dropped
+        return st
+
+
+_LOGS: Dict[str, _ErrorLog] = {}
+_LOGS_LOCK = threading.Lock()
+
+def _error_log(db_file: str) -> _ErrorLog:
+    key = os.path.abspath(db_file)
+    with _LOGS_LOCK:
+        log = _LOGS.get(key)
+        if log is None:
+            backend = get_store(db_file).backend
+            if not isinstance(backend, SQLiteBackend):
+                # session state lives elsewhere (STATE_BACKEND); errors stay in the local file
+                backend = SQLiteBackend(db_file)
+            log = _ErrorLog(backend)
+            _LOGS[key] = log
+    return log
 
-import traceback, json, time
-from core.db.v1 import DB
 
 class ErrorsManager:
-    def __init__(self):
-        self.db = DB("salesbot.db")
+    def __init__(self, db_file: str = "salesbot.db"):
+        self.log = _error_log(db_file)
+        self.db = self.log.db
 
     def log_error(self, module: str, e: Exception):
         info = {
@@ -14,27 +108,52 @@ class ErrorsManager:
             "message": str(e),
             "trace": traceback.format_exc()
         }
-        key = f"error:{module}:{int(time.time())}"
-        self.db.set(key, json.dumps(info, ensure_ascii=False))
+        self.log.add(info)
         return info
 
-    def list_errors(self):
-        # naive scan: load all keys starting with 'error:'
-        out=[]
-        import sqlite3
-        conn = sqlite3.connect("salesbot.db")
-        cur = conn.execute("SELECT k,v FROM kv WHERE k LIKE 'error:%'")
-        for k,v in cur.fetchall():
+    def list_errors(self, module: Optional[str] = None, type: Optional[str] = None,
+                    since: Optional[float] = None, until: Optional[float] = None,
+                    before: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest first. For the next page pass the last item's "cursor" as `before`."""
+        self.log.flush()
+        where, args = [], []
+        if module is not None:
+            where.append("module = ?"); args.append(module)
+        if type is not None:
+            where.append("type = ?"); args.append(type)
+        if since is not None:
+            where.append("ts >= ?"); args.append(since)
+        if until is not None:
+            where.append("ts < ?"); args.append(until)
+        if before:
             try:
-                out.append(json.loads(v))
-            except Exception:
+                ts, rid = before.split(":", 1)
+                where.append("(ts, id) < (?, ?)"); args += [float(ts), int(rid)]
+            except ValueError:
                 pass
-        conn.close()
+        sql = "SELECT id, ts, module, type, message, trace FROM errors"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        args.append(max(1, min(int(limit), 1000)))
+        out = []
+        for rid, ts, mod, typ, msg, trace in self.db.query(sql, tuple(args)):
+            out.append({"id": rid, "module": mod, "time": ts, "type": typ, "message": msg,
+                        "trace": trace, "cursor": f"{ts!r}:{rid}"})
         return out
 
+    def counts(self, since: Optional[float] = None) -> Dict[str, int]:
+        """Errors per module, optionally only those logged after `since`."""
+        self.log.flush()
+        if since is None:
+            rows = self.db.query("SELECT module, COUNT(*) FROM errors GROUP BY module")
+        else:
+            rows = self.db.query("SELECT module, COUNT(*) FROM errors WHERE ts >= ? GROUP BY module", (since,))
+        return {m: n for m, n in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        return self.log.stats()
+
     def clear(self):
-        import sqlite3
-        conn = sqlite3.connect("salesbot.db")
-        conn.execute("DELETE FROM kv WHERE k LIKE 'error:%'")
-        conn.commit()
-        conn.close()
+        self.log.flush()
+        self.db.execute("DELETE FROM errors")
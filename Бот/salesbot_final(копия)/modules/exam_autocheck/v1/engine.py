@@ -1,12 +1,12 @@
 
 from .rules import check_rules
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
 
 class ExamAutoCheck:
     def __init__(self):
         # optional LLM-based checking
         try:
-            self.llm = VoicePipeline().llm
+            self.llm = get_voice_pipeline().llm
         except Exception:
             self.llm = None
 
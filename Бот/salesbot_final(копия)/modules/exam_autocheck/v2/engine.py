@@ -1,8 +1,11 @@
 
-import json, random
+import copy, random
 from dataclasses import dataclass, asdict
-from core.state.v1 import StateStore
-from core.voice_gateway.v1 import VoicePipeline
+from core.state.v1 import get_async_store
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+
+register_prefix("exam.grade", "Ты экзаменатор. Оцени ответ 0-5 и дай обратную связь.")
 
 MODULES = ["master_path","objections","upsell","arena"]
 
@@ -18,20 +21,24 @@ class ExamState:
 class ExamAutoCheck:
     def __init__(self, sid:str):
         self.sid=f"exam:{sid}"
-        self.store=StateStore("salesbot.db")
-        raw=self.store.get(self.sid)
-        if raw:
-            try:
-                d=json.loads(raw)
-                self.state=ExamState(**d)
-            except:
-                self._reset()
-        else:
-            self._reset()
-        try: self.llm=VoicePipeline().llm
+        self.store=get_async_store()
+        self.state=None
+        try: self.llm=get_voice_pipeline().llm
         except: self.llm=None
 
-    def _reset(self):
+    @classmethod
+    async def open(cls, sid: str)->"ExamAutoCheck":
+        eng=cls(sid)
+        try:
+            d=await eng.store.get_json(eng.sid)
+            eng.state=ExamState(**copy.deepcopy(d)) if d else None
+        except:
+            eng.state=None
+        if eng.state is None:
+            await eng._reset()
+        return eng
+
+    async def _reset(self):
         self.state = ExamState(
             module=random.choice(MODULES),
             answers=[],
@@ -39,16 +46,16 @@ class ExamAutoCheck:
             done=False,
             report={}
         )
-        self._save()
+        await self._save()
 
-    def _save(self):
-        self.store.set(self.sid, json.dumps(self.state.to_dict(), ensure_ascii=False))
+    async def _save(self):
+        await self.store.set_json(self.sid, self.state.to_dict())
 
-    def start(self):
-        self._reset()
+    async def start(self):
+        await self._reset()
         return {"ok":True, "module":self.state.module}
 
-    def answer(self, text:str)->dict:
+    async def answer(self, text:str)->dict:
         if self.state.done:
             return {"error":"exam finished"}
 
@@ -58,11 +65,8 @@ class ExamAutoCheck:
         feedback=None
         if self.llm:
             try:
-                msg=[
-                  {"role":"system","content":f"Ты экзаменатор. Модуль: {self.state.module}. Оцени ответ 0-5 и дай обратную связь."},
-                  {"role":"user","content":text}
-                ]
-                feedback=self.llm.chat(msg)
+                msg=build_prompt("exam.grade", text, tail=f"Модуль: {self.state.module}.")
+                feedback=await self.llm.achat(msg, priority="background")
                 if any(s in feedback.lower() for s in ["5","отлично","идеально"]):
                     partial_score=5
                 elif any(s in feedback.lower() for s in ["4"]):
@@ -77,7 +81,7 @@ class ExamAutoCheck:
                 partial_score=random.randint(1,5)
 
         self.state.score += partial_score
-        self._save()
+        await self._save()
 
         if len(self.state.answers)>=5:
             self.state.done=True
@@ -86,7 +90,7 @@ class ExamAutoCheck:
                 "total_score":self.state.score,
                 "answers":self.state.answers
             }
-            self._save()
+            await self._save()
             return {
                 "done":True,
                 "score":self.state.score,
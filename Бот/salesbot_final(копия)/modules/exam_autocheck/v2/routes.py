@@ -27,7 +27,7 @@ async def start_telegram(req: Request):
     # Use chat_id as session ID for telegram users
     sid = str(chat_id)
     ex = ExamAutoCheck(sid)
-    result = ex.start()
+    result = await ex.start()
     
     return {
         "ok": True,
@@ -41,7 +41,7 @@ async def start_telegram(req: Request):
 @router.post("/start/{sid}")
 async def start(sid:str):
     ex = ExamAutoCheck(sid)
-    result = ex.start()
+    result = await ex.start()
     return {"ok": True, "sid": sid}
 
 @router.post("/start_session")
@@ -39,7 +39,7 @@ def register_telegram(dp, registry):
         except:
             pass
         
-        mp = MasterPath(user_id)
+        mp = await MasterPath.open(user_id)
         state = mp.snapshot()
         
         stages_ru = {
@@ -80,8 +80,8 @@ def register_telegram(dp, registry):
         from .engine import MasterPath
         
         user_id = str(message.from_user.id)
-        mp = MasterPath(user_id)
-        new_stage = mp.advance()
+        mp = await MasterPath.open(user_id)
+        new_stage = await mp.advance()
         
         stages_ru = {
             "greeting": "Приветствие",
@@ -104,7 +104,7 @@ def register_telegram(dp, registry):
         
         user_id = str(message.from_user.id)
         mp = MasterPath(user_id)
-        mp._reset()
+        await mp.reset()
         
         # Clear active session
         try:
@@ -121,7 +121,7 @@ def register_telegram(dp, registry):
         from .engine import MasterPath
         
         user_id = str(message.from_user.id)
-        mp = MasterPath(user_id)
+        mp = await MasterPath.open(user_id)
         state = mp.snapshot()
         
         stages_ru = {
@@ -135,7 +135,7 @@ def register_telegram(dp, registry):
         }
         
         stage_name = stages_ru.get(state['stage'], state['stage'])
-        history_count = len(state.get('history', []))
+        history_count = await mp.turn_count("user")  # только реплики менеджера
         
         status_text = (
             f"📊 <b>Статус тренировки</b>\n\n"
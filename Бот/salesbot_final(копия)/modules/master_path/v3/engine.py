@@ -1,15 +1,20 @@
 
+import copy, os
 from dataclasses import dataclass, asdict
-from typing import Dict, Any
-from core.state.v1 import StateStore
-from core.voice_gateway.v1 import VoicePipeline
+from typing import Dict, Any, List, Optional
+from core.state.v1 import get_async_store
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.context import build_session_context, reset_session_context
+from core.voice_gateway.v1.prompts import register_prefix
 
 STAGES = ["greeting","qualification","support","offer","demo","final","done"]
+SYSTEM = register_prefix("mp.coach", "Ты коуч.")   # этап — в tail, префикс общий для всех сессий
+# этапы, где реплики почти одинаковые ("Здравствуйте, меня зовут…"): совет берётся из семантического кэша
+SEMANTIC_STAGES = [s.strip() for s in os.environ.get("MP_SEMANTIC_STAGES", "greeting,qualification").split(",") if s.strip()]
 
 @dataclass
 class MPState:
     stage: str
-    history: list
     metadata: dict
 
     def to_dict(self):
@@ -18,54 +23,64 @@ class MPState:
 class MasterPath:
     def __init__(self, session_id: str):
         self.sid = f"mp:{session_id}"
-        self.store = StateStore("salesbot.db")
-        raw = self.store.get(self.sid)
-        if raw:
-            try:
-                import json
-                d = json.loads(raw)
-                self.state = MPState(stage=d.get("stage","greeting"),
-                                     history=d.get("history",[]),
-                                     metadata=d.get("metadata",{}))
-            except Exception:
-                self._reset()
-        else:
-            self._reset()
+        self.store = get_async_store()
+        self.state = None
         try:
-            self.llm = VoicePipeline().llm
+            self.llm = get_voice_pipeline().llm
         except Exception:
             self.llm = None
 
-    def _reset(self):
-        self.state = MPState(stage="greeting", history=[], metadata={})
-        self._save()
+    @classmethod
+    async def open(cls, session_id: str)->"MasterPath":
+        mp = cls(session_id)
+        try:
+            d = await mp.store.get_session(mp.sid)
+            if d:
+                mp.state = MPState(stage=d.get("stage","greeting"),
+                                   metadata=copy.deepcopy(d.get("metadata",{})))
+        except Exception:
+            mp.state = None
+        if mp.state is None:
+            await mp._reset()
+        return mp
 
-    def _save(self):
-        import json
-        self.store.set(self.sid, json.dumps(self.state.to_dict(), ensure_ascii=False))
+    async def _reset(self):
+        await self.store.clear_turns(self.sid)
+        await reset_session_context(self.store, self.sid)
+        self.state = MPState(stage="greeting", metadata={})
+        await self._save()
+
+    async def _save(self):
+        await self.store.set_json(self.sid, self.state.to_dict())
 
     def snapshot(self)->dict:
         return self.state.to_dict()
 
-    def advance(self)->str:
+    async def history(self, last: Optional[int] = None)->List[Dict[str, Any]]:
+        return await self.store.history(self.sid, last)
+
+    async def turn_count(self, role: Optional[str] = None)->int:
+        return await self.store.turn_count(self.sid, role)
+
+    async def advance(self)->str:
         idx = STAGES.index(self.state.stage)
         if idx < len(STAGES)-1:
             self.state.stage = STAGES[idx+1]
-            self._save()
+            await self._save()
         return self.state.stage
 
-    def handle(self, text: str)->dict:
-        self.state.history.append({"role":"user","content":text})
+    async def handle(self, text: str)->dict:
+        await self.store.append_turn(self.sid, "user", text)
         suggestion = None
         if self.llm:
             try:
-                msg = [
-                    {"role":"system","content":f"Ты коуч. Текущий этап: {self.state.stage}."},
-                    {"role":"user","content": text}
-                ]
-                suggestion = self.llm.chat(msg)
+                msg = await build_session_context(self.store, self.sid, SYSTEM, self.llm, site="mp.coach", tail=f"Текущий этап: {self.state.stage}.")
+                semantic = (f"mp.coach:{self.state.stage}", text) if self.state.stage in SEMANTIC_STAGES else None
+                suggestion = await self.llm.achat(msg, semantic=semantic)
             except Exception:
                 suggestion = None
+        if suggestion:
+            await self.store.append_turn(self.sid, "assistant", suggestion)
 
         reply = {
             "stage": self.state.stage,
@@ -79,10 +94,10 @@ class MasterPath:
             score += 1
         reply["score"] = score
 
-        self.advance()
-        self._save()
+        await self.advance()
+        await self._save()
         return reply
 
-    def reset(self):
-        self._reset()
+    async def reset(self):
+        await self._reset()
         return {"ok": True}
@@ -18,7 +18,7 @@ async def start_telegram(req: Request):
     # Use chat_id as session ID for telegram users
     sid = str(chat_id)
     mp = MasterPath(sid)
-    mp.reset()
+    await mp.reset()
     
     # Get initial state to show user
     state = mp.snapshot()
@@ -34,5 +34,5 @@ async def start_telegram(req: Request):
 @router.post("/start/{sid}")
 async def start(sid: str):
     mp = MasterPath(sid)
-    mp.reset()
+    await mp.reset()
     return {"ok": True, "sid": sid}
\ No newline at end of file
@@ -1,6 +1,6 @@
 
 from fastapi import APIRouter, Request
-from .service import score_dialog, rubric_summary
+from .service import ascore_dialog, rubric_summary
 
 router = APIRouter(prefix="/master_path_rubrics/v1", tags=["master_path_rubrics"])
 
@@ -11,4 +11,4 @@ async def rubric():
 @router.post("/score")
 async def score(req: Request):
     data = await req.json()
-    return score_dialog(data.get("history", []))
+    return await ascore_dialog(data.get("history", []))
@@ -1,7 +1,10 @@
 
 import json, re
 from typing import List, Dict, Any
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+
+register_prefix("rubrics.tips", "Ты строгий коуч продаж. Дай 3 короткие прицельные рекомендации по улучшению на основе списка проблем. Формат: маркированный список.")
 
 def _load_rubric()->dict:
     import os, json
@@ -55,11 +58,10 @@ def _check(text: str, check_id: str)->bool:
 def rubric_summary()->dict:
     return RUBRIC
 
-def score_dialog(history: List[Dict[str,str]])->dict:
+def _score_checks(history: List[Dict[str,str]]):
     # history: [{role, content, stage}]
     stages = {k: {"score":0.0, "checks":[]} for k in RUBRIC.keys()}
     issues = []
-    tips = []
     total = 0.0
 
     # агрегируем по stage
@@ -86,21 +88,34 @@ def score_dialog(history: List[Dict[str,str]])->dict:
         total += stage_points
         stages[st] = {"score": stage_points, "checks": checks_res}
 
-    # LLM совет по улучшению (строгий коуч)
-    try:
-        vp = VoicePipeline()
-        msg = [
-            {"role":"system","content":"Ты строгий коуч продаж. Дай 3 короткие прицельные рекомендации по улучшению на основе списка проблем. Формат: маркированный список."},
-            {"role":"user","content": json.dumps(issues, ensure_ascii=False)[:2000]}
-        ]
-        coach = vp.llm.chat(msg)
-        tips = [t.strip(" -•") for t in coach.splitlines() if t.strip()][:5]
-    except Exception:
-        tips = []
-
     return {
         "stage_scores": stages,
         "total": round(total, 2),
         "issues": issues,
-        "tips": tips
+        "tips": []
     }
+
+def _tips_prompt(issues: list):
+    # LLM совет по улучшению (строгий коуч)
+    return build_prompt("rubrics.tips", json.dumps(issues, ensure_ascii=False)[:2000])
+
+def _tips(coach: str)->list:
+    return [t.strip(" -•") for t in coach.splitlines() if t.strip()][:5]
+
+def score_dialog(history: List[Dict[str,str]])->dict:
+    res = _score_checks(history)
+    try:
+        vp = get_voice_pipeline()
+        res["tips"] = _tips(vp.llm.chat(_tips_prompt(res["issues"]), cache="rubrics.tips", priority="background"))
+    except Exception:
+        res["tips"] = []
+    return res
+
+async def ascore_dialog(history: List[Dict[str,str]])->dict:
+    res = _score_checks(history)
+    try:
+        vp = get_voice_pipeline()
+        res["tips"] = _tips(await vp.llm.achat(_tips_prompt(res["issues"]), cache="rubrics.tips", priority="background"))
+    except Exception:
+        res["tips"] = []
+    return res
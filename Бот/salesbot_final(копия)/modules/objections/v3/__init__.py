@@ -38,7 +38,7 @@ def register_telegram(dp, registry):
         except:
             pass
         
-        obj = ObjectionEngine(user_id)
+        obj = await ObjectionEngine.open(user_id)
         state = obj.snapshot()
         
         objection_types_ru = {
@@ -85,7 +85,7 @@ def register_telegram(dp, registry):
         
         user_id = str(message.from_user.id)
         obj = ObjectionEngine(user_id)
-        obj._reset()
+        await obj.reset()
         
         # Clear active session
         try:
@@ -102,7 +102,7 @@ def register_telegram(dp, registry):
         from .engine import ObjectionEngine
         
         user_id = str(message.from_user.id)
-        obj = ObjectionEngine(user_id)
+        obj = await ObjectionEngine.open(user_id)
         state = obj.snapshot()
         
         objection_types_ru = {
@@ -127,7 +127,7 @@ def register_telegram(dp, registry):
         
         obj_type = objection_types_ru.get(state['objection_type'], state['objection_type'])
         persona = personas_ru.get(state['persona'], state['persona'])
-        history_count = len(state.get('history', []))
+        history_count = await obj.turn_count("user")  # только реплики менеджера
         
         status_text = (
             f"📊 <b>Статус тренировки</b>\n\n"
@@ -1,8 +1,13 @@
 
-import random, json
+import copy, random
 from dataclasses import dataclass, asdict
-from core.state.v1 import StateStore
-from core.voice_gateway.v1 import VoicePipeline
+from typing import Optional
+from core.state.v1 import get_async_store
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.context import build_session_context, reset_session_context
+from core.voice_gateway.v1.prompts import register_prefix
+
+SYSTEM = register_prefix("objections.client", "Ты клиент. Возражай естественно, в своём образе.")
 
 OBJECTION_TYPES = [
     "price","trust","hurry","think","ask_spouse","scam_fear",
@@ -20,7 +25,6 @@ PERSONAS = {
 class OBJState:
     persona: str
     objection_type: str
-    history: list
 
     def to_dict(self):
         return asdict(self)
@@ -28,48 +32,59 @@ class OBJState:
 class ObjectionEngine:
     def __init__(self, sid: str):
         self.sid=f"obj:{sid}"
-        self.store=StateStore("salesbot.db")
-        raw=self.store.get(self.sid)
-        if raw:
-            try:
-                d=json.loads(raw)
-                self.state=OBJState(**d)
-            except:
-                self._reset()
-        else:
-            self._reset()
+        self.store=get_async_store()
+        self.state=None
         try:
-            self.llm=VoicePipeline().llm
+            self.llm=get_voice_pipeline().llm
         except:
             self.llm=None
 
-    def _reset(self):
+    @classmethod
+    async def open(cls, sid: str)->"ObjectionEngine":
+        eng=cls(sid)
+        try:
+            d=await eng.store.get_session(eng.sid)
+            eng.state=OBJState(**copy.deepcopy(d)) if d else None
+        except:
+            eng.state=None
+        if eng.state is None:
+            await eng._reset()
+        return eng
+
+    async def _reset(self):
+        await self.store.clear_turns(self.sid)
+        await reset_session_context(self.store, self.sid)
         persona=random.choice(list(PERSONAS.keys()))
         otype=random.choice(OBJECTION_TYPES)
-        self.state=OBJState(persona=persona, objection_type=otype, history=[])
-        self._save()
+        self.state=OBJState(persona=persona, objection_type=otype)
+        await self._save()
 
-    def _save(self):
-        self.store.set(self.sid, json.dumps(self.state.to_dict(), ensure_ascii=False))
+    async def _save(self):
+        await self.store.set_json(self.sid, self.state.to_dict())
 
     def snapshot(self):
         return self.state.to_dict()
 
-    def handle(self, text: str)->dict:
-        self.state.history.append({"role":"user","content":text})
+    async def history(self, last: Optional[int]=None)->list:
+        return await self.store.history(self.sid, last)
+
+    async def turn_count(self, role: Optional[str] = None)->int:
+        return await self.store.turn_count(self.sid, role)
+
+    async def handle(self, text: str, on_delta=None)->dict:
+        await self.store.append_turn(self.sid, "user", text)
         persona_desc=PERSONAS[self.state.persona]
         ot=self.state.objection_type
 
         suggestion=None
         if self.llm:
             try:
-                msg=[
-                  {"role":"system","content":f"Ты клиент. Тип возражения: {ot}. {persona_desc}"},
-                  {"role":"user","content":text}
-                ]
-                suggestion=self.llm.chat(msg)
+                msg=await build_session_context(self.store, self.sid, SYSTEM, self.llm, site="objections.client", tail=f"Тип возражения: {ot}. {persona_desc}")
+                suggestion=await self.llm.achat(msg, on_delta=on_delta)
             except:
                 suggestion=None
+        if suggestion:
+            await self.store.append_turn(self.sid, "assistant", suggestion)
 
         # simple scoring
         score=0
@@ -78,7 +93,7 @@ class ObjectionEngine:
         if len(text)>20:
             score+=1
 
-        self._save()
+        await self._save()
 
         return {
             "persona": self.state.persona,
@@ -87,6 +102,6 @@ class ObjectionEngine:
             "score": score
         }
 
-    def reset(self):
-        self._reset()
+    async def reset(self):
+        await self._reset()
         return {"ok":True}
@@ -2,7 +2,12 @@
 import json
 from typing import List, Dict, Any
 from .rules import detect_type, detect_penalties, TYPES
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+from core.voice_gateway.v1.context import history_json
+
+register_prefix("objections.classify", "Классифицируй тип возражения: price/trust/need/timing/doubts/competing. Ответи только типом.")
+register_prefix("objections.patterns", "Ты строгий коуч продаж. Переформулируй шаблон ответа под реплику клиента и историю диалога. Сделай 2-3 внятные фразы + один уточняющий вопрос.")
 
 def _load_patterns()->dict:
     import json, os
@@ -12,17 +17,9 @@ def _load_patterns()->dict:
 
 PATTERNS = _load_patterns()
 
-def classify(utterance: str, history: List[Dict[str,str]]|None=None)->dict:
-    obj_type, conf, reasons = detect_type(utterance or "")
-    advice = None
+def _classified(obj_type, conf, reasons, guess: str|None)->dict:
     if not obj_type:
-        # fallback в LLM для распознавания типа
-        vp = VoicePipeline()
-        msg = [
-            {"role":"system","content":"Классифицируй тип возражения: price/trust/need/timing/doubts/competing. Ответи только типом."},
-            {"role":"user","content": utterance or ""}
-        ]
-        guess = (vp.llm.chat(msg) or "").strip().lower()
+        guess = (guess or "").strip().lower()
         if guess in TYPES:
             obj_type = guess
             conf = max(conf, 0.55)
@@ -40,22 +37,43 @@ def classify(utterance: str, history: List[Dict[str,str]]|None=None)->dict:
         "advice": advice
     }
 
-def apply_patterns(obj_type: str, history: List[Dict[str,str]]|None, last_reply: str)->dict:
-    pat = PATTERNS.get(obj_type) or {}
-    template = pat.get("template")
-    coach = pat.get("coach")
+def classify(utterance: str, history: List[Dict[str,str]]|None=None)->dict:
+    obj_type, conf, reasons = detect_type(utterance or "")
+    guess = None
+    if not obj_type:
+        # fallback в LLM для распознавания типа
+        vp = get_voice_pipeline()
+        guess = vp.llm.chat(build_prompt("objections.classify", utterance or ""), cache="objections.classify")
+    return _classified(obj_type, conf, reasons, guess)
+
+async def aclassify(utterance: str, history: List[Dict[str,str]]|None=None)->dict:
+    obj_type, conf, reasons = detect_type(utterance or "")
+    guess = None
+    if not obj_type:
+        vp = get_voice_pipeline()
+        guess = await vp.llm.achat(build_prompt("objections.classify", utterance or ""), cache="objections.classify")
+    return _classified(obj_type, conf, reasons, guess)
+
+def _patterns_prompt(obj_type: str, history: List[Dict[str,str]]|None, last_reply: str):
     # LLM перефраз дерева шаблона под контекст
-    vp = VoicePipeline()
-    msg = [
-        {"role":"system","content":"Ты строгий коуч продаж. Переформулируй шаблон ответа под реплику клиента и историю диалога. Сделай 2-3 внятные фразы + один уточняющий вопрос."},
-        {"role":"user","content": f"Шаблон: {template}\nРеплика клиента: {last_reply}\nИстория: {json.dumps(history or [])[:600]}"}
-    ]
-    coach_reply = vp.llm.chat(msg)
+    template = (PATTERNS.get(obj_type) or {}).get("template")
+    return build_prompt("objections.patterns", f"Шаблон: {template}\nРеплика клиента: {last_reply}\nИстория: {history_json(history, 300)}")
+
+def _patterns_result(obj_type: str, coach_reply: str|None)->dict:
+    pat = PATTERNS.get(obj_type) or {}
     return {
-        "template": template,
-        "coach_reply": coach_reply or coach
+        "template": pat.get("template"),
+        "coach_reply": coach_reply or pat.get("coach")
     }
 
+def apply_patterns(obj_type: str, history: List[Dict[str,str]]|None, last_reply: str)->dict:
+    vp = get_voice_pipeline()
+    return _patterns_result(obj_type, vp.llm.chat(_patterns_prompt(obj_type, history, last_reply)))
+
+async def aapply_patterns(obj_type: str, history: List[Dict[str,str]]|None, last_reply: str)->dict:
+    vp = get_voice_pipeline()
+    return _patterns_result(obj_type, await vp.llm.achat(_patterns_prompt(obj_type, history, last_reply)))
+
 def score_response(last_reply: str)->dict:
     penalties, delta = detect_penalties(last_reply or "")
     base = 0
@@ -1,7 +1,7 @@
 
 import json, time
 from dataclasses import dataclass, asdict
-from core.state.v1 import StateStore
+from core.state.v1 import get_store
 from integrations.patch_v4.payment_gateway import PaymentGateway
 from bridges.crm_sync.v1 import CRMSync
 
@@ -17,7 +17,7 @@ class PaymentDeal:
 class PaymentsEngine:
     def __init__(self, deal_id: str):
         self.key = f"payment:{deal_id}"
-        self.store = StateStore("salesbot.db")
+        self.store = get_store()
         self.pg = PaymentGateway()
         self.crm = CRMSync()
         raw = self.store.get(self.key)
@@ -1,11 +1,11 @@
 
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
 from .rules import scan
 
 class SleepingDragon:
     def __init__(self):
         try:
-            self.llm = VoicePipeline().llm
+            self.llm = get_voice_pipeline().llm
         except Exception:
             self.llm = None
 
@@ -1,8 +1,12 @@
 
-import json, random
+import copy, random
 from dataclasses import dataclass, asdict
-from core.state.v1 import StateStore
-from core.voice_gateway.v1 import VoicePipeline
+from typing import Optional
+from core.state.v1 import get_async_store
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+
+register_prefix("dragon.advice", "Ты супер‑коуч. Анализируй ошибки менеджера максимально честно.")
 
 ERROR_TYPES = [
     "too_fast","too_slow","no_greeting","weak_offer","no_questions","pressure",
@@ -18,7 +22,6 @@ LEVELS = ["low","medium","high"]
 
 @dataclass
 class DragonState:
-    history: list
     last_error: dict
     meta: dict
     def to_dict(self): return asdict(self)
@@ -26,31 +29,42 @@ class DragonState:
 class DragonEngine:
     def __init__(self, sid:str):
         self.sid=f"dragon:{sid}"
-        self.store=StateStore("salesbot.db")
-        raw=self.store.get(self.sid)
-        if raw:
-            try:
-                d=json.loads(raw)
-                self.state=DragonState(**d)
-            except:
-                self._reset()
-        else:
-            self._reset()
-        try: self.llm=VoicePipeline().llm
+        self.store=get_async_store()
+        self.state=None
+        try: self.llm=get_voice_pipeline().llm
         except: self.llm=None
 
-    def _reset(self):
-        self.state = DragonState(history=[], last_error={}, meta={"round":0})
-        self._save()
+    @classmethod
+    async def open(cls, sid: str)->"DragonEngine":
+        eng=cls(sid)
+        try:
+            d=await eng.store.get_session(eng.sid)
+            eng.state=DragonState(**copy.deepcopy(d)) if d else None
+        except:
+            eng.state=None
+        if eng.state is None:
+            await eng._reset()
+        return eng
 
-    def _save(self):
-        self.store.set(self.sid, json.dumps(self.state.to_dict(), ensure_ascii=False))
+    async def _reset(self):
+        await self.store.clear_turns(self.sid)
+        self.state = DragonState(last_error={}, meta={"round":0})
+        await self._save()
+
+    async def _save(self):
+        await self.store.set_json(self.sid, self.state.to_dict())
 
     def snapshot(self):
         return self.state.to_dict()
 
-    def handle(self, text:str)->dict:
-        self.state.history.append({"role":"user","content":text})
+    async def history(self, last: Optional[int]=None)->list:
+        return await self.store.history(self.sid, last)
+
+    async def turn_count(self, role: Optional[str] = None)->int:
+        return await self.store.turn_count(self.sid, role)
+
+    async def handle(self, text:str)->dict:
+        await self.store.append_turn(self.sid, "user", text)
         self.state.meta["round"] += 1
 
         # choose random error type (LLM improves quality)
@@ -60,16 +74,13 @@ class DragonEngine:
         advice=None
         if self.llm:
             try:
-                msg=[
-                  {"role":"system","content":"Ты супер‑коуч. Анализируй ошибки менеджера максимально честно."},
-                  {"role":"user","content":f"Фраза менеджера: {text}. Ошибка: {etype}. Уровень: {level}."}
-                ]
-                advice=self.llm.chat(msg)
+                msg=build_prompt("dragon.advice", f"Фраза менеджера: {text}. Ошибка: {etype}. Уровень: {level}.")
+                advice=await self.llm.achat(msg, cache="dragon.advice")
             except:
                 advice=None
 
         self.state.last_error={"type":etype,"level":level,"advice":advice}
-        self._save()
+        await self._save()
 
         return {
             "error_type": etype,
@@ -78,6 +89,6 @@ class DragonEngine:
             "round": self.state.meta["round"]
         }
 
-    def reset(self):
-        self._reset()
+    async def reset(self):
+        await self._reset()
         return {"ok":True}
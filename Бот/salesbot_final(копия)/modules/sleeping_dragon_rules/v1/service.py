@@ -1,7 +1,12 @@
 
 import json, re
 from typing import List, Dict, Any, Optional
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+from core.voice_gateway.v1.context import fit_history
+
+register_prefix("dragon_rules.score", "Ты строгий экзаменатор продаж. Оцени ответ по шкале 0..10, 3 короткие причины. Формат JSON: {score:int, reasons:[str,str,str]}.")
+register_prefix("dragon_rules.fix", "Ты строгий коуч. Перепиши ответ так, чтобы он соответствовал лучшей практике: ценность→короткий аргумент→уточняющий вопрос→мягкое CTA. 2–4 фразы.")
 
 def _load_rules()->list:
     import os, json
@@ -33,17 +38,14 @@ def _apply_rules(reply: str)->Dict[str,Any]:
     rule_score = max(0, min(10, 10 - minus))
     return {"penalties": penalties, "rule_score": rule_score}
 
-def _llm_score(history: Optional[List[dict]], reply: str, stage: Optional[str])->Dict[str,Any]:
+def _score_prompt(history: Optional[List[dict]], reply: str, stage: Optional[str]):
     # оцениваем смысловую сторону — кратко, 0..10 и 3 причины
-    vp = VoicePipeline()
-    msg = [
-        {"role":"system","content":"Ты строгий экзаменатор продаж. Оцени ответ по шкале 0..10, 3 короткие причины. Формат JSON: {score:int, reasons:[str,str,str]}."},
-        {"role":"user","content": json.dumps({"reply":reply, "stage":stage, "history":history or []}, ensure_ascii=False)[:2000]}
-    ]
-    j = (vp.llm.chat(msg) or "").strip()
+    return build_prompt("dragon_rules.score", json.dumps({"reply":reply, "stage":stage, "history":fit_history(history, 600)}, ensure_ascii=False))
+
+def _parse_score(j: Optional[str])->Dict[str,Any]:
     # попытка распарсить
     try:
-        data = json.loads(j)
+        data = json.loads((j or "").strip())
         score = int(data.get("score", 5))
         reasons = data.get("reasons", [])
         if not isinstance(reasons, list): reasons = [str(reasons)]
@@ -52,6 +54,14 @@ def _llm_score(history: Optional[List[dict]], reply: str, stage: Optional[str])-
     except Exception:
         return {"llm_score": 6, "reasons": ["Авто-оценка по умолчанию"]}
 
+def _llm_score(history: Optional[List[dict]], reply: str, stage: Optional[str])->Dict[str,Any]:
+    vp = get_voice_pipeline()
+    return _parse_score(vp.llm.chat(_score_prompt(history, reply, stage)))
+
+async def _allm_score(history: Optional[List[dict]], reply: str, stage: Optional[str])->Dict[str,Any]:
+    vp = get_voice_pipeline()
+    return _parse_score(await vp.llm.achat(_score_prompt(history, reply, stage)))
+
 def _combined(rule_score: int, llm_score: int)->int:
     # комбинированная оценка, чуть больше веса у правил (они точные)
     return int(round(0.6*rule_score + 0.4*llm_score))
@@ -62,12 +72,20 @@ def analyze_reply(history: Optional[List[dict]], reply: str, stage: Optional[str
     combined = _combined(r["rule_score"], l["llm_score"])
     return {"ok": True, "rule": r, "llm": l, "combined": combined}
 
-def suggest_fix(history: Optional[List[dict]], reply: str, stage: Optional[str]=None)->dict:
+async def aanalyze_reply(history: Optional[List[dict]], reply: str, stage: Optional[str]=None)->dict:
+    r = _apply_rules(reply or "")
+    l = await _allm_score(history, reply or "", stage)
+    combined = _combined(r["rule_score"], l["llm_score"])
+    return {"ok": True, "rule": r, "llm": l, "combined": combined}
+
+def _fix_prompt(history: Optional[List[dict]], reply: str, stage: Optional[str]):
     # короткая «правильная» версия ответа
-    vp = VoicePipeline()
-    msg = [
-        {"role":"system","content":"Ты строгий коуч. Перепиши ответ так, чтобы он соответствовал лучшей практике: ценность→короткий аргумент→уточняющий вопрос→мягкое CTA. 2–4 фразы."},
-        {"role":"user","content": json.dumps({"bad_reply":reply, "stage":stage, "history":history or []}, ensure_ascii=False)[:2000]}
-    ]
-    fix = vp.llm.chat(msg)
-    return {"ok": True, "suggestion": fix}
+    return build_prompt("dragon_rules.fix", json.dumps({"bad_reply":reply, "stage":stage, "history":fit_history(history, 600)}, ensure_ascii=False))
+
+def suggest_fix(history: Optional[List[dict]], reply: str, stage: Optional[str]=None)->dict:
+    vp = get_voice_pipeline()
+    return {"ok": True, "suggestion": vp.llm.chat(_fix_prompt(history, reply, stage))}
+
+async def asuggest_fix(history: Optional[List[dict]], reply: str, stage: Optional[str]=None)->dict:
+    vp = get_voice_pipeline()
+    return {"ok": True, "suggestion": await vp.llm.achat(_fix_prompt(history, reply, stage))}
@@ -1,4 +1,5 @@
 
+import asyncio
 from fastapi import APIRouter, Request
 from .service import new_session, turn, stop
 
@@ -12,7 +13,7 @@ async def start(req: Request):
 @router.post("/turn")
 async def go(req: Request):
     data = await req.json()
-    return turn(data.get("sid"), data.get("text",""))
+    return await asyncio.to_thread(turn, data.get("sid"), data.get("text",""))
 
 @router.post("/stop")
 async def fin(req: Request):
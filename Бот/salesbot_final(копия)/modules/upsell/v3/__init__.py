@@ -34,7 +34,7 @@ def register_telegram(dp, registry):
         except:
             pass
         
-        upsell = UpsellEngine(user_id)
+        upsell = await UpsellEngine.open(user_id)
         state = upsell.snapshot()
         
         modes_ru = {
@@ -73,7 +73,7 @@ def register_telegram(dp, registry):
         
         user_id = str(message.from_user.id)
         upsell = UpsellEngine(user_id)
-        upsell._reset()
+        await upsell.reset()
         
         # Clear active session
         try:
@@ -90,7 +90,7 @@ def register_telegram(dp, registry):
         from .engine import UpsellEngine
         
         user_id = str(message.from_user.id)
-        upsell = UpsellEngine(user_id)
+        upsell = await UpsellEngine.open(user_id)
         state = upsell.snapshot()
         
         modes_ru = {
@@ -107,7 +107,7 @@ def register_telegram(dp, registry):
         
         mode_name = modes_ru.get(state['mode'], state['mode'])
         package_name = packages_ru.get(state['package'], state['package'])
-        history_count = len(state.get('history', []))
+        history_count = await upsell.turn_count("user")  # только реплики менеджера
         
         status_text = (
             f"📊 <b>Статус тренировки</b>\n\n"
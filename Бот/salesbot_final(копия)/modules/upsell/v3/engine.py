@@ -1,8 +1,13 @@
 
-import json, random
+import copy, random
 from dataclasses import dataclass, asdict
-from core.state.v1 import StateStore
-from core.voice_gateway.v1 import VoicePipeline
+from typing import Optional
+from core.state.v1 import get_async_store
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.context import build_session_context, reset_session_context
+from core.voice_gateway.v1.prompts import register_prefix
+
+SYSTEM = register_prefix("upsell.client", "Ты клиент. Менеджер предлагает тебе допродажу.")
 
 MODES = ["soft","normal","aggressive"]
 PACKAGES = {
@@ -15,7 +20,6 @@ PACKAGES = {
 class USState:
     mode: str
     package: str
-    history: list
 
     def to_dict(self):
         return asdict(self)
@@ -23,48 +27,59 @@ class USState:
 class UpsellEngine:
     def __init__(self, sid:str):
         self.sid=f"us:{sid}"
-        self.store=StateStore("salesbot.db")
-        raw=self.store.get(self.sid)
-        if raw:
-            try:
-                d=json.loads(raw)
-                self.state=USState(**d)
-            except:
-                self._reset()
-        else:
-            self._reset()
+        self.store=get_async_store()
+        self.state=None
         try:
-            self.llm=VoicePipeline().llm
+            self.llm=get_voice_pipeline().llm
         except:
             self.llm=None
 
-    def _reset(self):
+    @classmethod
+    async def open(cls, sid: str)->"UpsellEngine":
+        eng=cls(sid)
+        try:
+            d=await eng.store.get_session(eng.sid)
+            eng.state=USState(**copy.deepcopy(d)) if d else None
+        except:
+            eng.state=None
+        if eng.state is None:
+            await eng._reset()
+        return eng
+
+    async def _reset(self):
+        await self.store.clear_turns(self.sid)
+        await reset_session_context(self.store, self.sid)
         mode=random.choice(MODES)
         pkg=random.choice(list(PACKAGES.keys()))
-        self.state=USState(mode=mode, package=pkg, history=[])
-        self._save()
+        self.state=USState(mode=mode, package=pkg)
+        await self._save()
 
-    def _save(self):
-        self.store.set(self.sid, json.dumps(self.state.to_dict(), ensure_ascii=False))
+    async def _save(self):
+        await self.store.set_json(self.sid, self.state.to_dict())
 
     def snapshot(self):
         return self.state.to_dict()
 
-    def handle(self, text:str)->dict:
-        self.state.history.append({"role":"user","content":text})
+    async def history(self, last: Optional[int]=None)->list:
+        return await self.store.history(self.sid, last)
+
+    async def turn_count(self, role: Optional[str] = None)->int:
+        return await self.store.turn_count(self.sid, role)
+
+    async def handle(self, text:str, on_delta=None)->dict:
+        await self.store.append_turn(self.sid, "user", text)
         pkg_desc=PACKAGES[self.state.package]
         mode=self.state.mode
 
         suggestion=None
         if self.llm:
             try:
-                msg=[
-                  {"role":"system","content":f"Ты клиент. Сценарий допродажи: {mode}. Пакет предлагается: {pkg_desc}."},
-                  {"role":"user","content":text}
-                ]
-                suggestion=self.llm.chat(msg)
+                msg=await build_session_context(self.store, self.sid, SYSTEM, self.llm, site="upsell.client", tail=f"Сценарий допродажи: {mode}. Пакет предлагается: {pkg_desc}.")
+                suggestion=await self.llm.achat(msg, on_delta=on_delta)
             except:
                 suggestion=None
+        if suggestion:
+            await self.store.append_turn(self.sid, "assistant", suggestion)
 
         score=0
         if any(w in text.lower() for w in ["получите","давайте","предлагаю","выгода"]):
@@ -72,7 +87,7 @@ class UpsellEngine:
         if len(text)>25:
             score+=1
 
-        self._save()
+        await self._save()
 
         return {
             "mode":mode,
@@ -81,6 +96,6 @@ class UpsellEngine:
             "score":score
         }
 
-    def reset(self):
-        self._reset()
+    async def reset(self):
+        await self._reset()
         return {"ok":True}
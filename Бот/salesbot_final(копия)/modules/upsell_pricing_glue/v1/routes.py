@@ -1,6 +1,6 @@
 
 from fastapi import APIRouter, Request
-from .service import compute_offer, suggest_upsell
+from .service import compute_offer, asuggest_upsell
 
 router = APIRouter(prefix="/upsell_pricing/v1", tags=["upsell_pricing"])
 
@@ -19,7 +19,7 @@ async def compute(req: Request):
 @router.post("/suggest")
 async def suggest(req: Request):
     data = await req.json()
-    return suggest_upsell(
+    return await asuggest_upsell(
         catalog=data.get("catalog") or {},
         current_tier=data.get("current_tier","basic"),
         target_tier=data.get("target_tier","premium"),
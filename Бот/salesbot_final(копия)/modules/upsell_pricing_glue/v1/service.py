@@ -1,7 +1,10 @@
 
 import json, math
 from typing import Dict, Any, List, Optional
-from core.voice_gateway.v1 import VoicePipeline
+from core.voice_gateway.v1 import get_voice_pipeline
+from core.voice_gateway.v1.prompts import build_prompt, register_prefix
+
+register_prefix("upsell.pricing", "Ты жёсткий коуч продаж. Объясни выгоду апгрейда с учётом цены, результата и примеров. Стиль: уверенно, по делу, 2-3 фразы + 1 вопрос.")
 
 def _sum_items(items: List[dict])->float:
     return float(sum(max(0.0, float(x.get("price",0))) for x in (items or [])))
@@ -48,16 +51,14 @@ def _format_savings(offer: dict)->str:
         return "Предложение без скидки — платишь только за ценность."
     return f"Экономия {save:.0f} {offer['currency']} от базовой суммы {base:.0f} {offer['currency']}."
 
-def suggest_upsell(catalog: Dict[str,Any], current_tier: str="basic", target_tier: str="premium", currency: str="KGS", discount: float=0.0, coupon: Optional[dict]=None, vat: float=0.0, context: Optional[str]=None)->dict:
+def _upsell_offers(catalog: Dict[str,Any], current_tier: str, target_tier: str, currency: str, discount: float, coupon: Optional[dict], vat: float, context: Optional[str]):
     cur = compute_offer(catalog, current_tier, currency, discount, coupon, vat)
     tgt = compute_offer(catalog, target_tier, currency, discount, coupon, vat)
+    prompt = build_prompt("upsell.pricing", json.dumps({"current":cur,"target":tgt,"context":context}, ensure_ascii=False))
+    return cur, tgt, prompt
+
+def _upsell_result(cur: dict, tgt: dict, pitch: str)->dict:
     diff = max(0.0, tgt["total"] - cur["total"])
-    vp = VoicePipeline()
-    prompt = [
-        {"role":"system","content":"Ты жёсткий коуч продаж. Объясни выгоду апгрейда с учётом цены, результата и примеров. Стиль: уверенно, по делу, 2-3 фразы + 1 вопрос."},
-        {"role":"user","content": json.dumps({"current":cur,"target":tgt,"context":context}, ensure_ascii=False)}
-    ]
-    pitch = vp.llm.chat(prompt)
     return {
         "current": cur,
         "target": tgt,
@@ -65,3 +66,13 @@ def suggest_upsell(catalog: Dict[str,Any], current_tier: str="basic", target_tie
         "pitch": pitch,
         "savings": _format_savings(tgt)
     }
+
+def suggest_upsell(catalog: Dict[str,Any], current_tier: str="basic", target_tier: str="premium", currency: str="KGS", discount: float=0.0, coupon: Optional[dict]=None, vat: float=0.0, context: Optional[str]=None)->dict:
+    cur, tgt, prompt = _upsell_offers(catalog, current_tier, target_tier, currency, discount, coupon, vat, context)
+    vp = get_voice_pipeline()
+    return _upsell_result(cur, tgt, vp.llm.chat(prompt))
+
+async def asuggest_upsell(catalog: Dict[str,Any], current_tier: str="basic", target_tier: str="premium", currency: str="KGS", discount: float=0.0, coupon: Optional[dict]=None, vat: float=0.0, context: Optional[str]=None)->dict:
+    cur, tgt, prompt = _upsell_offers(catalog, current_tier, target_tier, currency, discount, coupon, vat, context)
+    vp = get_voice_pipeline()
+    return _upsell_result(cur, tgt, await vp.llm.achat(prompt))
@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+import asyncio
 import os
 from .service import new_session, load_session, handle_turn, stop_and_score
 
@@ -59,7 +60,8 @@ async def start_ui(manager_id: str):
 @router.post("/turn")
 async def turn(req: Request):
     data = await req.json()
-    out = handle_turn(data.get("manager_id"), data.get("session_id"), data.get("text",""), data.get("features") or {})
+    # handle_turn/stop_and_score ходят в LLM синхронно (файлы сессий + несколько вызовов) — вне event loop
+    out = await asyncio.to_thread(handle_turn, data.get("manager_id"), data.get("session_id"), data.get("text",""), data.get("features") or {})
     return out
 
 @router.get("/ui/{manager_id}/{session_id}", response_class=HTMLResponse)
@@ -72,4 +74,4 @@ async def ui(manager_id: str, session_id: str):
 
 @router.get("/stop/{manager_id}/{session_id}")
 async def stop(manager_id: str, session_id: str):
-    return stop_and_score(manager_id, session_id)
+    return await asyncio.to_thread(stop_and_score, manager_id, session_id)
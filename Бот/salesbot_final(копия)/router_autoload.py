@@ -9,6 +9,10 @@ ROUTE_MODULES = [
     # Публичные API
     # "api.voice.v1.routes",  # Disabled - requires httpx
 
+    # Ядро
+    "core.state.v1.routes",
+    "core.voice_gateway.v1.routes",
+
     # Основные модули тренажёра
     "modules.master_path.v3.routes",
     "modules.objections.v3.routes",
@@ -81,6 +81,11 @@ async def main():
         print(f"\n[run_bot] ❌ ERROR during polling: {e}")
     finally:
         await bot.session.close()
+        try:
+            from core.voice_gateway.v1.pipeline import get_http_pool
+            await get_http_pool().aclose()
+        except Exception:
+            pass
         print("[run_bot] Bot session closed")
     print("[run_bot] Stopped polling.")
 
@@ -6,6 +6,7 @@ BASE = sys.argv[1] if len(sys.argv)>1 else "http://127.0.0.1:8080"
 ENDPOINTS = [
     "/api/public/v1/health",
     "/api/public/v1/routes_summary",
+    "/state/v1/stats",
     "/master_path/v3/start/test",
     "/objections/v3/start/test",
     "/upsell/v3/start/test",
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for VoicePipeline.llm against the DeepSeek stand-in
+(core/voice_gateway/v1/mock_server.py) or any compatible URL.
+
+  python smoke_tests/llm_bench.py                                   # 200 async calls, 16 at a time
+  python smoke_tests/llm_bench.py --mode stream --concurrency 32 --latency lognormal:0.3,0.6
+  python smoke_tests/llm_bench.py --error-rate 0.1 --throttle-rate 0.05 --retry-after 0.2
+  python smoke_tests/llm_bench.py --mode sync --max-rps 30 --requests 300
+  python smoke_tests/llm_bench.py --url http://127.0.0.1:8089/v1/chat/completions
+  python smoke_tests/llm_bench.py --hedge --latency lognormal:0.1,1.0 --requests 1000   # hedged requests
+
+Reports throughput, latency p50/p95/p99 (and time to first chunk for
+--mode stream), local fallbacks, client retries, prompt cache hit share
+and what the server saw.
+Limiter / breaker knobs are read from the usual LLM_* env variables.
+"""
+
+import argparse, asyncio, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.voice_gateway.v1.mock_server import MockDeepSeek
+
+FALLBACK = "Совет коуча:"   # так начинается локальный фоллбек _LLMClient
+
+def pct(values, p):
+    if not values:
+        return None
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(p * len(s)))] * 1000, 1)
+
+def prompt(i, distinct):
+    n = i if distinct <= 0 else i % distinct
+    return [{"role": "system", "content": "Ты клиент проекта «На Счастье»."},
+            {"role": "user", "content": f"Менеджер: запрос номер {n}, расскажите про песню в подарок"}]
+
+async def run_async(llm, args):
+    sem = asyncio.Semaphore(args.concurrency)
+    lat, ttft, out = [], [], []
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            if args.mode == "stream":
+                first = None
+                parts = []
+                async for d in llm.astream(prompt(i, args.distinct), cache=args.cache):
+                    if first is None:
+                        first = time.perf_counter() - t0
+                    parts.append(d)
+                text = "".join(parts)
+                ttft.append(first or 0.0)
+            else:
+                text = await llm.achat(prompt(i, args.distinct), cache=args.cache)
+            lat.append(time.perf_counter() - t0)
+            out.append(text)
+
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    await llm.pool.aclose()
+    return lat, ttft, out
+
+def run_sync(llm, args):
+    def one(i):
+        t0 = time.perf_counter()
+        text = llm.chat(prompt(i, args.distinct), cache=args.cache)
+        return time.perf_counter() - t0, text
+
+    with ThreadPoolExecutor(args.concurrency) as ex:
+        res = list(ex.map(one, range(args.requests)))
+    return [r[0] for r in res], [], [r[1] for r in res]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default=None, help="compatible endpoint; default: in-process stand-in")
+    ap.add_argument("--mode", choices=["async", "sync", "stream"], default="async")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--distinct", type=int, default=0, help="number of distinct prompts; 0 = all unique")
+    ap.add_argument("--cache", default=None, help="cache site name to exercise llm_cache")
+    ap.add_argument("--retries", type=int, default=None, help="HTTP_RETRIES for the client")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--latency", default="lognormal:0.1,0.5")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--throttle-rate", type=float, default=0.0)
+    ap.add_argument("--retry-after", type=float, default=0.5)
+    ap.add_argument("--max-rps", type=float, default=0.0)
+    ap.add_argument("--drop-rate", type=float, default=0.0)
+    ap.add_argument("--tokens", type=int, default=24)
+    ap.add_argument("--token-delay", type=float, default=0.01)
+    ap.add_argument("--hedge", action="store_true", help="LLM_HEDGE=1: duplicate requests slower than p95")
+    args = ap.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = MockDeepSeek(seed=args.seed, latency=args.latency, error_rate=args.error_rate,
+                              throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                              max_rps=args.max_rps, drop_rate=args.drop_rate, tokens=args.tokens,
+                              token_delay=args.token_delay).start()
+        url = server.url
+    # до импорта пайплайна: клиент, ограничитель и breaker читают env при создании
+    os.environ["DEEPSEEK_API_URL"] = url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "mock")
+    if args.cache is None:
+        os.environ["LLM_CACHE"] = "0"
+    if args.retries is not None:
+        os.environ["HTTP_RETRIES"] = str(args.retries)
+    if args.hedge:
+        os.environ["LLM_HEDGE"] = "1"
+
+    from core.voice_gateway.v1 import get_voice_pipeline
+    from core.voice_gateway.v1.prompts import get_prompt_stats
+    llm = get_voice_pipeline().llm
+
+    t0 = time.perf_counter()
+    if args.mode == "sync":
+        lat, ttft, out = run_sync(llm, args)
+    else:
+        lat, ttft, out = asyncio.run(run_async(llm, args))
+    wall = time.perf_counter() - t0
+
+    fallbacks = sum(1 for t in out if t.startswith(FALLBACK))
+    br, lim = llm.breaker.stats(), llm.limiter.stats()
+    report = {
+        "mode": args.mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(args.requests / wall, 1) if wall else None,
+        "ok": args.requests - fallbacks,
+        "fallbacks": fallbacks,
+        "latency_ms": {"p50": pct(lat, 0.5), "p95": pct(lat, 0.95), "p99": pct(lat, 0.99),
+                       "max": round(max(lat) * 1000, 1) if lat else None},
+        "retries": br["retries"],
+        "retries_429": br["retries_429"],
+        "breaker": {k: br[k] for k in ("state", "opens", "short_circuited", "last_error")},
+        "limiter": dict({k: lim[k] for k in ("max_in_flight", "rate", "throttled_429")},
+                        wait_p95_ms=lim["classes"]["interactive"]["wait_p95_ms"]),
+        "single_flight": llm.flights.stats(),
+        "prompts": get_prompt_stats().stats()["total"],
+    }
+    if args.hedge:
+        report["hedge"] = {k: v for k, v in llm.hedger.stats().items() if k != "sites"}
+    if ttft:
+        report["first_chunk_ms"] = {"p50": pct(ttft, 0.5), "p95": pct(ttft, 0.95), "p99": pct(ttft, 0.99)}
+    if server is not None:
+        report["server"] = server.stats.as_dict()
+        server.stop()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    llm.pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Multi-endpoint routing check against two local DeepSeek stand-ins
+(core/voice_gateway/v1/mock_server.py): "a" and "b", equal weights.
+
+  python smoke_tests/llm_router_check.py
+  python smoke_tests/llm_router_check.py --requests 400 --concurrency 16
+
+Phases: both healthy → b slow → b failing → b recovered, plus a per-site
+model override (objections.classify → b:deepseek-lite), which has to fail over
+to "a" once b fails again. Prints the share of
+traffic each endpoint got per phase and the router's EWMA state; exits 1
+if traffic did not move away from the degraded endpoint.
+"""
+
+import argparse, asyncio, json, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.voice_gateway.v1.mock_server import MockDeepSeek
+
+PHASES = [
+    ("healthy", {}),
+    ("b_slow", {"latency": "fixed:0.4"}),
+    ("b_failing", {"latency": "fixed:0.03", "error_rate": 1.0}),
+    ("b_recovered", {"error_rate": 0.0}),
+]
+
+async def burst(llm, n, concurrency, site=None):
+    from core.voice_gateway.v1.prompts import Prompt
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            msg = Prompt([{"role": "user", "content": f"реплика {i}"}], site)
+            await llm.achat(msg)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=300, help="requests per phase")
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+
+    a = MockDeepSeek(seed=1, latency="fixed:0.03", tokens=4).start()
+    b = MockDeepSeek(seed=2, latency="fixed:0.03", tokens=4).start()
+    os.environ["LLM_ENDPOINTS"] = json.dumps([
+        {"name": "a", "url": a.url, "key": "mock", "model": "deepseek-chat", "weight": 1},
+        {"name": "b", "url": b.url, "key": "mock", "model": "deepseek-chat", "weight": 1},
+    ])
+    os.environ["LLM_MODEL_OVERRIDES"] = json.dumps({"objections.classify": "b:deepseek-lite"})
+    os.environ["LLM_CACHE"] = "0"
+    os.environ["LLM_SINGLE_FLIGHT"] = "0"
+    os.environ.setdefault("LLM_RATE", "0")
+    os.environ.setdefault("LLM_BREAKER_ERROR_RATE", "1.1")   # здесь важен роутер, не breaker
+
+    from core.voice_gateway.v1 import get_voice_pipeline
+    llm = get_voice_pipeline().llm
+
+    async def run():
+        report = {}
+        for name, b_conf in PHASES:
+            b.configure(**b_conf)
+            before = (a.stats.as_dict()["requests"], b.stats.as_dict()["requests"])
+            await burst(llm, args.requests, args.concurrency)
+            got_a = a.stats.as_dict()["requests"] - before[0]
+            got_b = b.stats.as_dict()["requests"] - before[1]
+            report[name] = {"a": got_a, "b": got_b, "b_share": round(got_b / max(1, got_a + got_b), 3),
+                            "router": {k: {f: v[f] for f in ("latency_ewma_ms", "error_ewma", "ejected")}
+                                       for k, v in llm.router.stats()["endpoints"].items()}}
+        before = b.stats.as_dict()["by_model"].get("deepseek-lite", 0)
+        await burst(llm, 20, args.concurrency, site="objections.classify")
+        report["override"] = {"objections.classify → b:deepseek-lite": b.stats.as_dict()["by_model"].get("deepseek-lite", 0) - before}
+        # закреплённый b снова лежит: место вызова уходит в пул (к a)
+        b.configure(error_rate=1.0)
+        await burst(llm, 100, args.concurrency)
+        before = (a.stats.as_dict()["requests"], b.stats.as_dict()["requests"])
+        await burst(llm, 100, args.concurrency, site="objections.classify")
+        report["override_failover"] = {"a": a.stats.as_dict()["requests"] - before[0],
+                                       "b": b.stats.as_dict()["requests"] - before[1]}
+        await llm.pool.aclose()
+        return report
+
+    report = asyncio.run(run())
+    a.stop()
+    b.stop()
+    llm.pool.close()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    shifted = (report["b_slow"]["b_share"] < report["healthy"]["b_share"] * 0.6
+               and report["b_failing"]["b_share"] < 0.1
+               and report["b_recovered"]["b_share"] > report["b_failing"]["b_share"]
+               and report["override"]["objections.classify → b:deepseek-lite"] == 20
+               and report["override_failover"]["b"] < 10)
+    print("OK" if shifted else "FAIL: traffic did not follow endpoint health")
+    sys.exit(0 if shifted else 1)
+
+if __name__ == "__main__":
+    main()
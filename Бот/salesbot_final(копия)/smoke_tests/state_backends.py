@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Contract checks and a throughput benchmark for every StateBackend.
+
+  python smoke_tests/state_backends.py                      # memory, sqlite, sharded, redis (stand-in server)
+  python smoke_tests/state_backends.py --redis-url redis://127.0.0.1:6379/0
+  python smoke_tests/state_backends.py --backends sqlite --ops 20000 --threads 8
+"""
+
+import argparse, json, os, sys, tempfile, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.state.v1 import StateStore, MemoryBackend, SQLiteBackend, RedisBackend
+from core.state.v1.backends import ShardedBackend, shard_paths
+from core.state.v1.backends.resp_server import RespServer
+
+# ---- contract: every backend must pass all of these ----
+
+def check_get_set_delete(b):
+    assert b.get("t:missing") is None
+    b.set("t:a", "1")
+    assert b.get("t:a") == "1"
+    b.set("t:a", "2")
+    assert b.get("t:a") == "2"
+    assert b.delete("t:a") == 1
+    assert b.get("t:a") is None
+    assert b.delete("t:a") == 0
+
+def check_unicode(b):
+    b.set("t:юникод", "значение ✓")
+    assert b.get("t:юникод") == "значение ✓"
+
+def check_scan_order_and_bounds(b):
+    for k in ["s:b", "s:a", "s:c", "sa", "s;", "r:z"]:
+        b.set(k, k.upper())
+    assert b.scan("s:", 100) == [("s:a", "S:A"), ("s:b", "S:B"), ("s:c", "S:C")]
+    assert [k for k, _ in b.scan("s:", 2)] == ["s:a", "s:b"]
+    assert [k for k, _ in b.scan("s:", 10, after_key="s:a")] == ["s:b", "s:c"]
+    assert b.scan("s:", 10, after_key="s:c") == []
+    assert [k for k, _ in b.scan("s:", 10, after_key="a")] == ["s:a", "s:b", "s:c"]
+
+def check_scan_pagination(b):
+    st = StateStore(backend=b, cache_size=0)
+    keys = [f"p:{i:04d}" for i in range(57)]
+    for k in keys:
+        b.set(k, "x")
+    seen, cursor = [], None
+    while True:
+        items, cursor = st.scan_page("p:", after_key=cursor, limit=10)
+        seen += [k for k, _ in items]
+        if cursor is None:
+            break
+    assert seen == keys
+    assert [k for k, _ in st.iter_scan("p:", batch=7)] == keys
+
+def check_turns(b):
+    assert b.turn_count("h:1") == 0 and b.history("h:1") == []
+    for i in range(5):
+        b.append_turn("h:1", "user" if i % 2 == 0 else "assistant", f"m{i}")
+    assert b.turn_count("h:1") == 5
+    h = b.history("h:1")
+    assert [t["seq"] for t in h] == [1, 2, 3, 4, 5]
+    assert [t["content"] for t in h] == ["m0", "m1", "m2", "m3", "m4"]
+    last = b.history("h:1", last=2)
+    assert [(t["seq"], t["content"]) for t in last] == [(4, "m3"), (5, "m4")]
+    assert b.history("h:1", last=0) == []
+    assert b.turn_count("h:2") == 0
+    assert b.clear_turns("h:1") == 5
+    assert b.turn_count("h:1") == 0
+
+def check_legacy_session(b):
+    st = StateStore(backend=b, cache_size=0)
+    b.set("mp:legacy", json.dumps({"stage": "x", "history": [{"role": "user", "content": "hi"},
+                                                            {"role": "assistant", "content": "yo"}]}))
+    assert st.get_session("mp:legacy") == {"stage": "x"}
+    assert json.loads(b.get("mp:legacy")) == {"stage": "x"}
+    assert [t["content"] for t in b.history("mp:legacy")] == ["hi", "yo"]
+
+def check_concurrent_appends(b):
+    def w():
+        for _ in range(50):
+            b.append_turn("c:1", "user", "x")
+    ts = [threading.Thread(target=w) for _ in range(4)]
+    [t.start() for t in ts]
+    [t.join() for t in ts]
+    h = b.history("c:1")
+    assert len(h) == 200 and [t["seq"] for t in h] == list(range(1, 201))
+
+CONTRACT = [check_get_set_delete, check_unicode, check_scan_order_and_bounds, check_scan_pagination,
+            check_turns, check_legacy_session, check_concurrent_appends]
+
+# ---- benchmark ----
+
+def bench(b, ops, threads):
+    per = max(1, ops // threads)
+    res = {}
+    def run(name, fn):
+        def worker(t):
+            for i in range(per):
+                fn(t, i)
+        ths = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+        t0 = time.perf_counter()
+        [x.start() for x in ths]
+        [x.join() for x in ths]
+        dt = time.perf_counter() - t0
+        res[name] = round(per * threads / dt)
+    blob = json.dumps({"stage": "greeting", "metadata": {"n": 1, "tags": ["a", "b"]}})
+    run("set ops/s", lambda t, i: b.set(f"bench:{t}:{i % 500}", blob))
+    run("get ops/s", lambda t, i: b.get(f"bench:{t}:{i % 500}"))
+    run("append_turn ops/s", lambda t, i: b.append_turn(f"bench:{t}:{i % 50}", "user", "hello"))
+    run("history(last=20) ops/s", lambda t, i: b.history(f"bench:{t}:{i % 50}", 20))
+    run("scan(50) ops/s", lambda t, i: b.scan(f"bench:{t}:", 50))
+    return res
+
+def make(name, tmp, redis_url):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(os.path.join(tmp, f"state_{time.time_ns()}.db"))
+    if name == "sharded":
+        base = os.path.join(tmp, f"state_{time.time_ns()}.db")
+        return ShardedBackend([SQLiteBackend(p) for p in shard_paths(base, 4)])
+    if name == "redis":
+        b = RedisBackend(redis_url, namespace=f"contract:{time.time_ns()}:")
+        return b
+    raise ValueError(name)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default="memory,sqlite,sharded,redis")
+    ap.add_argument("--redis-url", default=None, help="real server; default: in-process stand-in")
+    ap.add_argument("--ops", type=int, default=4000)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    server = None
+    redis_url = args.redis_url
+    if redis_url is None:
+        server = RespServer().start()
+        redis_url = server.url
+
+    results = {}
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends.split(","):
+            name = name.strip()
+            contract = {}
+            for check in CONTRACT:
+                b = make(name, tmp, redis_url)
+                try:
+                    check(b)
+                    contract[check.__name__] = "ok"
+                except Exception as e:
+                    contract[check.__name__] = f"FAIL: {type(e).__name__} {e}"
+                    ok = False
+                finally:
+                    b.close()
+            b = make(name, tmp, redis_url)
+            try:
+                results[name] = {"contract": contract, "bench": bench(b, args.ops, args.threads)}
+            finally:
+                b.close()
+    if server is not None:
+        server.stop()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
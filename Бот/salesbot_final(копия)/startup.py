@@ -5,7 +5,35 @@ app = FastAPI(title="salesbot", version="v1-final")
 # базовый healthcheck
 @app.get("/api/public/v1/health")
 async def root_health():
-    return {"ok": True, "app": "salesbot", "version": "v1-final"}
+    out = {"ok": True, "app": "salesbot", "version": "v1-final"}
+    try:
+        from core.voice_gateway.v1.breaker import get_breaker
+        out["llm"] = get_breaker().state
+    except Exception:
+        pass
+    return out
+
+# фоновая очистка и обслуживание salesbot.db (TTL, checkpoint, vacuum, ANALYZE)
+@app.on_event("startup")
+async def _start_state_maintenance():
+    import os
+    if os.environ.get("STATE_MAINTENANCE", "1") in ("0", "false", "no", "off"):
+        return
+    try:
+        from core.state.v1 import get_store, get_maintenance
+        get_maintenance(get_store()).start()
+    except Exception:
+        pass
+
+# keep-alive пул соединений LLM-клиента
+@app.on_event("shutdown")
+async def _close_llm_pool():
+    try:
+        from core.voice_gateway.v1.pipeline import get_http_pool
+        await get_http_pool().aclose()
+        get_http_pool().close()
+    except Exception:
+        pass
 
 # автоподключение всех роутов
 try:
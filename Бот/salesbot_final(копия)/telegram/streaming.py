@@ -0,0 +1,268 @@
+"""
+Постепенная доставка ответа LLM в Telegram.
+
+    async with StreamingReply(message, header="👤 <b>Клиент:</b>\\n") as sr:
+        result = await engine.handle(text, on_delta=sr.feed)
+        await sr.finish(final_html)
+
+Пока ответ генерируется, в чат уходит sendChatAction(typing). Первое сообщение
+отправляется с первыми токенами, дальше оно правится editMessageText не чаще
+TG_STREAM_EDIT_INTERVAL секунд (1.0). finish() ставит окончательный текст.
+
+Дедлайн на ответ (пользователь не ждёт HTTP_TIMEOUT × повторы):
+
+    result = await sr.run(engine.handle(text, on_delta=sr.feed), budget=6.0,
+                          fallback=lambda: "Хм… дайте подумать.")
+
+Если к budget секундам в чате ещё ничего нет — сразу уходит fallback (реплика
+клиента по сценарию / локальный совет коуча), а работа продолжается. Когда
+настоящий ответ готов, finish() правит это сообщение (TG_LATE_REPLY=edit) или
+отправляет его следом (followup; и если правка не удалась). Если работа
+упала уже после заготовки, с неё снимается пометка "⏳", исключение летит
+дальше. Счётчики — deadline_stats().
+
+Первое сообщение уходит ровно одно: место под него занимается до await
+отправки, так что fallback и первые токены не пришлют два. Не удавшаяся
+окончательная правка повторяется, потом текст уходит новым сообщением.
+Длинный HTML режется по границе тега/сущности, открытые теги закрываются.
+"""
+import asyncio
+import collections
+import html
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+_LIMIT = 4096          # максимальная длина сообщения Telegram
+_CURSOR = " ▌"
+_TYPING_EVERY = 4.5    # статус typing живёт ~5 сек
+_PENDING = "\n\n<i>⏳ уточняю ответ…</i>"
+
+_STATS: Dict[str, int] = {"replies": 0, "fallbacks": 0, "late_edits": 0, "late_followups": 0}
+_VISIBLE: "collections.deque[float]" = collections.deque(maxlen=1000)   # мс до первого сообщения в чате
+
+
+_TOKEN = re.compile(r"<[^<>]*>|&#?\w+;|[^<&]+|[<&]")
+_TAG = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)")
+
+
+def _cut(text: str, limit: int, parse_mode: Optional[str] = "HTML") -> str:
+    """Не длиннее limit; для HTML — без разрезанных тегов и &сущностей, открытые теги закрыты."""
+    if len(text) <= limit:
+        return text
+    if parse_mode != "HTML":
+        return text[:limit]
+    out, stack, size = [], [], 0
+    for m in _TOKEN.finditer(text):
+        tok = m.group(0)
+        closing = sum(len(t) + 3 for t in stack)
+        tag = _TAG.match(tok) if tok.startswith("<") and len(tok) > 1 else None
+        if tag and tag.group(1) and stack and stack[-1] == tag.group(2).lower():
+            stack.pop()       # место под закрывающий тег уже было отложено
+        elif tag and not tag.group(1):
+            name = tag.group(2).lower()
+            if size + len(tok) + len(name) + 3 + closing > limit:
+                break
+            stack.append(name)
+        elif size + len(tok) + closing > limit:
+            if tok[0] not in "<&":
+                room = limit - size - closing
+                piece = tok[:max(0, room)]
+                sp = piece.rfind(" ")
+                out.append(piece[:sp] if sp > room * 0.8 else piece)
+            break
+        out.append(tok)
+        size += len(tok)
+    return "".join(out) + "".join(f"</{t}>" for t in reversed(stack))
+
+
+def _pct(values: list, p: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(p * len(s)))], 1)
+
+
+def deadline_stats() -> Dict[str, Any]:
+    seen = list(_VISIBLE)
+    return dict(_STATS, visible_ms={"p50": _pct(seen, 0.5), "p95": _pct(seen, 0.95), "p99": _pct(seen, 0.99)})
+
+
+class StreamingReply:
+    def __init__(self, message: Any, header: str = "", parse_mode: Optional[str] = "HTML",
+                 interval: Optional[float] = None) -> None:
+        self.message = message
+        self.header = header
+        self.parse_mode = parse_mode
+        self.interval = float(interval if interval is not None else os.environ.get("TG_STREAM_EDIT_INTERVAL", "1.0"))
+        self.text = ""
+        self.sent: Any = None
+        self.shown = ""
+        self.edits = 0
+        self.first_token_at: Optional[float] = None
+        self._started = time.monotonic()
+        self._last_edit = 0.0
+        self._typing: Optional[asyncio.Task] = None
+        self.late = False      # показан fallback, настоящий ответ ещё в пути
+        self._claimed = False  # первое сообщение уже отправляется (ставится до await)
+        self._first_done = asyncio.Event()
+        self._retry_after = 0.0
+        self._fallback_text = ""  # заготовка без "⏳" — на случай, если настоящий ответ не придёт
+
+    async def __aenter__(self) -> "StreamingReply":
+        self._typing = asyncio.create_task(self._keep_typing())
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._stop_typing()
+
+    async def _keep_typing(self) -> None:
+        try:
+            while True:
+                try:
+                    await self.message.bot.send_chat_action(self.message.chat.id, "typing")
+                except Exception:
+                    pass
+                await asyncio.sleep(_TYPING_EVERY)
+        except asyncio.CancelledError:
+            pass
+
+    def _stop_typing(self) -> None:
+        if self._typing is not None:
+            self._typing.cancel()
+            self._typing = None
+
+    def _render(self, cursor: bool) -> str:
+        body = html.escape(self.text, quote=False) if self.parse_mode == "HTML" else self.text
+        tail = _CURSOR if cursor else ""
+        room = _LIMIT - len(self.header) - len(tail)
+        return self.header + _cut(body, max(0, room), self.parse_mode) + tail
+
+    async def _edit(self, text: str) -> bool:
+        if text == self.shown:
+            return True
+        try:
+            await self.message.bot.edit_message_text(
+                text=text, chat_id=self.sent.chat.id, message_id=self.sent.message_id, parse_mode=self.parse_mode)
+            self.shown = text
+            self.edits += 1
+            return True
+        except Exception as e:
+            if "not modified" in str(e).lower():
+                self.shown = text
+                return True
+            # RetryAfter и т.п. — следующая правка догонит
+            self._retry_after = float(getattr(e, "retry_after", 0) or 0)
+            return False
+
+    async def _edit_final(self, text: str) -> bool:
+        # окончательный текст: следующей правки не будет, поэтому повтор
+        if await self._edit(text):
+            return True
+        await asyncio.sleep(min(5.0, max(0.5, self._retry_after)))
+        return await self._edit(text)
+
+    def _claim(self) -> bool:
+        """Занять первое сообщение; False — его уже отправляет кто-то другой."""
+        if self._claimed:
+            return False
+        self._claimed = True
+        return True
+
+    async def _send_first(self, text: str) -> None:
+        try:
+            await self._send(text)
+        finally:
+            self._first_done.set()
+
+    async def _send(self, text: str) -> Any:
+        sent = await self.message.reply(text, parse_mode=self.parse_mode)
+        if self.sent is None:
+            _STATS["replies"] += 1
+            _VISIBLE.append((time.monotonic() - self._started) * 1000)
+        self.sent = sent
+        self.shown = text
+        return sent
+
+    async def fallback(self, line: str) -> None:
+        """Показать заготовку сразу; настоящий ответ придёт правкой в finish()."""
+        if not self._claim():
+            return
+        self.late = True       # до отправки: feed() дальше копит текст до finish()
+        body = html.escape(line, quote=False) if self.parse_mode == "HTML" else line
+        pending = _PENDING if self.parse_mode == "HTML" else ""
+        self._fallback_text = self.header + _cut(body, _LIMIT - len(self.header), self.parse_mode)
+        await self._send_first(self.header + _cut(body, _LIMIT - len(self.header) - len(pending), self.parse_mode) + pending)
+        _STATS["fallbacks"] += 1
+
+    async def run(self, work: Awaitable[Any], budget: float, fallback: Callable[[], str]) -> Any:
+        """Ждёт work; если к budget секундам в чате пусто — fallback(), а work доживает своё."""
+        task = asyncio.ensure_future(work)
+        if budget <= 0:
+            return await task
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), budget)
+        except asyncio.TimeoutError:
+            if not self._claimed:
+                await self.fallback(fallback())
+            try:
+                return await task
+            except Exception:
+                # work упал после заготовки: "уточняю ответ…" больше не правда —
+                # оставляем в чате заготовку без пометки
+                if self.late and self.sent is not None:
+                    self.late = False
+                    await self._edit_final(self._fallback_text)
+                raise
+
+    async def feed(self, delta: str) -> None:
+        if not delta:
+            return
+        self.text += delta
+        if self.late:
+            # поверх заготовки не стримим: один раз заменим целиком в finish()
+            return
+        now = time.monotonic()
+        if self.sent is None:
+            if not self.text.strip() or not self._claim():
+                return
+            self.first_token_at = now
+            self._last_edit = now
+            try:
+                await self._send_first(self._render(cursor=True))
+            except Exception:
+                # ошибка Telegram не должна обрывать поток LLM: sent остаётся None,
+                # finish() отправит весь текст
+                pass
+            return
+        if now - self._last_edit >= self.interval:
+            self._last_edit = now
+            await self._edit(self._render(cursor=True))
+
+    async def finish(self, final_text: Optional[str] = None) -> Any:
+        """Окончательный текст (целиком, уже с разметкой); None — накопленный поток без курсора."""
+        self._stop_typing()
+        if self._claimed:
+            # первое сообщение ещё отправляется — ждём его, а не шлём второе
+            await self._first_done.wait()
+        text = final_text if final_text is not None else self._render(cursor=False)
+        text = _cut(text, _LIMIT, self.parse_mode)
+        if self.sent is None:
+            self._claimed = True
+            await self._send(text)
+        elif self.late:
+            self.late = False
+            if os.environ.get("TG_LATE_REPLY", "edit").lower() != "followup" and await self._edit_final(text):
+                _STATS["late_edits"] += 1
+            else:
+                await self._send(text)
+                _STATS["late_followups"] += 1
+        elif not await self._edit_final(text):
+            # иначе в чате так и останется недописанный текст с курсором
+            await self._send(text)
+        return self.sent
+
+    def stats(self) -> dict:
+        ttft = None if self.first_token_at is None else round((self.first_token_at - self._started) * 1000)
+        return {"first_token_ms": ttft, "edits": self.edits, "chars": len(self.text)}
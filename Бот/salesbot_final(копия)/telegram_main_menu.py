@@ -198,10 +198,10 @@ def register_main_menu(dp, registry):
         """
         Общая статистика по всем модулям
         """
-        from core.state.v1 import StateStore
+        from core.state.v1 import get_async_store
         
         user_id = str(message.from_user.id)
-        store = StateStore("salesbot.db")
+        store = get_async_store()
         
         # Считаем активные сессии
         mp_key = f"mp:{user_id}"
@@ -209,10 +209,10 @@ def register_main_menu(dp, registry):
         obj_key = f"obj:{user_id}"
         us_key = f"us:{user_id}"
         
-        mp_active = "✅" if store.get(mp_key) else "⏸️"
-        arena_active = "✅" if store.get(arena_key) else "⏸️"
-        obj_active = "✅" if store.get(obj_key) else "⏸️"
-        us_active = "✅" if store.get(us_key) else "⏸️"
+        mp_active = "✅" if await store.get(mp_key) else "⏸️"
+        arena_active = "✅" if await store.get(arena_key) else "⏸️"
+        obj_active = "✅" if await store.get(obj_key) else "⏸️"
+        us_active = "✅" if await store.get(us_key) else "⏸️"
         
         stats_text = (
             f"📊 <b>Твоя статистика</b>\n\n"
@@ -1,6 +1,12 @@
 """
 Message router for telegram bot - routes messages to active training sessions
 """
+import html
+import os
+import random
+
+from telegram.streaming import StreamingReply
+
 try:
     from aiogram import types, F
     from aiogram import Dispatcher
@@ -15,6 +21,48 @@ except ImportError:
 # Global session tracker
 USER_ACTIVE_SESSIONS = {}
 
+# Бюджет ожидания LLM по модулям (сек): дольше — сразу заготовка, настоящий
+# ответ правкой позже. TG_DEADLINE_<MODULE> или общий TG_DEADLINE; 0 — ждать сколько нужно.
+DEADLINES = {"master_path": 4.0, "arena": 6.0, "objections": 6.0, "upsell": 6.0}
+
+# реплики клиента на случай, когда модель не успела
+SCRIPTED_CLIENT_LINES = {
+    "arena": [
+        "Хм… секунду, дайте подумать.",
+        "Так, а можно поподробнее?",
+        "Подождите, я не совсем понял(а). Повторите главное?",
+    ],
+    "objections": [
+        "Ну не знаю… Меня это пока не убеждает.",
+        "Звучит неплохо, но у меня есть сомнения.",
+        "А почему я должен(на) верить, что это сработает?",
+    ],
+    "upsell": [
+        "А что именно входит в этот вариант?",
+        "Хм, а мне точно это нужно?",
+        "Интересно. А по деньгам сколько выйдет?",
+    ],
+}
+
+
+def _deadline(module: str) -> float:
+    env = os.environ.get(f"TG_DEADLINE_{module.upper()}") or os.environ.get("TG_DEADLINE")
+    return float(env) if env else DEADLINES.get(module, 0.0)
+
+
+def _client_line(module: str) -> str:
+    return random.choice(SCRIPTED_CLIENT_LINES[module])
+
+
+def _coach_tip(text: str) -> str:
+    # тот же локальный коуч, что отвечает без сети (VoicePipeline.llm._local_echo)
+    try:
+        from core.voice_gateway.v1 import get_voice_pipeline
+        tip = get_voice_pipeline().llm._local_echo([{"role": "user", "content": text}])
+        return tip.split("Совет коуча: ", 1)[-1]    # заголовок "Совет коуча" уже в шапке
+    except Exception:
+        return "задавай уточняющие вопросы, показывай ценность и веди к следующему шагу."
+
 
 def register_message_router(dp, registry):
     """
@@ -71,8 +119,8 @@ def register_message_router(dp, registry):
         """Обработка сообщения для Master Path"""
         from modules.master_path.v3.engine import MasterPath
         
-        mp = MasterPath(user_id)
-        result = mp.handle(message.text)
+        mp = await MasterPath.open(user_id)
+        stage = mp.state.stage
         
         stages_ru = {
             "greeting": "Приветствие",
@@ -84,36 +132,35 @@ def register_message_router(dp, registry):
             "done": "Завершено"
         }
         
-        stage_name = stages_ru.get(result['stage'], result['stage'])
-        coach_suggestion = result.get('coach_suggestion', '')
-        score = result.get('score', 0)
-        
-        response = f"📍 Этап: <b>{stage_name}</b>\n"
-        
-        if score > 0:
-            response += f"⭐ Оценка: {score} балл(а)\n\n"
-        
-        if coach_suggestion:
-            response += f"🎓 <b>Совет коуча:</b>\n{coach_suggestion}\n\n"
-        else:
-            response += "✅ Хорошо! Продолжай в том же духе.\n\n"
-        
-        response += "Используй /mp_next для перехода на следующий этап\n"
-        response += "или /mp_reset для начала заново"
-        
-        await message.reply(response, parse_mode="HTML")
+        header = f"📍 Этап: <b>{stages_ru.get(stage, stage)}</b>\n\n🎓 <b>Совет коуча:</b>\n"
+        
+        async with StreamingReply(message, header=header) as sr:
+            result = await sr.run(mp.handle(message.text), _deadline("master_path"),
+                                  lambda: _coach_tip(message.text))
+            
+            stage_name = stages_ru.get(result['stage'], result['stage'])
+            coach_suggestion = result.get('coach_suggestion', '')
+            score = result.get('score', 0)
+            
+            response = f"📍 Этап: <b>{stage_name}</b>\n"
+            
+            if score > 0:
+                response += f"⭐ Оценка: {score} балл(а)\n\n"
+            
+            if coach_suggestion:
+                response += f"🎓 <b>Совет коуча:</b>\n{html.escape(coach_suggestion, quote=False)}\n\n"
+            else:
+                response += "✅ Хорошо! Продолжай в том же духе.\n\n"
+            
+            response += "Используй /mp_next для перехода на следующий этап\n"
+            response += "или /mp_reset для начала заново"
+            
+            await sr.finish(response)
     
     async def _handle_arena_message(message: types.Message, user_id: str):
         """Обработка сообщения для Arena"""
         from modules.arena.v4.engine import ArenaEngine
         
-        arena = ArenaEngine(user_id)
-        result = arena.handle(message.text)
-        
-        client_reply = result.get('client_reply', '')
-        emotion = result.get('emotion', 'neutral')
-        score = result.get('score', 0)
-        
         emotions_ru = {
             "calm": "😌 Спокоен",
             "neutral": "😐 Нейтрален",
@@ -122,81 +169,99 @@ def register_message_router(dp, registry):
             "excited": "😄 Взволнован"
         }
         
-        emotion_name = emotions_ru.get(emotion, emotion)
-        
-        response = f"👤 <b>Клиент ({emotion_name}):</b>\n"
-        
-        if client_reply:
-            response += f"{client_reply}\n\n"
-        else:
-            response += "Клиент слушает...\n\n"
-        
-        if score > 0:
-            response += f"⭐ Твой балл: {score}\n\n"
-        
-        response += "Продолжай диалог!\n"
-        response += "/arena_reset - новый клиент"
-        
-        await message.reply(response, parse_mode="HTML")
+        arena = await ArenaEngine.open(user_id)
+        header = f"👤 <b>Клиент ({emotions_ru.get(arena.state.emotion, arena.state.emotion)}):</b>\n"
+        
+        async with StreamingReply(message, header=header) as sr:
+            result = await sr.run(arena.handle(message.text, on_delta=sr.feed), _deadline("arena"),
+                                  lambda: _client_line("arena"))
+            
+            client_reply = result.get('client_reply', '')
+            emotion = result.get('emotion', 'neutral')
+            score = result.get('score', 0)
+            
+            emotion_name = emotions_ru.get(emotion, emotion)
+            
+            response = f"👤 <b>Клиент ({emotion_name}):</b>\n"
+            
+            if client_reply:
+                response += f"{html.escape(client_reply, quote=False)}\n\n"
+            else:
+                response += "Клиент слушает...\n\n"
+            
+            if score > 0:
+                response += f"⭐ Твой балл: {score}\n\n"
+            
+            response += "Продолжай диалог!\n"
+            response += "/arena_reset - новый клиент"
+            
+            await sr.finish(response)
     
     async def _handle_objections_message(message: types.Message, user_id: str):
         """Обработка сообщения для Objections"""
         from modules.objections.v3.engine import ObjectionEngine
         
-        obj = ObjectionEngine(user_id)
-        result = obj.handle(message.text)
-        
-        client_reply = result.get('client_reply', '')
-        score = result.get('score', 0)
-        
-        response = "👤 <b>Клиент:</b>\n"
-        
-        if client_reply:
-            response += f"{client_reply}\n\n"
-        else:
-            response += "Клиент думает...\n\n"
-        
-        if score > 0:
-            response += f"⭐ Твой балл: {score}\n\n"
-        
-        response += "Продолжай работу с возражением!\n"
-        response += "/obj_reset - новое возражение"
-        
-        await message.reply(response, parse_mode="HTML")
+        obj = await ObjectionEngine.open(user_id)
+        
+        async with StreamingReply(message, header="👤 <b>Клиент:</b>\n") as sr:
+            result = await sr.run(obj.handle(message.text, on_delta=sr.feed), _deadline("objections"),
+                                  lambda: _client_line("objections"))
+            
+            client_reply = result.get('client_reply', '')
+            score = result.get('score', 0)
+            
+            response = "👤 <b>Клиент:</b>\n"
+            
+            if client_reply:
+                response += f"{html.escape(client_reply, quote=False)}\n\n"
+            else:
+                response += "Клиент думает...\n\n"
+            
+            if score > 0:
+                response += f"⭐ Твой балл: {score}\n\n"
+            
+            response += "Продолжай работу с возражением!\n"
+            response += "/obj_reset - новое возражение"
+            
+            await sr.finish(response)
     
     async def _handle_upsell_message(message: types.Message, user_id: str):
         """Обработка сообщения для Upsell"""
         from modules.upsell.v3.engine import UpsellEngine
         
-        upsell = UpsellEngine(user_id)
-        result = upsell.handle(message.text)
-        
-        client_reply = result.get('client_reply', '')
-        score = result.get('score', 0)
-        package = result.get('package', 'unknown')
-        
         packages_ru = {
             "basic": "🎵 Basic",
             "premium": "🎬 Premium",
             "gold": "⭐ Gold"
         }
         
-        package_name = packages_ru.get(package, package)
-        
-        response = f"👤 <b>Клиент (пакет {package_name}):</b>\n"
-        
-        if client_reply:
-            response += f"{client_reply}\n\n"
-        else:
-            response += "Клиент думает о предложении...\n\n"
-        
-        if score > 0:
-            response += f"⭐ Твой балл: {score}\n\n"
-        
-        response += "Продолжай допродажу!\n"
-        response += "/upsell_reset - новый сценарий"
-        
-        await message.reply(response, parse_mode="HTML")
+        upsell = await UpsellEngine.open(user_id)
+        header = f"👤 <b>Клиент (пакет {packages_ru.get(upsell.state.package, upsell.state.package)}):</b>\n"
+        
+        async with StreamingReply(message, header=header) as sr:
+            result = await sr.run(upsell.handle(message.text, on_delta=sr.feed), _deadline("upsell"),
+                                  lambda: _client_line("upsell"))
+            
+            client_reply = result.get('client_reply', '')
+            score = result.get('score', 0)
+            package = result.get('package', 'unknown')
+            
+            package_name = packages_ru.get(package, package)
+            
+            response = f"👤 <b>Клиент (пакет {package_name}):</b>\n"
+            
+            if client_reply:
+                response += f"{html.escape(client_reply, quote=False)}\n\n"
+            else:
+                response += "Клиент думает о предложении...\n\n"
+            
+            if score > 0:
+                response += f"⭐ Твой балл: {score}\n\n"
+            
+            response += "Продолжай допродажу!\n"
+            response += "/upsell_reset - новый сценарий"
+            
+            await sr.finish(response)
 
 
 def set_active_session(user_id: str, session_type: str):